@@ -9,6 +9,11 @@ import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
 
+import os
+
+from utils.StartupTimer import STARTUP
+from utils.Metrics import METRICS
+
 # ----------------------------------------------- #
 # ------------- GUI INITIALIZATION -------------- #
 # ----------------------------------------------- #
@@ -25,8 +30,9 @@ def initialize_gui(self):
 
     # ----- Stylize the App ----- #
 
-    self.window.call('source', 'styles\sun-valley.tcl')
-    self.window.call('set_theme', 'light')
+    with STARTUP.phase('source_theme'):
+        self.window.call('source', os.path.join('styles', 'sun-valley.tcl'))
+        self.window.call('set_theme', 'light')
 
     # ----- Set-up the Request GUI ----- #
 
@@ -92,11 +98,32 @@ def initialize_gui(self):
     self.ent_search.grid(row=1, column=1, padx=10, pady=5, sticky='ew')
     self.ent_search.focus()
 
+    # ----- Create the Sorting ----- #
+
+    self.lbl_sort = ttk.Label(master=self.frm_misc, text="Sort by")
+    self.lbl_sort.grid(row=1, column=2, padx=(10, 5), pady=5)
+
+    self.cmb_sort = ttk.Combobox(master=self.frm_misc, state='readonly', width=12, cursor='hand2')
+    self.cmb_sort.grid(row=1, column=3, padx=10, pady=5)
+
     # ----- Show the Not Read / Available Stats ----- #
 
     self.lbl_unread = ttk.Label(master=self.frm_misc, text='')
     self.lbl_unread.grid(row=2, column=0, columnspan=2, padx=10, pady=5, sticky='w')
 
+    # ----- Show the Loading Indicator ----- #
+
+    self.frm_loading = ttk.Frame(master=self.frm_misc)
+    self.frm_loading.grid(row=2, column=1, padx=10, pady=5, sticky='e')
+
+    self.lbl_loading = ttk.Label(master=self.frm_loading, text='Loading reading list...')
+    self.lbl_loading.pack(side=tk.LEFT, padx=5)
+
+    self.pbr_loading = ttk.Progressbar(master=self.frm_loading, mode='indeterminate', length=120)
+    self.pbr_loading.pack(side=tk.LEFT, padx=5)
+
+    self.frm_loading.grid_remove()
+
     # ----- Create a Scrollable Canvas ----- #
 
     self.frm_list = ttk.Frame(master=self.window)
@@ -108,45 +135,52 @@ def initialize_gui(self):
     self.canvas_list = tk.Canvas(self.frm_list)
     self.canvas_list.grid(row=0, column=0, sticky='nsew')
 
-    # Create the scrollbar
-    self.scrollbar = ttk.Scrollbar(self.frm_list, orient=tk.VERTICAL, command=self.canvas_list.yview)
+    # Create the scrollbar (its command is set by the Secretary, which handles the scrolling)
+    self.scrollbar = ttk.Scrollbar(self.frm_list, orient=tk.VERTICAL)
     self.scrollbar.grid(row=0, column=1, sticky='nsew')
     self.scrollbar.grid_remove()
 
     # Configure the canvas
     self.scrollable = False
 
-    self.canvas_list.configure(yscrollcommand=self.scrollbar.set)
     self.canvas_list.bind('<Configure>', self.onCanvasConfigure)
 
+    # The container only covers the viewport since the list is virtualized
     self.frm_container = ttk.Frame(self.canvas_list)
-    self.canvas_list.create_window((0,0), width=self.canvas_list.winfo_reqwidth(), window=self.frm_container, anchor='nw', tags='frame')
+    self.canvas_list.create_window(
+        (0,0),
+        width=self.canvas_list.winfo_reqwidth(),
+        height=self.canvas_list.winfo_reqheight(),
+        window=self.frm_container,
+        anchor='nw',
+        tags='frame'
+    )
 
-    # Make it scrollable using the mousewheel
+    # Make it scrollable using the mousewheel (rows come and go, so the whole App is bound once)
 
-    self.canvas_list.bind('<MouseWheel>', self.onCanvasMouseWheel)
-    self.frm_container.bind('<MouseWheel>', self.onCanvasMouseWheel)
+    self.window.bind_all('<MouseWheel>', self.onCanvasMouseWheel)
 
 # -------------------------------------------------- #
 # --------------- EVENTS METHODS ------------------- #
 # -------------------------------------------------- #
 
-def recursive_binding(self, w):
-    "Recursion to bind a widget and all its children to be scrollable"
+def onCanvasMouseWheel(self, event):
+    """
+    Enables the canvas to be scrollable using the mouse wheel.
 
-    w.bind('<MouseWheel>', self.onCanvasMouseWheel)
-    for child in w.winfo_children():
-        self.recursive_binding(child)
+    Since the wheel is bound for every widget of the App, only
+    the events over the canvas (or anything inside it) count.
+    """
 
-def onCanvasMouseWheel(self, event):
-    "Enables the canvas to be scrollable using the mouse wheel."
+    widget, canvas = str(event.widget), str(self.canvas_list)
+    if widget != canvas and not widget.startswith(canvas + '.'):
+        return
     if self.scrollable:
-        self.canvas_list.yview_scroll(-1 * int((event.delta / 120)), 'units')
+        self.Secretary.yview('scroll', -1 * int((event.delta / 120)), 'units')
 
 def onCanvasConfigure(self, event):
-    self.canvas_list.configure(scrollregion = self.canvas_list.bbox('all'))
-    self.canvas_list.itemconfig('frame', width=self.canvas_list.winfo_width())
-    self.check_scrollbar_visibility()
+    self.canvas_list.itemconfig('frame', width=event.width, height=event.height)
+    self.Secretary.set_viewport(event.height, event.width)
 
 # ------------------------------------------- #
 # ---------- GUI HANDLER METHODS ------------ #
@@ -157,13 +191,12 @@ def check_scrollbar_visibility(self):
     Hides / Unhides the scrollbar when necessary.
     
     Calculates if the required height for the
-    frm_container (the tk.Frame that currently
-    holds the reading list) exceeds that of the
-    canvas and adjusts the scrollbar and scrollability
-    accordingly. 
+    whole reading list (as told by the Secretary)
+    exceeds that of the canvas and adjusts the
+    scrollbar and scrollability accordingly. 
     """
 
-    minHeight = self.frm_container.winfo_reqheight()
+    minHeight = self.Secretary.get_height()
 
     if self.canvas_list.winfo_height() >= minHeight:
         self.scrollbar.grid_remove()
@@ -176,17 +209,55 @@ def reload_canvas(self):
     """
     Re-calibrates the canvas to update the scrollbar.
     
-    For some tkinter reason, the scrollbar does not re-compute
-    its size automatically whenever its sister-component
-    changes size. This serves as a force recomputation.
+    Since the list is virtualized, the canvas never grows
+    with the list. Hence, whenever the list changes size,
+    the scrollbar must be told explicitly.
     """
 
-    self.scrollbar.grid(row=0, column=1, sticky='nsew')
-    self.canvas_list.configure(scrollregion=self.canvas_list.bbox('all'))
-    self.canvas_list.config(yscrollcommand=self.scrollbar.set)
     self.check_scrollbar_visibility()
 
-def unread_ratio_reload(self):
+def show_loading(self, is_loading, text='Loading reading list...'):
+    """
+    Shows / Hides the loading indicator and locks the controls.
+
+    Rationale: While the reading list is being loaded (or saved)
+        in the background, the window is already usable. However,
+        requesting, searching, adding or changing files at that
+        time would work with data that is about to be replaced.
+        Hence, those controls are locked until the task is done.
+    """
+
+    controls = [
+        self.btn_request_book,
+        self.ent_search,
+        self.cmb_sort,
+        self.btn_new_list,
+        self.btn_load_list,
+        self.btn_save_list,
+        self.btn_save_as_list,
+        self.btn_add_book,
+    ]
+
+    if is_loading:
+        self.lbl_loading.config(text=text)
+        self.frm_loading.grid()
+        self.pbr_loading.start(15)
+        for control in controls:
+            control.state(['disabled'])
+    else:
+        self.pbr_loading.stop()
+        self.frm_loading.grid_remove()
+        for control in controls:
+            control.state(['!disabled'])
+        self.ent_search.focus()
+
+def show_loading_progress(self, text):
+    "Shows the progress reported by a background task."
+
+    self.lbl_loading.config(text=text)
+
+@METRICS.timed('App.unread_ratio_reload')
+def unread_ratio_reload(self, unread=None, population=None):
     """
     Updates the available/showable ration.
     
@@ -194,9 +265,18 @@ def unread_ratio_reload(self):
         backend data, Metis reload and Secretary
         reload must occur before calling this
         method.
+
+        Counting scans the whole collection. If the
+        counts are already known (e.g. from a FilterPass),
+        they can be given instead.
     """
 
-    self.unread = len(set(filter(self.Metis.is_available, self.Metis.collection.values())))
-    self.population = len(set(filter(self.Metis.is_showable, self.Metis.collection.values())))
+    if unread is None or population is None:
+        unread = len(set(filter(self.Metis.is_available, self.Metis.collection.values())))
+        population = len(set(filter(self.Metis.is_showable, self.Metis.collection.values())))
+        METRICS.count('App.items_scanned', 2 * len(self.Metis.collection))
+
+    self.unread = unread
+    self.population = population
     self.lbl_unread.config(text=f'Books Left: {self.unread} / {self.population}')
     
\ No newline at end of file
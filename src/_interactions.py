@@ -11,14 +11,36 @@ from tkinter import messagebox
 
 import json
 import configparser
+import os
+import time
+from collections import deque
 
 # import local modules
 from utils.metis import *
 from utils.EntriesListHandler import *
+from utils.CanvasListHandler import *
 from utils.FileDialogHandler import *
 from utils.DetailDialog import *
+from utils.SimilarDialog import SimilarDialog
 from utils.GenreHandler import *
 from utils.SaveFile import *
+from utils.Metrics import METRICS
+from utils.MetricsPanel import MetricsPanel
+from utils.Profiler import PROFILER
+from utils.LagMonitor import LAG_MONITOR
+from utils.TaskRunner import *
+
+SEARCH_DELAY_MS = 150          # waiting time after the last keystroke
+FILTER_SLICE_SECONDS = 0.008    # time allowed per slice of a filter pass
+
+# shown name : sort key of Metis
+SORT_OPTIONS = {
+    'Date Added' : 'added',
+    'Title' : 'title',
+    'Author' : 'author',
+    'Date' : 'date',
+    'Relevance' : MetisClass.RELEVANCE,
+}
 
 # --------------------------------------------------- #
 # ------------- HANDLE THE INTERACTIONS ------------- #
@@ -39,20 +61,39 @@ def initialize_interactions(self):
     def _on_edit(item, data):
         res = self.Metis.edit_item(item, data)
         self.unread_ratio_reload()
+
+        # the edited item may have moved
+        self.Secretary.gui_reload()
         return res
 
-    self.Secretary = EntriesListHandler(
+    # The rows are either widgets inside the container or drawn on the canvas itself
+    if CanvasEntriesListHandler.is_requested(os.environ):
+        Handler, list_master = CanvasEntriesListHandler, self.canvas_list
+        self.canvas_list.itemconfig('frame', state='hidden')
+    else:
+        Handler, list_master = EntriesListHandler, self.frm_container
+
+    self.Secretary = Handler(
         window=self.window,
-        master=self.frm_container, 
-        binding=self.recursive_binding, 
+        master=list_master, 
         canvas_reloader=self.reload_canvas,
-        collection=self.Metis.collection.values(),
+        yscrollcommand=self.scrollbar.set,
+        collection=SortedView(self.Metis),
         genre_suggestions=self.Metis.available_genres,
         on_edit=_on_edit,
         on_delete=_on_delete,
         on_toggle=_on_toggle, 
         is_available=self.Metis.is_showable,
+        on_similar=self.show_similar,
     )
+    self.scrollbar.config(command=self.Secretary.yview)
+
+    # ----- Set up the Background Tasks ----- #
+
+    self.tasks = TaskRunner(self.window)
+    self.window.bind('<Destroy>', self.onWindowDestroy, add='+')
+
+    self.similar_pending = None
 
     # ----- Set up File Handling ----- #
 
@@ -77,32 +118,151 @@ def initialize_interactions(self):
 
     # ----- Set up name filtering ----- #
 
+    self.filter_job = None
+    self.filter_generation = 0
+
     self.var_search_text = tk.StringVar()
     self.var_search_text.trace('w', self.onSearchKeyPress)
     self.ent_search.config(textvariable=self.var_search_text)
 
+    # ----- Set up sorting ----- #
+
+    self.cmb_sort.config(values=list(SORT_OPTIONS))
+    self.cmb_sort.current(0)
+    self.cmb_sort.bind('<<ComboboxSelected>>', self.onSortChange)
+
+    self.window.bind('<Prior>', lambda e : self.Secretary.yview('scroll', -1, 'pages'))
+    self.window.bind('<Next>', lambda e : self.Secretary.yview('scroll', 1, 'pages'))
+
+    # ----- Set up the debug tools ----- #
+
+    self.window.bind('<F8>', self.call_metrics_panel)
+    self.window.bind('<F9>', self.toggle_profiling)
+
+    # the heartbeat starts with the event loop, so the start-up is not a stall
+    def get_lag_context():
+        return { 'items' : len(self.Metis.collection), 'shown' : len(self.Secretary.showable) }
+    self.window.after_idle(LAG_MONITOR.start, self.window, get_lag_context)
+
 # -------------------------------------------------- #
 # --------------- EVENTS METHODS ------------------- #
 # -------------------------------------------------- #
 
+def onWindowDestroy(self, event):
+    "Stops the background work once the App closes."
+
+    if event.widget is not self.window:
+        return
+    self.tasks.shutdown()
+    LAG_MONITOR.stop()
+
+@METRICS.timed('App.onGenreEdit')
+@LAG_MONITOR.track('onGenreEdit')
+@PROFILER.wrap('onGenreEdit')
 def onGenreEdit(self):
     "Whenever the GenrePacker updates the genres, the App must also be updated."
 
-    self.Metis.reload_available()
-    self.Secretary.reload()
-    self.unread_ratio_reload()
+    self.schedule_filter(delay=0)
 
+@METRICS.timed('App.onSearchKeyPress')
+@LAG_MONITOR.track('onSearchKeyPress')
+@PROFILER.wrap('onSearchKeyPress')
 def onSearchKeyPress(self, *args):
-    text = self.ent_search.get()
-    self.Metis.search_filter = text
-    self.Metis.reload_available()
-    self.Secretary.reload()
-    self.unread_ratio_reload()
+    """
+    Debounces the search.
+
+    Rationale: Filtering on every character wastes work on
+        queries that are about to be replaced. Hence, the
+        filtering only starts once the user stops typing for
+        SEARCH_DELAY_MS.
+    """
+
+    self.schedule_filter(delay=SEARCH_DELAY_MS)
+
+def schedule_filter(self, delay=0):
+    """
+    Starts a new filter pass after the delay, superseding any other.
+
+    Rationale: Only the latest filters matter. Hence, every call
+        cancels the pending or in-flight pass (if any) and the
+        generation number makes sure that a superseded pass can
+        never apply its result.
+    """
+
+    if self.filter_job:
+        self.window.after_cancel(self.filter_job)
+    self.filter_generation += 1
+    self.filter_job = self.window.after(delay, self.start_filter, self.filter_generation)
+
+def start_filter(self, generation):
+    "Starts the sliced filter pass over the current filters."
+
+    self.Metis.search_filter = self.ent_search.get()
+    self.run_filter_slice(generation, self.Metis.start_filter_pass())
+
+@METRICS.timed('App.run_filter_slice')
+@LAG_MONITOR.track('run_filter_slice')
+@PROFILER.wrap('run_filter_slice')
+def run_filter_slice(self, generation, fpass):
+    """
+    Runs a slice of the filter pass and schedules the next one.
+
+    Rationale: Long filter passes must not block the keystrokes.
+        Each slice only runs for FILTER_SLICE_SECONDS, after which
+        the App goes back to the event loop. The GUI is only reloaded
+        once the whole pass is done.
+    """
+
+    if generation != self.filter_generation:
+        return
+
+    deadline = time.perf_counter() + FILTER_SLICE_SECONDS
+    done = fpass.is_done()
+    while not done and time.perf_counter() < deadline:
+        done = fpass.step()
+
+    if not done:
+        self.filter_job = self.window.after_idle(self.run_filter_slice, generation, fpass)
+        return
+
+    self.filter_job = None
+    showable = fpass.apply()
+
+    # without filters, everything is shown, so the live view is enough
+    self.Secretary.reload(showable if self.Metis.has_filters() else SortedView(self.Metis))
+    self.unread_ratio_reload(unread=len(fpass.availables), population=len(showable))
+
+@METRICS.timed('App.onSortChange')
+@LAG_MONITOR.track('onSortChange')
+@PROFILER.wrap('onSortChange')
+def onSortChange(self, event=None):
+    """
+    Shows the entries in the chosen order.
+
+    Rationale: The order of every sort key is maintained by Metis,
+        so re-sorting the whole collection is never needed. Without
+        filters, the live SortedView is shown, which only costs as
+        much as the visible rows. With filters, only the showable
+        items are sorted.
+    """
+
+    self.Metis.set_sort(SORT_OPTIONS[self.cmb_sort.get()])
+
+    if self.filter_job:
+        # the pass in flight follows the previous order
+        self.schedule_filter(delay=0)
+    elif not self.Metis.has_filters():
+        self.Secretary.reload(SortedView(self.Metis))
+    else:
+        self.Secretary.reload(self.Metis.sort_items(self.Secretary.showable))
 
 # -------------------------------------------------- #
 # --------------- WIDGET METHODS ------------------- #
 # -------------------------------------------------- #
 
+@METRICS.timed('App.request_book')
+@LAG_MONITOR.track('request_book')
+@PROFILER.wrap('request_book')
 def request_book(self):
     """
     Requests a book item from Metis and displays it.
@@ -125,6 +285,97 @@ def request_book(self):
     if requested_title != 'No book available':
         self.Secretary.toggle(requested_item.get_uid())
 
+def build_index(self, name, on_built=None):
+    """
+    Builds one of the lazy indices of Metis as a task.
+
+    Rationale: The lazy indices (e.g. the text index) take seconds
+        to build for big reading lists, so they are built by a
+        worker thread. Until then, Metis works without them.
+
+    Parameters:
+        name : str
+            - a key of MetisClass.LAZY_INDICES
+        on_built (optional) : function
+            - called with whether the index is now used. It is not,
+              if the build failed or a reading list was loaded in
+              the meantime.
+    """
+
+    if self.Metis.is_building(name):
+        return
+
+    index, items = self.Metis.start_build(name)
+
+    def build(task):
+        index.rebuild(items)
+        return index
+
+    def on_done(built):
+        used = self.Metis.finish_build(name, built)
+        if on_built is not None:
+            on_built(used)
+
+    def on_error(error):
+        self.Metis.cancel_build(name, index)
+        print(f'The {name} index cannot be built: {error!r}')
+        if on_built is not None:
+            on_built(False)
+
+    self.tasks.submit(build, name=f'build_{name}', on_done=on_done, on_error=on_error)
+
+def build_search_indices(self):
+    """
+    Builds the text and fuzzy indices, which extend the search.
+
+    Rationale: Until the text index is built, searching only checks
+        the titles and authors, and until the fuzzy index is built,
+        a search with a typo shows nothing. Hence, the current
+        search is redone once either index is ready.
+    """
+
+    def on_built(used):
+        if used and self.Metis.search_filter.strip():
+            self.schedule_filter(delay=0)
+
+    self.build_index('text', on_built)
+    self.build_index('fuzzy', on_built)
+
+@LAG_MONITOR.track('show_similar')
+@PROFILER.wrap('show_similar')
+def show_similar(self, item):
+    """
+    Shows the books most like the item.
+
+    Rationale: The similarity index is only built the first time
+        it is needed (see self.build_index), and the books like the
+        last item asked for are shown once it is done.
+    """
+
+    if self.Metis.is_built('similarity'):
+        SimilarDialog(
+            root=self.window,
+            item=item,
+            similar=self.Metis.similar_items(item),
+            on_choose=lambda chosen : self.var_search_text.set(chosen.format_book()),
+        )
+        return
+
+    self.similar_pending = item
+    if self.Metis.is_building('similarity'):
+        return
+
+    def on_built(used):
+        self.window.config(cursor='')
+        pending, self.similar_pending = self.similar_pending, None
+        if used and pending is not None and self.Metis.collection.get(pending.get_uid()) is pending:
+            self.show_similar(pending)
+
+    self.window.config(cursor='watch')
+    self.build_index('similarity', on_built)
+
+@LAG_MONITOR.track('call_add_dialog')
+@PROFILER.wrap('call_add_dialog')
 def call_add_dialog(self):
     """
     Creates a dialog box for adding a new book entry
@@ -140,13 +391,10 @@ def call_add_dialog(self):
     """
 
     def attempt_submit(data):
-        new_item = self.Metis.insert_item(data)
+        new_item = self.add_book(data)
         if not new_item:
             messagebox.showerror(message='Book already exists.')
         else:
-            if self.Metis.is_available(new_item):
-                self.Secretary.insert(new_item)
-            self.unread_ratio_reload()
             return new_item
 
     modal = AddDialog(root=self.window, attempt_submit=attempt_submit, suggestions=self.Metis.available_genres)
@@ -158,7 +406,39 @@ def call_add_dialog(self):
     # call again to add another book
     self.call_add_dialog()
 
+@METRICS.timed('App.add_book')
+def add_book(self, data):
+    """
+    Inserts a new book into Metis and shows it.
+
+    Parameter:
+        data : dict
+            - the data of the new ReadingListItem
+    
+    Return Value:
+        None - if the book already exists
+        ReadingListItem - if success
+    """
+
+    new_item = self.Metis.insert_item(data)
+    if not new_item:
+        return None
+
+    if self.Metis.is_available(new_item):
+        # the showable items are in the current order
+        position = self.Metis.find_position(self.Secretary.showable, new_item)
+        self.Secretary.insert(new_item, position)
+    self.unread_ratio_reload()
+
+    # an in-flight filter pass does not know the new item
+    if self.filter_job:
+        self.schedule_filter(delay=0)
+
+    return new_item
+
 @FileDialogHandler.ask_confirmation
+@LAG_MONITOR.track('cmd_new_list')
+@PROFILER.wrap('cmd_new_list')
 def cmd_new_list(self):
     """
     Creates a new list by erasing all previously added data.
@@ -176,7 +456,7 @@ def cmd_new_list(self):
     self.filepath = self.attempt_load('')
     self.reload_config_path()
 
-def get_state_data(self):
+def get_state_data(self, snapshot=False):
     """
     Returns a SaveFile to use for saving.
 
@@ -184,6 +464,10 @@ def get_state_data(self):
         data needed for saving. All save functions must
         use this function when obtaining data.
 
+        When saving in the background, the books may change
+        while being encoded. Hence, the latest Snapshot of Metis
+        (which no change ever touches) must be used instead.
+
     Currently, a Save File has the following components:
     1. collection : dict 
         - a (key, value) pair of ReadingListItem.uid : ReadingListItem
@@ -200,6 +484,11 @@ def get_state_data(self):
     save_collection = self.Metis.collection
     save_recently_read = self.Metis.recently_read_genre
     save_filter = self.Metis.filter
+    if snapshot:
+        books = self.Metis.get_snapshot()
+        save_collection = { book.get_uid() : book for book in books }
+        save_recently_read = deque(books.recently_read)
+        save_filter = set(save_filter)
     data = {
         'collection' : save_collection,
         'recently_read' : save_recently_read,
@@ -207,6 +496,9 @@ def get_state_data(self):
     }
     return SaveFile(**data)
 
+@METRICS.timed('App.cmd_save_list')
+@LAG_MONITOR.track('cmd_save_list')
+@PROFILER.wrap('cmd_save_list')
 def cmd_save_list(self):
     """
     Saves if a save file already exists, if not, creates a new save file.
@@ -221,10 +513,10 @@ def cmd_save_list(self):
     if not self.filepath:
         self.cmd_save_as_list()
     else:
-        data = self.get_state_data()
-        self.Dialogs.save_file(data=data, filepath=self.filepath)
-        self.changed = False
+        self.save_in_background(self.filepath)
 
+@LAG_MONITOR.track('cmd_save_as_list')
+@PROFILER.wrap('cmd_save_as_list')
 def cmd_save_as_list(self):
     """
     Creates a new save file (if saved).
@@ -254,15 +546,48 @@ def cmd_save_as_list(self):
         2. The config will be updated.
     """
     
-    data = self.get_state_data()
-    save_filepath = self.Dialogs.cmd_save_list(data=data)
+    save_filepath = self.Dialogs.ask_save_filepath()
 
     if not save_filepath:
         return
 
-    self.filepath = save_filepath
-    self.reload_config_path()
+    self.save_in_background(save_filepath)
+
+def save_in_background(self, filepath):
+    """
+    Saves a snapshot of the current state to the filepath (as a task).
+
+    Rationale: Encoding a big reading list takes a while, so it
+        is done by a worker thread. The controls are locked until
+        then, and the App only switches to the filepath once the
+        file has actually been written.
+    """
+
+    data = self.get_state_data(snapshot=True)
+
+    def on_done(saved_filepath):
+        self.show_loading(False)
+        if not saved_filepath:
+            messagebox.showerror(title='Error', message='File cannot be saved.')
+            return
+        self.filepath = saved_filepath
+        self.reload_config_path()
+
+    def on_error(error):
+        self.show_loading(False)
+        messagebox.showerror(title='Error', message='File cannot be saved.')
+        print(error)
+
+    self.show_loading(True, text='Saving reading list...')
+    self.tasks.submit(
+        lambda task : self.Dialogs.save_file(data=data, filepath=filepath),
+        name='save_file',
+        on_done=on_done,
+        on_error=on_error,
+    )
 
+@LAG_MONITOR.track('cmd_load_list')
+@PROFILER.wrap('cmd_load_list')
 def cmd_load_list(self):
     """
     Loads a save file through a dialog.
@@ -278,16 +603,65 @@ def cmd_load_list(self):
     not acquiring any filepath should NOT result to any
     changes within the App.
 
+    The file is read and decoded in the background (see
+    self.tasks), so the steps 2 and 3 happen once it is done.
+
     Result (if success):
         1. The data will be loaded.
         2. The self.filepath will be updated.
         3. The config will be updated.
     """
 
-    res = self.Dialogs.cmd_load_list()
+    filepath = self.Dialogs.ask_load_filepath()
 
-    if not res:
+    if not filepath:
         return
 
-    self.filepath = self.attempt_load(res['filepath'])
-    self.reload_config_path()
\ No newline at end of file
+    def on_done(loaded):
+        self.apply_loaded(loaded)
+        self.show_loading(False)
+        self.filepath = filepath
+        self.reload_config_path()
+
+    def on_error(error):
+        # the current reading list stays as it is
+        self.show_loading(False)
+        self.report_load_error(error)
+
+    self.show_loading(True)
+    self.tasks.submit(
+        lambda task : self.read_file_path(filepath, task),
+        name='load_file',
+        on_done=on_done,
+        on_error=on_error,
+        on_progress=self.show_loading_progress,
+    )
+
+def call_metrics_panel(self, event=None):
+    "Opens the debug panel of the App metrics (bound to F8)."
+
+    MetricsPanel(root=self.window)
+
+def toggle_profiling(self, event=None):
+    """
+    Starts or stops profiling the event handlers (bound to F9).
+
+    Rationale: Freezes are hard to reproduce, so the user must be
+        able to capture one whenever it happens. When stopped, the
+        user is told where the capture was written so that it can
+        be attached to an issue.
+    """
+
+    filepath = PROFILER.toggle()
+
+    if PROFILER.active:
+        self.window.title(f'{self.window.title()} [Profiling]')
+        print('Profiling started.')
+        return
+
+    self.window.title(self.window.title().replace(' [Profiling]', ''))
+    if filepath:
+        print(f'Profile written to {filepath}')
+        messagebox.showinfo(title='Profiling', message=f'Profile written to:\n{filepath}')
+    else:
+        messagebox.showinfo(title='Profiling', message='Nothing was captured.')
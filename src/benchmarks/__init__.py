@@ -0,0 +1,15 @@
+"""
+Benchmarks
+
+Contains the benchmark suites of Metis.
+
+Includes:
+1. common - synthetic data, timing, results and baselines
+2. backend - the headless MetisClass benchmarks
+3. gui - the Tk rendering benchmarks (under Xvfb if needed)
+
+Usage (inside the src folder):
+    python -m benchmarks.backend --output results.json
+    python -m benchmarks.backend --baseline results.json
+    python -m benchmarks.gui --output gui_results.json
+"""
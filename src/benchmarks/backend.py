@@ -0,0 +1,222 @@
+"""
+Backend Benchmarks
+
+Times the MetisClass operations on synthetic reading lists,
+without any GUI.
+
+Usage (inside the src folder):
+    python -m benchmarks.backend [--sizes 1000 10000] [--full]
+        [--repeat 5] [--ops 100] [--output results.json]
+        [--baseline previous.json [--fail-on-regression]]
+
+Rationale:
+    The backend must stay fast regardless of how the GUI
+    renders it. Hence, every MetisClass operation the App uses
+    is timed here in isolation. Operations that act on a single
+    item (insert, edit, delete, toggle, request) are timed per
+    call, averaged over --ops calls. The rest are timed as a
+    whole pass over the reading list.
+"""
+
+import argparse
+import copy
+import json
+import os
+import random
+import sys
+import tempfile
+from contextlib import redirect_stdout
+
+from utils.metis import MetisClass
+from utils.SaveFile import *
+
+from benchmarks.common import *
+
+def fresh_metis(save_file):
+    """
+    Returns a MetisClass loaded with a pristine copy of the save file.
+
+    Rationale: Some operations modify the items in place (e.g.
+        toggling), so each sample must start from its own copy to
+        keep the samples comparable.
+    """
+
+    metis = MetisClass()
+    metis.reload(SaveFile(
+        collection={ uid : copy.copy(item) for uid, item in save_file.collection.items() },
+        recently_read=deque(save_file.recently_read),
+        filter=set(save_file.filter),
+    ))
+    return metis
+
+def bench_size(size, repeat, ops, seed):
+    "Runs every backend benchmark on a reading list of the given size."
+
+    save_file = make_save_file(size, seed)
+    results = list()
+    ops = min(ops, size)
+
+    def setup():
+        return fresh_metis(save_file)
+
+    def record(name, samples, **extra):
+        res = summarize(name, size, samples, **extra)
+        results.append(res)
+        print(format_result(res), file=sys.__stdout__)
+
+    # ----- Whole reading list ----- #
+
+    record('reload', measure(lambda metis : metis.reload(save_file), setup=setup, repeat=repeat))
+
+    def search(metis):
+        metis.search_filter = 'king'
+        metis.reload_available()
+    record('reload_available[search]', measure(search, setup=setup, repeat=repeat))
+
+    def genre(metis):
+        metis.filter.update(GENRES[:3])
+        metis.reload_available()
+    record('reload_available[genre]', measure(genre, setup=setup, repeat=repeat))
+
+    def both(metis):
+        metis.filter.update(GENRES[:3])
+        metis.search_filter = 'king'
+        metis.reload_available()
+    record('reload_available[search+genre]', measure(both, setup=setup, repeat=repeat))
+
+    # ----- Single item ----- #
+
+    rng = random.Random(seed)
+    targets = rng.sample(range(size), ops)
+
+    def insert(metis):
+        for index in range(ops):
+            metis.insert_item(make_data(rng, size + index))
+    record('insert_item', per_op(measure(insert, setup=setup, repeat=repeat), ops), ops=ops)
+
+    counter = iter(range(10 ** 9))
+    def edit(metis):
+        for uid in targets:
+            item = metis.collection[uid]
+            data = make_data(rng, f'edited {next(counter)}')
+            data['available'] = item.available
+            metis.edit_item(item, data)
+    record('edit_item', per_op(measure(edit, setup=setup, repeat=repeat), ops), ops=ops)
+
+    def delete(metis):
+        for uid in targets:
+            metis.delete_item(metis.collection[uid])
+    record('delete_item', per_op(measure(delete, setup=setup, repeat=repeat), ops), ops=ops)
+
+    def toggle(metis):
+        for uid in targets:
+            metis.toggle(metis.collection[uid])
+    record('toggle', per_op(measure(toggle, setup=setup, repeat=repeat), ops), ops=ops)
+
+    def request(metis):
+        for _ in range(ops):
+            metis.request_book()
+    record('request_book', per_op(measure(request, setup=setup, repeat=repeat), ops), ops=ops)
+
+    # ----- Lazy Indices ----- #
+
+    def builder(name):
+        def build(metis):
+            index, items = metis.start_build(name)
+            index.rebuild(items)
+            metis.finish_build(name, index)
+            return metis
+        return build
+
+    record('build_similarity', measure(builder('similarity'), setup=setup, repeat=repeat))
+    record('build_text', measure(builder('text'), setup=setup, repeat=repeat))
+    record('build_fuzzy', measure(builder('fuzzy'), setup=setup, repeat=repeat))
+
+    def similar(metis):
+        for uid in targets:
+            metis.similar_items(metis.collection[uid])
+    record('similar_items', per_op(measure(similar, setup=lambda : builder('similarity')(setup()), repeat=repeat), ops), ops=ops)
+
+    queries = [ ' '.join(rng.sample(WORDS, 2)) for _ in range(ops) ]
+    def text_search(metis):
+        for query in queries:
+            metis.search(query)
+    record('search[top 10]', per_op(measure(text_search, setup=lambda : builder('text')(setup()), repeat=repeat), ops), ops=ops)
+
+    def full_text(metis):
+        metis.search_filter = 'winter garden'
+        metis.reload_available()
+    record('reload_available[full text]', measure(full_text, setup=lambda : builder('text')(setup()), repeat=repeat))
+
+    # a typo in every word, e.g. "Tolkein Shadwo" (shorter words must be exact)
+    def misspell(words):
+        word = rng.choice([ word for word in words if len(word) >= 5 ])
+        i = rng.randrange(len(word) - 1)
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    typos = [ f'{misspell(NAMES)} {misspell(WORDS)}' for _ in range(ops) ]
+    def fuzzy(metis):
+        for query in typos:
+            metis.fuzzy_search(query)
+    record('fuzzy_search[top 10]', per_op(measure(fuzzy, setup=lambda : builder('fuzzy')(setup()), repeat=repeat), ops), ops=ops)
+
+    def fuzzy_pass(metis):
+        metis.search_filter = 'Tolkein'
+        metis.start_filter_pass().apply()
+    record('filter_pass[fuzzy]', measure(fuzzy_pass, setup=lambda : builder('fuzzy')(setup()), repeat=repeat))
+
+    # ----- Snapshots ----- #
+
+    def snapshot(metis):
+        metis.get_snapshot()
+        return metis
+    record('build_snapshot', measure(snapshot, setup=setup, repeat=repeat))
+    record('toggle[snapshot]', per_op(measure(toggle, setup=lambda : snapshot(setup()), repeat=repeat), ops), ops=ops)
+    record('edit_item[snapshot]', per_op(measure(edit, setup=lambda : snapshot(setup()), repeat=repeat), ops), ops=ops)
+
+    # ----- Saving and Loading ----- #
+
+    handle, path = tempfile.mkstemp(suffix='.metis')
+    os.close(handle)
+    try:
+        def save(metis):
+            data = SaveFile(collection=metis.collection, recently_read=metis.recently_read_genre, filter=metis.filter)
+            with open(path, 'w') as output_file:
+                json.dump(data, output_file, indent=4, cls=SaveFile.CollectionEncoder)
+        samples = measure(save, setup=setup, repeat=repeat)
+        record('save', samples, bytes=os.path.getsize(path))
+
+        def load():
+            with open(path, 'r') as data_file:
+                return json.loads(data_file.read(), object_hook=SaveFile.decode_collection)
+        record('load', measure(load, repeat=repeat))
+
+        def load_and_reload():
+            MetisClass().reload(load())
+        record('load+reload', measure(load_and_reload, repeat=repeat))
+    finally:
+        os.remove(path)
+
+    return results
+
+def per_op(samples, ops):
+    "Converts the samples of a batch of ops into seconds per op."
+
+    return [ sample / ops for sample in samples ]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.backend', description='Benchmarks the MetisClass backend without Tk.')
+    add_common_arguments(parser)
+    parser.add_argument('--ops', type=int, default=100, help='the calls per sample of single item operations')
+    args = parser.parse_args(argv)
+
+    results = list()
+
+    # MetisClass prints on every insertion, which must not be timed
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        for size in get_sizes(args):
+            results.extend(bench_size(size, args.repeat, args.ops, args.seed))
+
+    return finish(args, 'backend', results)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,233 @@
+"""
+Benchmark Commons
+
+Contains the helpers shared by the benchmark suites.
+
+Includes:
+1. make_items / make_save_file - synthetic reading lists
+2. measure / summarize - timing helpers
+3. write_results / load_results / compare - the results format
+4. add_common_arguments / finish - the shared command-line handling
+
+Rationale:
+    Every suite must produce results in the same format so that
+    they can be compared against a stored baseline with the same
+    code. A result is identified by its (name, size) pair, where
+    size is the number of items in the synthetic reading list.
+
+    This module must NOT import tkinter so that the backend
+    suite can run on machines without a display.
+"""
+
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from collections import deque
+
+from utils.ReadingListItem import *
+from utils.SaveFile import *
+
+GENRES = [
+    'Fantasy', 'Science Fiction', 'Mystery', 'Thriller', 'Romance', 'Horror',
+    'History', 'Biography', 'Philosophy', 'Poetry', 'Drama', 'Classics',
+    'Adventure', 'Humor', 'Science', 'Mathematics', 'Economics', 'Politics',
+    'Religion', 'Travel', 'Cooking', 'Art', 'Music', 'Psychology',
+]
+
+WORDS = [
+    'shadow', 'river', 'king', 'glass', 'winter', 'garden', 'stone', 'empire',
+    'silent', 'night', 'fire', 'ocean', 'house', 'star', 'iron', 'golden',
+    'lost', 'city', 'dream', 'song', 'wolf', 'crown', 'storm', 'light',
+]
+
+NAMES = [
+    'Tolkien', 'Le Guin', 'Austen', 'Borges', 'Calvino', 'Woolf', 'Orwell',
+    'Dostoevsky', 'Murakami', 'Pratchett', 'Atwood', 'Eco', 'Kafka', 'Herbert',
+]
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+FULL_SIZES = [1000, 10000, 100000, 1000000]
+RESULT_VERSION = 1
+
+# ------------------------------------------ #
+# ------------ Synthetic Data -------------- #
+# ------------------------------------------ #
+
+def make_data(rng, index):
+    "Returns the data of a synthetic ReadingListItem."
+
+    title = ' '.join(rng.choice(WORDS).capitalize() for _ in range(rng.randint(1, 4)))
+    return {
+        'title' : f'{title} {index}',
+        'subtitle' : ' '.join(rng.choice(WORDS) for _ in range(rng.randint(0, 3))),
+        'author' : rng.choice(NAMES),
+        'date' : str(rng.randint(1800, 2022)),
+        'summary' : ' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 30))),
+        'genre' : set(rng.sample(GENRES, rng.randint(1, 3))),
+        'available' : rng.random() < 0.7,
+    }
+
+def make_items(size, seed=0):
+    "Returns a dict of (uid, ReadingListItem) of the given size."
+
+    rng = random.Random(seed)
+    return { uid : ReadingListItem(uid=uid, **make_data(rng, uid)) for uid in range(size) }
+
+def make_save_file(size, seed=0):
+    "Returns a SaveFile holding a synthetic reading list."
+
+    return SaveFile(
+        collection=make_items(size, seed),
+        recently_read=deque(random.Random(seed).sample(GENRES, 5)),
+        filter=set(),
+    )
+
+# ------------------------------------------ #
+# ---------------- Timing ------------------ #
+# ------------------------------------------ #
+
+def measure(func, setup=None, repeat=5, number=1):
+    """
+    Times func and returns the seconds per call of each repeat.
+
+    Parameters:
+        func : function
+            - the function to time. It receives the value
+              returned by setup, if there is a setup.
+        setup (optional) : function
+            - prepares a fresh state before each repeat. It is
+              NOT included in the timing.
+        repeat : int
+            - the number of samples to take
+        number : int
+            - the number of calls per sample
+    """
+
+    samples = list()
+    for _ in range(repeat):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        for _ in range(number):
+            func(state) if setup else func()
+        samples.append((time.perf_counter() - start) / number)
+    return samples
+
+def summarize(name, size, samples, **extra):
+    "Returns the result record of the samples."
+
+    res = {
+        'name' : name,
+        'size' : size,
+        'repeat' : len(samples),
+        'min' : min(samples),
+        'median' : statistics.median(samples),
+        'mean' : statistics.mean(samples),
+        'max' : max(samples),
+    }
+    res.update(extra)
+    return res
+
+# ------------------------------------------ #
+# ---------------- Results ----------------- #
+# ------------------------------------------ #
+
+def write_results(path, suite, results):
+    "Writes the results of a suite as JSON."
+
+    data = {
+        'version' : RESULT_VERSION,
+        'suite' : suite,
+        'timestamp' : time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python' : platform.python_version(),
+        'platform' : platform.platform(),
+        'results' : results,
+    }
+    with open(path, 'w') as output_file:
+        json.dump(data, output_file, indent=4)
+
+def load_results(path):
+    "Reads the results written by write_results."
+
+    with open(path, 'r') as input_file:
+        return json.load(input_file)
+
+def compare(results, baseline, threshold=0.10):
+    """
+    Compares the results against a baseline.
+
+    Rationale: Medians are compared since they are the least
+        affected by the occasional hiccup of the machine.
+
+    Return Value : list
+        - a list of (result, baseline median, ratio, is_regression)
+          tuples for every result that also exists in the baseline
+    """
+
+    previous = { (res['name'], res['size']) : res for res in baseline['results'] }
+
+    comparisons = list()
+    for res in results:
+        old = previous.get((res['name'], res['size']))
+        if not old or not old['median']:
+            continue
+        ratio = res['median'] / old['median']
+        comparisons.append((res, old['median'], ratio, ratio > 1 + threshold))
+    return comparisons
+
+def format_result(res):
+    "Returns a one-line description of a result."
+
+    return f'{res["name"]:<34}{res["size"]:>9}  median {res["median"] * 1000:>11.3f} ms  min {res["min"] * 1000:>11.3f} ms'
+
+# ------------------------------------------ #
+# ------------ Command Line ---------------- #
+# ------------------------------------------ #
+
+def add_common_arguments(parser):
+    "Adds the arguments shared by every suite."
+
+    parser.add_argument('--sizes', type=int, nargs='+', default=None, help='the reading list sizes to benchmark')
+    parser.add_argument('--full', action='store_true', help=f'benchmark up to {FULL_SIZES[-1]} items')
+    parser.add_argument('--repeat', type=int, default=5, help='the samples per benchmark')
+    parser.add_argument('--seed', type=int, default=0, help='the seed of the synthetic data')
+    parser.add_argument('--output', help='the JSON file to write the results to')
+    parser.add_argument('--baseline', help='a previous JSON result to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='the slowdown ratio considered a regression')
+    parser.add_argument('--fail-on-regression', action='store_true', help='exit with an error on regressions')
+
+def get_sizes(args):
+    "Returns the sizes chosen in the command line."
+
+    if args.sizes:
+        return args.sizes
+    return FULL_SIZES if args.full else DEFAULT_SIZES
+
+def finish(args, suite, results):
+    """
+    Writes and compares the results as asked in the command line.
+
+    Return Value : int
+        - the exit status of the suite
+    """
+
+    if args.output:
+        write_results(args.output, suite, results)
+        print(f'Results written to {args.output}')
+
+    if not args.baseline:
+        return 0
+
+    regressions = 0
+    print(f'\nComparison against {args.baseline}')
+    for res, old_median, ratio, is_regression in compare(results, load_results(args.baseline), args.threshold):
+        regressions += is_regression
+        flag = '  REGRESSION' if is_regression else ''
+        print(f'{res["name"]:<34}{res["size"]:>9}  {old_median * 1000:>11.3f} -> {res["median"] * 1000:>11.3f} ms  x{ratio:.2f}{flag}')
+
+    if regressions and args.fail_on_regression:
+        print(f'{regressions} regression(s) found.', file=sys.stderr)
+        return 1
+    return 0
@@ -0,0 +1,277 @@
+"""
+GUI Benchmarks
+
+Drives the real App on synthetic reading lists and times the
+Tk side of the common interactions.
+
+Usage (inside the src folder):
+    python -m benchmarks.gui [--sizes 100 1000] [--xvfb]
+        [--repeat 3] [--output results.json]
+        [--baseline previous.json [--fail-on-regression]]
+
+Rationale:
+    Most of the slowness is in rendering, not in Metis, so the
+    App must be timed as the user sees it: from the start until
+    the entries are shown, and from an interaction until every
+    pending Tk event has been processed. To run on machines
+    without a display (e.g. a CI server), a local virtual X
+    server (Xvfb) is started when there is no DISPLAY or when
+    --xvfb is given.
+
+    The results use the same format as benchmarks.backend, so
+    the same baselines and comparisons work.
+"""
+
+import argparse
+import configparser
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager, redirect_stdout
+
+from utils.SaveFile import *
+
+from benchmarks.common import *
+
+DEFAULT_GUI_SIZES = [100, 1000, 5000]
+XVFB_TIMEOUT = 10
+
+# ------------------------------------------ #
+# ------------ Virtual Display ------------- #
+# ------------------------------------------ #
+
+@contextmanager
+def virtual_display(force=False):
+    """
+    Makes sure that there is a display for Tk.
+
+    If there is no DISPLAY (or force is set), an Xvfb server is
+    started on a free display number and stopped afterwards.
+    """
+
+    if os.environ.get('DISPLAY') and not force:
+        yield os.environ['DISPLAY']
+        return
+
+    if not shutil.which('Xvfb'):
+        raise RuntimeError('No display available and Xvfb is not installed.')
+
+    number = 99
+    while os.path.exists(f'/tmp/.X{number}-lock'):
+        number += 1
+    display = f':{number}'
+
+    server = subprocess.Popen(
+        ['Xvfb', display, '-screen', '0', '1280x1024x24', '-nolisten', 'tcp'],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    previous = os.environ.get('DISPLAY')
+    try:
+        deadline = time.monotonic() + XVFB_TIMEOUT
+        while not os.path.exists(f'/tmp/.X11-unix/X{number}'):
+            if server.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError(f'Xvfb could not be started on {display}.')
+            time.sleep(0.05)
+
+        os.environ['DISPLAY'] = display
+        yield display
+    finally:
+        if previous is None:
+            os.environ.pop('DISPLAY', None)
+        else:
+            os.environ['DISPLAY'] = previous
+        server.terminate()
+        server.wait()
+
+# ------------------------------------------ #
+# --------------- App Driving -------------- #
+# ------------------------------------------ #
+
+def settle(app, timeout=600):
+    """
+    Processes Tk events until the App has nothing left to do.
+
+    Rationale: Some work is scheduled through after() instead
+        of being done right away, so merely calling update()
+        once is not enough. The App is considered settled once
+        it is not loading anymore and no event is pending.
+    """
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        app.window.update()
+        if not is_busy(app):
+            app.window.update_idletasks()
+            return
+        time.sleep(0.001)
+    raise TimeoutError('The App did not settle in time.')
+
+def is_busy(app):
+    "Tells whether the App still has work in progress."
+
+    return (
+        bool(app.frm_loading.winfo_manager())
+        or app.tasks.is_busy()
+        or app.filter_job is not None
+        or app.Secretary.render_job is not None
+    )
+
+def write_reading_list(directory, size, seed):
+    "Writes a synthetic reading list and a config pointing to it."
+
+    filepath = os.path.join(directory, f'bench_{size}.metis')
+    with open(filepath, 'w') as output_file:
+        json.dump(make_save_file(size, seed), output_file, indent=4, cls=SaveFile.CollectionEncoder)
+
+    config_path = os.path.join(directory, f'bench_{size}.ini')
+    config = configparser.ConfigParser()
+    config['recent_file'] = { 'path' : filepath }
+    with open(config_path, 'w') as config_file:
+        config.write(config_file)
+
+    return config_path
+
+def start_app(App, config_path):
+    "Starts the App on the given config and returns it once settled."
+
+    App.CONFIG_PATH = config_path
+    app = App()
+    settle(app)
+    return app
+
+def timed(app, action):
+    "Returns the seconds from calling action until the App settles."
+
+    start = time.perf_counter()
+    action()
+    settle(app)
+    return time.perf_counter() - start
+
+def bench_size(App, directory, size, repeat, seed):
+    "Runs every GUI benchmark on a reading list of the given size."
+
+    config_path = write_reading_list(directory, size, seed)
+    results = list()
+
+    def record(name, samples, **extra):
+        res = summarize(name, size, samples, **extra)
+        results.append(res)
+        print(format_result(res), file=sys.__stdout__)
+
+    # ----- Initial Render ----- #
+
+    samples = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        app = start_app(App, config_path)
+        samples.append(time.perf_counter() - start)
+        app.window.destroy()
+    record('initial_render', samples)
+
+    app = start_app(App, config_path)
+    rng = random.Random(seed)
+
+    try:
+        # ----- Full Reload ----- #
+
+        record('gui_reload', [ timed(app, app.Secretary.reload) for _ in range(repeat) ])
+
+        # ----- Search ----- #
+
+        def search(text):
+            return lambda : app.var_search_text.set(text)
+
+        samples = list()
+        for _ in range(repeat):
+            samples.append(timed(app, search('k')))
+            timed(app, search(''))
+        record('search_keystroke', samples)
+
+        samples = list()
+        for _ in range(repeat):
+            timed(app, search('king'))
+            samples.append(timed(app, search('')))
+        record('search_clear', samples)
+
+        # ----- Genre Filter ----- #
+
+        def add_genre():
+            app.Metis.filter.add(GENRES[0])
+            app.genres.reload()
+            app.onGenreEdit()
+
+        def remove_genre():
+            app.Metis.filter.discard(GENRES[0])
+            app.genres.reload()
+            app.onGenreEdit()
+
+        samples = list()
+        for _ in range(repeat):
+            samples.append(timed(app, add_genre))
+            timed(app, remove_genre)
+        record('genre_filter_toggle', samples)
+
+        # ----- Sorting ----- #
+
+        def sort_by(label):
+            def action():
+                app.cmb_sort.set(label)
+                app.onSortChange()
+            return action
+
+        samples = list()
+        for _ in range(repeat):
+            samples.append(timed(app, sort_by('Title')))
+            timed(app, sort_by('Date Added'))
+        record('sort_switch', samples)
+
+        # ----- Add / Delete ----- #
+
+        added = list()
+        def add():
+            added.append(app.add_book(make_data(rng, f'added {len(added)}')))
+
+        def delete():
+            app.Secretary.delete(added.pop())
+
+        record('add_book', [ timed(app, add) for _ in range(repeat) ])
+
+        record('delete_book', [ timed(app, delete) for _ in range(repeat) ])
+    finally:
+        app.window.destroy()
+
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.gui', description='Benchmarks the Tk rendering of the App.')
+    add_common_arguments(parser)
+    parser.add_argument('--xvfb', action='store_true', help='always use a virtual X server')
+    parser.set_defaults(repeat=3)
+    args = parser.parse_args(argv)
+
+    sizes = args.sizes if args.sizes else (FULL_SIZES if args.full else DEFAULT_GUI_SIZES)
+    results = list()
+
+    try:
+        with virtual_display(force=args.xvfb), tempfile.TemporaryDirectory() as directory:
+            # imported late since tkinter needs the display
+            from main import App
+
+            # the App prints its progress, which must not be timed
+            with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                for size in sizes:
+                    results.extend(bench_size(App, directory, size, args.repeat, args.seed))
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    return finish(args, 'gui', results)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,401 @@
+"""
+Metis CLI
+
+Uses a reading list without the GUI, e.g. from scripts and cron jobs.
+
+Usage (inside the src folder):
+    python cli.py LIST.metis request [--dry-run]
+    python cli.py LIST.metis add TITLE [--subtitle S] [--author A]
+        [--date D] [--summary S] [--genre G [G ...]] [--read]
+    python cli.py LIST.metis toggle BOOK
+    python cli.py LIST.metis import SOURCE
+    python cli.py LIST.metis export DESTINATION
+    python cli.py LIST.metis stats [--json]
+    python cli.py LIST.metis search QUERY [--limit 10] [--json]
+
+    BOOK is either the uid of a book or its full name, as shown
+    by the App (e.g. "Dune (1965) by Frank Herbert"). SOURCE and
+    DESTINATION may be .metis, .json or .csv files.
+
+Rationale:
+    main.py imports tkinter and builds the App, which needs a
+    display. This does the same work through MetisClass alone,
+    and only imports what the chosen subcommand needs (e.g. the
+    csv module is only imported for .csv files), so it starts
+    quickly.
+
+    The reading list is created if it does not exist yet, and is
+    only written back if the subcommand changed it. It is written
+    to a temporary file first, which then replaces the reading
+    list, so a failed run never leaves a half-written file.
+"""
+
+import argparse
+import os
+import sys
+from contextlib import redirect_stdout
+
+# the attributes of a ReadingListItem that can be imported and exported
+BOOK_FIELDS = ('title', 'subtitle', 'author', 'date', 'summary', 'genre', 'available')
+GENRE_SEPARATOR = ';'           # between the genres of a book in .csv files
+
+class CommandError(Exception):
+    "Raised by a subcommand that cannot be done, with the reason shown to the user."
+
+# ----- Loading and Saving ----- #
+
+def load(filepath):
+    """
+    Returns a MetisClass loaded with the reading list.
+
+    An empty reading list is returned if the file does not exist.
+    """
+
+    import json
+    from utils.metis import MetisClass
+    from utils.SaveFile import SaveFile
+
+    metis = MetisClass()
+    if not os.path.exists(filepath):
+        metis.reload()
+        return metis
+
+    with open(filepath, 'r') as data_file:
+        save_file = json.loads(data_file.read(), object_hook=SaveFile.decode_collection)
+    if not isinstance(save_file, SaveFile):
+        raise CommandError(f'{filepath} is not a reading list.')
+    metis.reload(save_file)
+    return metis
+
+def save(metis, filepath):
+    "Writes the reading list the same way the App does."
+
+    from utils.SaveFile import SaveFile
+
+    data = SaveFile(collection=metis.collection, recently_read=metis.recently_read_genre, filter=metis.filter)
+    write_json(data, filepath, cls=SaveFile.CollectionEncoder)
+
+def write_json(data, filepath, **kwargs):
+    """
+    Writes the data as JSON through a temporary file.
+
+    Rationale: The data is encoded before anything is written,
+        and the file is only replaced once fully written. Hence,
+        an error (or a cron job being killed) keeps the previous
+        file intact.
+    """
+
+    import json
+    import shutil
+
+    encoded = json.dumps(data, indent=4, **kwargs)
+    temp_path = f'{filepath}.{os.getpid()}.tmp'
+    try:
+        with open(temp_path, 'w') as output_file:
+            output_file.write(encoded)
+        # the file keeps its permissions
+        if os.path.exists(filepath):
+            shutil.copymode(filepath, temp_path)
+        os.replace(temp_path, filepath)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def build(metis, name):
+    "Builds one of the lazy indices of Metis, right away."
+
+    index, items = metis.start_build(name)
+    index.rebuild(items)
+    metis.finish_build(name, index)
+
+def find_book(metis, book):
+    "Returns the item of the uid or full name, raising CommandError if there is none."
+
+    if book.isdigit() and int(book) in metis.collection:
+        return metis.collection[int(book)]
+
+    uid = metis.indices.get(book.lower())
+    if uid is None:
+        raise CommandError(f'There is no book {book!r}.')
+    return metis.collection[uid]
+
+def book_data(item):
+    "Returns the (field, value) pairs of the item, as written in .json and .csv files."
+
+    data = { field : getattr(item, field) for field in BOOK_FIELDS }
+    data['genre'] = sorted(data['genre'])
+    return data
+
+def book_json(item):
+    "Returns the data of the item with its uid, as printed by search --json."
+
+    return dict(uid=item.get_uid(), **book_data(item))
+
+def get_stats(metis):
+    "Returns the number of books and the genres of the reading list."
+
+    from collections import Counter
+
+    genres = Counter(genre for item in metis.collection.values() for genre in item.genre)
+    return {
+        'books' : len(metis.collection),
+        'unread' : sum(item.available for item in metis.collection.values()),
+        'requestable' : len(metis.availables),
+        'genres' : dict(genres.most_common()),
+        'recently_read' : list(metis.recently_read_genre),
+        'filter' : sorted(metis.filter),
+    }
+
+def describe(item):
+    return f'{item.get_uid()}\t{item.format_book()}\t{"unread" if item.available else "read"}'
+
+# ----- Importing and Exporting ----- #
+
+def read_books(filepath):
+    """
+    Yields the data of the books of a .metis, .json or .csv file.
+
+    Rationale: A .json file is either a reading list or a list
+        of books, as written by export. A .csv file has a header
+        with (some of) BOOK_FIELDS, and its genres are separated
+        by GENRE_SEPARATOR.
+
+    Return Value : generator
+        - dicts of the data of new ReadingListItems
+    """
+
+    extension = os.path.splitext(filepath)[1].lower()
+    if extension == '.csv':
+        import csv
+
+        with open(filepath, 'r', newline='') as data_file:
+            for row in csv.DictReader(data_file):
+                data = { field : value for field, value in row.items() if field in BOOK_FIELDS and value }
+                if not data.get('title'):
+                    raise CommandError(f'{filepath} has a book without a title.')
+                data['genre'] = [ genre.strip() for genre in data.get('genre', '').split(GENRE_SEPARATOR) if genre.strip() ]
+                data['available'] = data.get('available', 'true').strip().lower() not in ('false', '0', 'no')
+                yield data
+        return
+
+    import json
+    from utils.ReadingListItem import ReadingListItem
+    from utils.SaveFile import SaveFile
+
+    with open(filepath, 'r') as data_file:
+        loaded = json.loads(data_file.read(), object_hook=SaveFile.decode_collection)
+    books = list(loaded.collection.values()) if isinstance(loaded, SaveFile) else loaded
+    if not isinstance(books, list):
+        raise CommandError(f'{filepath} has no books.')
+
+    for book in books:
+        if isinstance(book, ReadingListItem):
+            book = book_data(book)
+        if not isinstance(book, dict) or not book.get('title'):
+            raise CommandError(f'{filepath} has a book without a title.')
+        yield normalize_book({ field : value for field, value in book.items() if field in BOOK_FIELDS and value is not None }, filepath)
+
+def normalize_book(data, filepath):
+    """
+    Returns the data of a book with the field types of a ReadingListItem.
+
+    Rationale: A .json file may have any JSON value in a field, yet
+        the indices of MetisClass expect strings (e.g. a date of 2001
+        is imported as '2001'). Values that cannot be converted are
+        rejected, like a book without a title.
+    """
+
+    for field in ('title', 'subtitle', 'author', 'date', 'summary'):
+        if field not in data:
+            continue
+        if isinstance(data[field], (dict, list, bool)):
+            raise CommandError(f'{filepath} has a book with an invalid {field}.')
+        data[field] = str(data[field])
+
+    genres = data.get('genre', [])
+    if isinstance(genres, str):
+        genres = [genres]
+    if not isinstance(genres, list) or not all(isinstance(genre, str) for genre in genres):
+        raise CommandError(f'{filepath} has a book with an invalid genre.')
+    data['genre'] = genres
+
+    if not isinstance(data.get('available', True), bool):
+        raise CommandError(f'{filepath} has a book with an invalid available.')
+    return data
+
+def write_books(metis, filepath):
+    "Writes the books (in the order they were added) to a .metis, .json or .csv file."
+
+    extension = os.path.splitext(filepath)[1].lower()
+    if extension == '.metis':
+        save(metis, filepath)
+    elif extension == '.json':
+        write_json([ book_data(item) for item in metis.iter_ordered() ], filepath)
+    elif extension == '.csv':
+        import csv
+
+        with open(filepath, 'w', newline='') as output_file:
+            writer = csv.DictWriter(output_file, fieldnames=BOOK_FIELDS)
+            writer.writeheader()
+            for item in metis.iter_ordered():
+                data = book_data(item)
+                data['genre'] = f'{GENRE_SEPARATOR} '.join(data['genre'])
+                writer.writerow(data)
+    else:
+        raise CommandError(f'Cannot export to {extension or "a file without extension"}; use .metis, .json or .csv.')
+
+# ----- Subcommands ----- #
+# Each prints its result and returns whether it changed
+# the reading list (which must then be saved).
+
+def cmd_request(metis, args):
+    "Requests a book, which is then marked as read."
+
+    item = metis.request_book()
+    if item is None:
+        raise CommandError('No book available.')
+    print(item.format_book())
+    return not args.dry_run
+
+def cmd_add(metis, args):
+    data = { 'title' : args.title, 'genre' : args.genre, 'available' : not args.read }
+    for field in ('subtitle', 'author', 'date', 'summary'):
+        if getattr(args, field) is not None:
+            data[field] = getattr(args, field)
+
+    # MetisClass prints on every insertion
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        item = metis.insert_item(data)
+    if item is None:
+        raise CommandError('The book is already in the reading list.')
+    print(describe(item))
+    return True
+
+def cmd_toggle(metis, args):
+    item = find_book(metis, args.book)
+    metis.toggle(item)
+    print(describe(item))
+    return True
+
+def cmd_import(metis, args):
+    "Adds the books of another file, skipping those already in the reading list."
+
+    if not os.path.exists(args.source):
+        raise CommandError(f'{args.source} does not exist.')
+
+    added = skipped = 0
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        for data in read_books(args.source):
+            if metis.insert_item(data) is None:
+                skipped += 1
+            else:
+                added += 1
+    print(f'Imported {added} books ({skipped} already in the reading list).')
+    return bool(added)
+
+def cmd_export(metis, args):
+    write_books(metis, args.destination)
+    print(f'Exported {len(metis.collection)} books to {args.destination}.')
+    return False
+
+def cmd_stats(metis, args):
+    stats = get_stats(metis)
+    if args.json:
+        import json
+        print(json.dumps(stats, indent=4))
+        return False
+
+    print(f'Books: {stats["books"]}')
+    print(f'Unread: {stats["unread"]} ({stats["requestable"]} can be requested)')
+    print(f'Genres: {", ".join(f"{genre} ({count})" for genre, count in stats["genres"].items()) or "none"}')
+    print(f'Recently read: {", ".join(stats["recently_read"]) or "none"}')
+    print(f'Filter: {", ".join(stats["filter"]) or "none"}')
+    return False
+
+def cmd_search(metis, args):
+    """
+    Prints the books matching the query, best first.
+
+    Rationale: Searches the same way as the App sorted by relevance,
+        including the close matches of a query with typos. The
+        indices are built on the spot, so the fuzzy index is only
+        built if nothing matches.
+    """
+
+    from utils.metis import MetisClass
+
+    metis.search_filter = args.query
+    metis.set_sort(MetisClass.RELEVANCE)
+    build(metis, 'text')
+    found = metis.start_filter_pass().apply()
+    if not found:
+        build(metis, 'fuzzy')
+        found = metis.start_filter_pass().apply()
+    found = found[:args.limit]
+
+    if args.json:
+        import json
+        print(json.dumps([ book_json(item) for item in found ], indent=4))
+    else:
+        for item in found:
+            print(describe(item))
+    return False
+
+def make_parser():
+    parser = argparse.ArgumentParser(prog='python cli.py', description='Uses a Metis reading list without the GUI.')
+    parser.add_argument('filepath', help='the .metis reading list (created if it does not exist)')
+    commands = parser.add_subparsers(dest='command', required=True, metavar='command')
+
+    request = commands.add_parser('request', help='request a book and mark it as read')
+    request.add_argument('--dry-run', action='store_true', help='do not mark the book as read')
+    request.set_defaults(func=cmd_request)
+
+    add = commands.add_parser('add', help='add a book')
+    add.add_argument('title')
+    add.add_argument('--subtitle')
+    add.add_argument('--author')
+    add.add_argument('--date', help='preferably the year it was made')
+    add.add_argument('--summary')
+    add.add_argument('--genre', nargs='+', default=list(), help='the genres of the book')
+    add.add_argument('--read', action='store_true', help='add the book as already read')
+    add.set_defaults(func=cmd_add)
+
+    toggle = commands.add_parser('toggle', help='mark a book as read or unread')
+    toggle.add_argument('book', help='the uid or full name of the book')
+    toggle.set_defaults(func=cmd_toggle)
+
+    import_ = commands.add_parser('import', help='add the books of a .metis, .json or .csv file')
+    import_.add_argument('source')
+    import_.set_defaults(func=cmd_import)
+
+    export = commands.add_parser('export', help='write the books to a .metis, .json or .csv file')
+    export.add_argument('destination')
+    export.set_defaults(func=cmd_export)
+
+    stats = commands.add_parser('stats', help='show the number of books, genres and filters')
+    stats.add_argument('--json', action='store_true', help='print the stats as JSON')
+    stats.set_defaults(func=cmd_stats)
+
+    search = commands.add_parser('search', help='search the books, best matches first')
+    search.add_argument('query')
+    search.add_argument('--limit', type=int, default=10, help='the maximum number of books shown')
+    search.add_argument('--json', action='store_true', help='print the books as JSON')
+    search.set_defaults(func=cmd_search)
+
+    return parser
+
+def main(argv=None):
+    args = make_parser().parse_args(argv)
+
+    try:
+        metis = load(args.filepath)
+        if args.func(metis, args):
+            save(metis, args.filepath)
+    except (CommandError, OSError, ValueError) as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -20,19 +20,25 @@
 #
 # # -------------------------------------------------- # #
 
-import tkinter as tk
-from tkinter import ttk
-from tkinter import messagebox
+# mark the start as early as possible
+from utils.StartupTimer import STARTUP
 
-import json
-import configparser
+with STARTUP.phase('imports'):
+    import tkinter as tk
+    from tkinter import ttk
+    from tkinter import messagebox
 
-# import local modules
-from utils.metis import MetisClass
+    import json
+    import configparser
 
-# import App extension modules
-import _gui
-import _interactions
+    # import local modules
+    from utils.metis import MetisClass
+    from utils.Metrics import METRICS
+    from utils.TaskRunner import TaskCancelled
+
+    # import App extension modules
+    import _gui
+    import _interactions
 
 class App:
     """A class that handles the overall operation of the Metis program."""
@@ -46,8 +52,9 @@ class App:
         """
         
         # load imported methods
-        self.loadModule(_gui)
-        self.loadModule(_interactions)
+        with STARTUP.phase('load_modules'):
+            self.loadModule(_gui)
+            self.loadModule(_interactions)
 
         self.filepath = ''
         self.changed = False    # False at start and after reloading config (save as, load, new) and save
@@ -56,8 +63,10 @@ class App:
         # ------ Initialize the App ----- #
 
         self.Metis = MetisClass()
-        self.initialize_gui()
-        self.initialize_interactions()
+        with STARTUP.phase('initialize_gui'):
+            self.initialize_gui()
+        with STARTUP.phase('initialize_interactions'):
+            self.initialize_interactions()
 
         # ----- Load the config file ----- #
 
@@ -90,13 +99,45 @@ class App:
             It might be possible that the config file is corrupted,
             and if such occurs, the App MUST still load, albeit empty
             and the config file should be fixed.
+
+            Reading and decoding a big reading list takes a while,
+            so the window must NOT wait for it. The heavy lifting is
+            done by self.load_worker in the background (see
+            self.tasks) and the result is applied by self.finish_load.
+        """
+
+        self.show_loading(True)
+        self.tasks.submit(
+            self.load_worker,
+            name='load_app',
+            on_done=self.finish_load,
+            on_error=self.fail_load,
+            on_progress=self.show_loading_progress,
+        )
+
+    def load_worker(self, task):
+        """
+        Reads the config and decodes the recent file (worker thread).
+
+        Rationale: This is the part of loadApp that does not need
+            the GUI. Everything here must be safe to run outside the
+            Tk thread, so the outcome is merely returned for
+            self.finish_load to apply.
+
+        Parameter:
+            task : Task
+                - the handle of the task, for reporting the progress
+
+        Return Value:
+            (filepath, loaded MetisClass, error) : tuple
         """
 
         # Load the config file
 
         config = configparser.ConfigParser()
         try:
-            config.read(App.CONFIG_PATH)
+            with STARTUP.phase('read_config'):
+                config.read(App.CONFIG_PATH)
             filepath = config['recent_file']['path']
         
         # In the case that the config file is corrupted,
@@ -109,9 +150,27 @@ class App:
                 config.write(config_file)
             print('Successfully created config file!')
 
-        # Try to load the filepath
+        # Try to decode the filepath
 
-        did_load = self.load_file_path(filepath)
+        try:
+            loaded = self.read_file_path(filepath, task)
+        except TaskCancelled:
+            raise
+        except Exception as e:
+            return (filepath, None, e)
+        return (filepath, loaded, None)
+
+    def finish_load(self, result):
+        "Applies the result of the load worker on the Tk thread."
+
+        filepath, loaded, error = result
+
+        did_load = error is None
+        if did_load:
+            self.apply_loaded(loaded)
+        else:
+            self.report_load_error(error)
+            self.apply_loaded(None)
         
         if did_load:
             self.filepath = filepath
@@ -123,11 +182,30 @@ class App:
         else:
             # Pseudo self.reload_config_path()
             # This must work in parallel with the actual
+            config = configparser.ConfigParser()
             config['recent_file'] = { 'path' : '' }
             with open(App.CONFIG_PATH, 'w') as config_file:
                 config.write(config_file)
             print('Deleted recent_file path from config')
             self.changed = False
+
+        self.show_loading(False)
+        STARTUP.detail(items=len(self.Metis.collection))
+        STARTUP.mark('data_ready')
+
+    def fail_load(self, error):
+        """
+        Starts from an empty reading list when the load worker fails.
+
+        Rationale: The load worker may still raise (e.g. when the
+            corrupted config file cannot be rewritten). The App
+            MUST still load, so the controls must not stay locked.
+        """
+
+        self.report_load_error(error)
+        self.apply_loaded(None)
+        self.show_loading(False)
+        STARTUP.mark('data_ready')
     
     def attempt_load(self, filepath : str):
         """
@@ -178,33 +256,98 @@ class App:
                 - tells whether an error occured or not.
         """
 
+        try:
+            loaded = self.read_file_path(filepath)
+        except Exception as e:
+            self.report_load_error(e)
+            return False
+
+        self.apply_loaded(loaded)
+        return True
+
+    @METRICS.timed('App.read_file_path')
+    def read_file_path(self, filepath, task=None):
+        """
+        Reads and decodes the filepath into a new MetisClass.
+
+        Rationale: Decoding and building the indices of a big
+            reading list is the slowest part of loading. It does
+            not need the GUI, so it must stay free of any widget
+            access to be usable from a worker thread.
+
+        Parameter:
+            filepath : str
+                - the filepath to be read. An empty filepath
+                  means an empty reading list.
+            task (optional) : Task
+                - if run as a task, the progress is reported to it
+                  and the reading stops once it is cancelled
+
+        Return Value:
+            MetisClass - a fully built backend, not yet shown
+        
+        Raises:
+            FileNotFoundError - if the filepath is invalid
+            TaskCancelled - if the task has been cancelled
+            Exception - if the file is corrupted
+        """
+
+        def progress(text):
+            if task is not None:
+                task.check()
+                task.report(text)
+
+        loaded = MetisClass()
         if filepath:
-            try:
+            progress('Reading the file...')
+            with STARTUP.phase('read_file'):
                 with open(filepath, 'r') as data_file:
                     data = data_file.read()
-                    try:
-                        save_file = json.loads(data, object_hook=self.Dialogs.decoder)
-                        test_load = MetisClass()
-                        test_load.reload(save_file)
-                    except Exception as e:
-                        messagebox.showerror(title='Error', message='File cannot be read.')
-                        print(e)
-                        return False
-                    else:
-                        self.Metis.reload(save_file)
-            except FileNotFoundError:
-                messagebox.showerror(title='Error', message='Invalid config filepath')
-                return False
+            progress('Decoding the reading list...')
+            with STARTUP.phase('decode'):
+                save_file = json.loads(data, object_hook=self.Dialogs.decoder)
+            progress('Indexing the reading list...')
+            with STARTUP.phase('metis_reload'):
+                loaded.reload(save_file)
+        else:
+            loaded.reload()
+        return loaded
 
+    def report_load_error(self, error):
+        "Tells the user why a file cannot be loaded."
+
+        if isinstance(error, FileNotFoundError):
+            messagebox.showerror(title='Error', message='Invalid config filepath')
         else:
+            messagebox.showerror(title='Error', message='File cannot be read.')
+            print(error)
+
+    def apply_loaded(self, loaded):
+        """
+        Shows a freshly read MetisClass in the App.
+
+        Parameter:
+            loaded : MetisClass
+                - the result of self.read_file_path. If None,
+                  an empty reading list is loaded instead.
+        """
+
+        if loaded is None:
             self.Metis.reload()
+        else:
+            self.Metis.adopt(loaded)
 
-        self.Secretary.reload()
-        self.genres.reload()
+        with STARTUP.phase('render_entries'):
+            self.Secretary.reload()
+        with STARTUP.phase('render_genres'):
+            self.genres.reload()
         self.unread_ratio_reload()
+        self.build_search_indices()
+
+        # an in-flight filter pass still holds the previous list
+        if self.filter_job:
+            self.schedule_filter(delay=0)
 
-        return True
-    
     def reload_config_path(self):
         """
         Updates the config and the window.
@@ -233,6 +376,7 @@ class App:
         self.changed = False
     
     def startApp(self):
+        self.window.after_idle(STARTUP.mark, 'first_idle')
         self.window.mainloop()
 
 if __name__ == '__main__':
@@ -0,0 +1,597 @@
+"""
+Metis Server
+
+Shares a reading list over a local HTTP/JSON API, so that several
+people (or scripts) can use it at the same time.
+
+Includes:
+1. class HTTPError - an error response of the API
+2. class SavePool - coalesces the saves of the reading list
+3. class MetisServer - serves a MetisClass over HTTP
+
+Usage (inside the src folder):
+    python server.py LIST.metis [--host 127.0.0.1] [--port 8080]
+        [--save-delay 1.0]
+
+    A --port of 0 lets the system choose a free port, which is
+    printed once the server is up.
+
+Endpoints (JSON in and out):
+    GET   /books[?q=QUERY][&offset=0][&limit=50]
+          - the books shown by the App, matching the query (best first)
+    GET   /books/UID
+    POST  /books                - adds a book, e.g. {"title" : "Dune", "genre" : ["scifi"]}
+    PATCH /books/UID            - edits some fields of a book
+    POST  /books/UID/toggle     - marks a book as read or unread
+    POST  /request              - requests a book, which is marked as read
+    GET   /stats
+
+Rationale:
+    The Tk App keeps the reading list in memory, so only one
+    person can use it at a time. Here, a single MetisClass is
+    shared by every connection instead. The server is a single
+    asyncio event loop, so MetisClass is only ever used by the
+    loop thread. The worker threads (e.g. saving) only read its
+    Snapshots (see utils.Snapshot). Only the standard library
+    is used.
+
+    This module must NOT import tkinter.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import signal
+import sys
+import time
+from contextlib import redirect_stdout
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from cli import BOOK_FIELDS, CommandError, book_data, book_json, load, write_json
+from utils.metis import MetisClass, SortedView
+from utils.Metrics import METRICS
+from utils.SaveFile import SaveFile
+
+MAX_BODY_BYTES = 1 << 20
+DEFAULT_LIMIT = 50
+
+class HTTPError(Exception):
+    "Raised while handling a request to respond with an error."
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+class SavePool:
+    """
+    Saves the reading list at most once per delay, however many changes are made.
+
+    Rationale: Writing a big reading list takes a while, so saving
+        after every change would make the disk the bottleneck. The
+        changes made within the delay are saved together instead,
+        by a worker thread. The worker writes the latest Snapshot
+        of Metis, which the changes made during a save never touch
+        (they are saved next), so nothing is copied beforehand.
+
+    Parameters:
+        metis : MetisClass
+        filepath : str
+        delay (optional) : float
+            - the seconds between a change and its save
+    """
+
+    def __init__(self, metis, filepath, delay=1.0):
+        self.metis = metis
+        self.filepath = filepath
+        self.delay = delay
+
+        self.changes = 0            # the changes not being saved yet
+        self.timer = None
+        self.saving = None          # the save in progress (a Future)
+
+    def changed(self):
+        "Notes a change, which is saved after the delay (loop thread)."
+
+        self.changes += 1
+        if self.timer is None and self.saving is None:
+            self.timer = asyncio.get_running_loop().call_later(self.delay, self._start)
+
+    async def flush(self):
+        "Saves the pending changes right away and waits until they are written."
+
+        while True:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if self.saving is None:
+                if not self.changes:
+                    return
+                self._start()
+            try:
+                await asyncio.shield(self.saving)
+            except Exception:
+                return      # already reported (see self._on_saved)
+
+    def _start(self):
+        self.timer = None
+        snapshot, filter = self.metis.get_snapshot(), set(self.metis.filter)
+        METRICS.count('Server.saves')
+        METRICS.count('Server.saved_changes', self.changes)
+        self.changes = 0
+
+        loop = asyncio.get_running_loop()
+        self.saving = loop.run_in_executor(None, self._write, snapshot, filter)
+        self.saving.add_done_callback(self._on_saved)
+
+    @METRICS.timed('Server.save')
+    def _write(self, snapshot, filter):
+        "Writes the Snapshot (worker thread)."
+
+        data = SaveFile(
+            collection={ book.get_uid() : book for book in snapshot },
+            recently_read=list(snapshot.recently_read),
+            filter=filter,
+        )
+        write_json(data, self.filepath, cls=SaveFile.CollectionEncoder)
+
+    def _on_saved(self, future):
+        self.saving = None
+        if not future.cancelled() and future.exception() is not None:
+            print(f'The reading list cannot be saved: {future.exception()!r}', file=sys.stderr)
+        # the changes made in the meantime
+        if self.changes and self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(self.delay, self._start)
+
+class MetisServer:
+    """
+    Serves a reading list over HTTP.
+
+    Rationale: Every request is turned into an operation on
+        MetisClass, and the operations submitted during a tick
+        of the event loop are run together at the next tick (see
+        self.submit). The requests that arrive together are then
+        answered together, the ones reading the same thing (e.g.
+        searching the same query) share a single result, and their
+        changes are saved together (see SavePool).
+
+        The requests of a batch were sent at the same time (a
+        connection only sends its next request once answered), so
+        any order is a valid one. The changes of a batch are made
+        first, so that its reads all see the same reading list.
+
+        The search indices are built by a worker thread once the
+        server starts. Until then, searching only checks the
+        titles and authors, just like in the App.
+
+    Parameters:
+        filepath : str
+            - the .metis reading list (created if it does not exist)
+        save_delay (optional) : float
+            - see SavePool
+
+    Instance Variables:
+        metis : MetisClass
+        saves : SavePool
+        pending : list
+            - the (is change, operation, args, future) of the
+              operations of the next batch
+        reads : dict
+            - (key, value) pairs of (read, result) of the reads
+              done during the current batch (see self.read)
+    """
+
+    # method : [ (path pattern, name of the operation) ]
+    ROUTES = {
+        'GET' : [
+            (re.compile(r'/books'), 'op_list_books'),
+            (re.compile(r'/books/(\d+)'), 'op_get_book'),
+            (re.compile(r'/stats'), 'op_stats'),
+        ],
+        'POST' : [
+            (re.compile(r'/books'), 'op_add_book'),
+            (re.compile(r'/books/(\d+)/toggle'), 'op_toggle_book'),
+            (re.compile(r'/request'), 'op_request_book'),
+        ],
+        'PATCH' : [
+            (re.compile(r'/books/(\d+)'), 'op_edit_book'),
+        ],
+    }
+
+    def __init__(self, filepath, save_delay=1.0):
+        self.metis = load(filepath)
+        self.metis.set_sort(MetisClass.RELEVANCE)
+        self.saves = SavePool(self.metis, filepath, save_delay)
+
+        self.pending = list()
+        self.reads = dict()
+        self.server = None
+
+    # ----------------------------- #
+    # ------ Public Methods ------- #
+    # ----------------------------- #
+
+    async def start(self, host='127.0.0.1', port=8080):
+        """
+        Starts listening and building the search indices.
+
+        Return Value : int
+            - the port listened to (useful if port is 0)
+        """
+
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        asyncio.get_running_loop().create_task(self.build_indices())
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        "Stops listening and saves the pending changes."
+
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.saves.flush()
+
+    async def build_indices(self):
+        "Builds the search indices (and the first Snapshot) of Metis in a worker thread."
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.metis.get_snapshot)
+        for name in ('text', 'fuzzy'):
+            index, items = self.metis.start_build(name)
+            try:
+                await loop.run_in_executor(None, index.rebuild, items)
+            except Exception as e:
+                self.metis.cancel_build(name, index)
+                print(f'The {name} index cannot be built: {e!r}', file=sys.stderr)
+            else:
+                self.metis.finish_build(name, index)
+
+    def submit(self, operation, *args, changes=False):
+        """
+        Runs operation(*args) with the other operations of this tick.
+
+        Rationale: Handling a request only submits its operation,
+            so all the requests read during a tick of the event loop
+            are queued before any of them is run. The batch is then
+            run in one go, without any await in between, so every
+            operation sees the reading list as the previous one left
+            it.
+
+        Parameters:
+            operation : function
+            changes (optional) : boolean
+                - whether the operation may change the reading list
+
+        Return Value : Future
+            - the return value of the operation
+        """
+
+        future = asyncio.get_running_loop().create_future()
+        if not self.pending:
+            asyncio.get_running_loop().call_soon(self._run_batch)
+        self.pending.append((changes, operation, args, future))
+        return future
+
+    async def handle_connection(self, reader, writer):
+        "Answers the requests of a connection until it is closed."
+
+        try:
+            while True:
+                try:
+                    request = await self.read_request(reader)
+                except HTTPError as e:
+                    self.write_response(writer, e.status, { 'error' : e.message }, keep_alive=False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+
+                method, target, headers, body = request
+                status, payload = await self.dispatch(method, target, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                self.write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def read_request(self, reader):
+        """
+        Reads a request of the connection.
+
+        Return Value:
+            None - if the connection is closed
+            (method, target, headers, body) - otherwise
+        """
+
+        line = await reader.readline()
+        if not line.strip():
+            return None
+        try:
+            method, target, _ = line.decode('latin-1').split()
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'Malformed request line.')
+
+        headers = dict()
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'Invalid Content-Length.')
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, 'The body is too large.')
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), target, headers, body
+
+    async def dispatch(self, method, target, body):
+        """
+        Runs the operation of the request.
+
+        Return Value : (HTTPStatus, JSON-serializable payload)
+        """
+
+        start = time.perf_counter()
+        url = urlsplit(target)
+        try:
+            operation, args = self.route(method, url.path)
+            data = None
+            if body:
+                try:
+                    data = json.loads(body)
+                except ValueError:
+                    raise HTTPError(HTTPStatus.BAD_REQUEST, 'The body is not valid JSON.')
+            query = { key : values[-1] for key, values in parse_qs(url.query).items() }
+            status, payload = await self.submit(getattr(self, operation), *args, query, data, changes=method != 'GET')
+        except HTTPError as e:
+            status, payload = e.status, { 'error' : e.message }
+        except Exception as e:
+            print(f'{method} {target} failed: {e!r}', file=sys.stderr)
+            status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, { 'error' : 'Internal server error.' }
+
+        METRICS.observe(f'Server.{method}', time.perf_counter() - start)
+        return status, payload
+
+    def route(self, method, path):
+        "Returns the (name of the operation, path arguments) of the request."
+
+        path = path.rstrip('/') or '/'
+        for pattern, operation in MetisServer.ROUTES.get(method, ()):
+            match = pattern.fullmatch(path)
+            if match:
+                return operation, tuple(int(group) for group in match.groups())
+
+        for routes in MetisServer.ROUTES.values():
+            if any(pattern.fullmatch(path) for pattern, _ in routes):
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f'{method} is not allowed on {path}.')
+        raise HTTPError(HTTPStatus.NOT_FOUND, f'There is no {path}.')
+
+    @staticmethod
+    def write_response(writer, status, payload, keep_alive=True):
+        status = HTTPStatus(status)
+        body = json.dumps(payload).encode('utf-8')
+        head = (
+            f'HTTP/1.1 {status.value} {status.phrase}\r\n'
+            f'Content-Type: application/json; charset=utf-8\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f'Connection: {"keep-alive" if keep_alive else "close"}\r\n'
+            '\r\n'
+        )
+        writer.write(head.encode('latin-1') + body)
+
+    # ----- Operations ----- #
+    # Each runs in a batch, with the arguments of the path, the
+    # query string and the JSON body, and returns (status, payload).
+
+    def op_list_books(self, query, data):
+        offset = self._get_int(query, 'offset', 0)
+        limit = self._get_int(query, 'limit', DEFAULT_LIMIT)
+        found = self.find(query.get('q', ''))
+        return HTTPStatus.OK, {
+            'total' : len(found),
+            'books' : [ book_json(item) for item in found[offset:offset + limit] ],
+        }
+
+    def op_get_book(self, uid, query, data):
+        return HTTPStatus.OK, book_json(self._get_item(uid))
+
+    def op_stats(self, query, data):
+        return HTTPStatus.OK, self.read('stats', self._get_stats)
+
+    def op_add_book(self, query, data):
+        data = self._parse_book(data)
+        # MetisClass prints on every insertion
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            new_item = self.metis.insert_item(data)
+        if new_item is None:
+            raise HTTPError(HTTPStatus.CONFLICT, 'The book is already in the reading list.')
+        self._changed()
+        return HTTPStatus.CREATED, book_json(new_item)
+
+    def op_edit_book(self, uid, query, data):
+        item = self._get_item(uid)
+        new_data = book_data(item)
+        new_data.update(self._parse_book(data, partial=True))
+        if not self.metis.edit_item(item, new_data):
+            raise HTTPError(HTTPStatus.CONFLICT, 'Another book already has this title, date and author.')
+        self._changed()
+        return HTTPStatus.OK, book_json(item)
+
+    def op_toggle_book(self, uid, query, data):
+        item = self._get_item(uid)
+        self.metis.toggle(item)
+        self._changed()
+        return HTTPStatus.OK, book_json(item)
+
+    def op_request_book(self, query, data):
+        item = self.metis.request_book()
+        if item is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, 'No book available.')
+        self._changed()
+        return HTTPStatus.OK, book_json(item)
+
+    def find(self, query):
+        """
+        Returns the books the App would show for the query, best first.
+
+        Rationale: Searching sets the search filter of Metis, which
+            also decides the books that can be requested. Hence, the
+            search filter (and the available books) are put back
+            as they were, so that Metis never stays filtered.
+        """
+
+        return self.read(('find', query), self._find, query)
+
+    def read(self, key, func, *args):
+        "Returns func(*args), which is only called once per batch for the key."
+
+        if key not in self.reads:
+            self.reads[key] = func(*args)
+        return self.reads[key]
+
+    # ------------------------------ #
+    # ------ Private Methods ------- #
+    # ------------------------------ #
+
+    def _find(self, query):
+        metis = self.metis
+        if not query.strip() and not metis.has_filters():
+            found = SortedView(metis)
+        else:
+            availables = metis.availables
+            metis.search_filter = query
+            try:
+                found = metis.start_filter_pass().apply()
+            finally:
+                metis.search_filter = ''
+                metis.availables = availables
+                metis.fuzzy_matches = dict()
+        return found
+
+    def _get_stats(self):
+        "Same as cli.get_stats, but the counts are kept by the Snapshot."
+
+        stats = self.metis.get_snapshot().stats()
+        stats['requestable'] = len(self.metis.availables)
+        stats['filter'] = sorted(self.metis.filter)
+        return stats
+
+    def _run_batch(self):
+        "Runs every pending operation (see self.submit)."
+
+        batch, self.pending = self.pending, list()
+        self.reads.clear()
+        METRICS.count('Server.batches')
+        METRICS.count('Server.operations', len(batch))
+
+        # the changes first (see the Rationale of the class)
+        batch.sort(key=lambda operation : not operation[0])
+        for _, operation, args, future in batch:
+            if future.cancelled():
+                continue
+            try:
+                future.set_result(operation(*args))
+            except Exception as e:
+                future.set_exception(e)
+        self.reads.clear()
+
+    def _changed(self):
+        "Notes a change of the reading list, which the later reads of the batch must see."
+
+        self.reads.clear()
+        self.saves.changed()
+
+    def _get_item(self, uid):
+        item = self.metis.collection.get(uid)
+        if item is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f'There is no book {uid}.')
+        return item
+
+    @staticmethod
+    def _get_int(query, name, default):
+        try:
+            value = int(query.get(name, default))
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f'{name} must be an integer.')
+        if value < 0:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f'{name} must not be negative.')
+        return value
+
+    @staticmethod
+    def _parse_book(data, partial=False):
+        """
+        Returns the data of a ReadingListItem from the JSON body.
+
+        Parameters:
+            data : dict
+            partial (optional) : boolean
+                - whether the title may be missing (for edits)
+        """
+
+        if not isinstance(data, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'The body must be a JSON object.')
+
+        unknown = set(data) - set(BOOK_FIELDS)
+        if unknown:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f'Unknown fields: {", ".join(sorted(unknown))}.')
+        for field in ('title', 'subtitle', 'author', 'date', 'summary'):
+            if field in data and not isinstance(data[field], str) and not (field == 'subtitle' and data[field] is None):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, f'{field} must be a string.')
+        if 'genre' in data and not (isinstance(data['genre'], list) and all(isinstance(genre, str) for genre in data['genre'])):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'genre must be a list of strings.')
+        if 'available' in data and not isinstance(data['available'], bool):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'available must be true or false.')
+        if not (data.get('title') or partial and 'title' not in data):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'A book needs a title.')
+
+        data = dict(data)
+        if not partial:
+            data.setdefault('genre', list())
+        return data
+
+async def serve(args):
+    metis_server = MetisServer(args.filepath, args.save_delay)
+    port = await metis_server.start(args.host, args.port)
+    print(f'Serving {args.filepath} on http://{args.host}:{port}', flush=True)
+
+    # the pending changes are saved when stopped by SIGTERM as well
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except (NotImplementedError, RuntimeError):
+        pass        # e.g. on Windows
+
+    try:
+        await metis_server.server.serve_forever()
+    finally:
+        await metis_server.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python server.py', description='Shares a Metis reading list over HTTP.')
+    parser.add_argument('filepath', help='the .metis reading list (created if it does not exist)')
+    parser.add_argument('--host', default='127.0.0.1', help='the address to listen to')
+    parser.add_argument('--port', type=int, default=8080, help='the port to listen to (0 for any free port)')
+    parser.add_argument('--save-delay', type=float, default=1.0, help='the seconds between a change and its save')
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    except (CommandError, OSError, ValueError) as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""
+Tests of server.MetisServer, through HTTP on a free local port.
+
+Run inside the src folder with:
+    python -m unittest discover tests
+"""
+
+import asyncio
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from cli import load, write_json
+from server import MetisServer
+from utils.Metrics import METRICS
+from utils.ReadingListItem import ReadingListItem
+from utils.SaveFile import SaveFile
+
+BOOKS = [
+    dict(title='The Hobbit', author='Tolkien', date='1937', genre=['Fantasy']),
+    dict(title='Dune', author='Frank Herbert', date='1965', genre=['Science Fiction']),
+    dict(title='Emma', author='Jane Austen', date='1815', genre=['Romance', 'Classics']),
+]
+
+async def call(port, method, path, body=None):
+    "Sends a single request and returns the (status, JSON payload) of the response."
+
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        data = body if isinstance(body, bytes) else json.dumps(body).encode() if body is not None else b''
+        writer.write(
+            f'{method} {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n'
+            f'Content-Length: {len(data)}\r\n\r\n'.encode('latin-1') + data
+        )
+        await writer.drain()
+
+        status = int((await reader.readline()).split()[1])
+        headers = dict()
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return status, json.loads(await reader.readexactly(int(headers['content-length'])))
+    finally:
+        writer.close()
+
+class MetisServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.filepath = os.path.join(self.folder, 'list.metis')
+        collection = { uid : ReadingListItem(uid=uid, **data) for uid, data in enumerate(BOOKS) }
+        write_json(SaveFile(collection=collection), self.filepath, cls=SaveFile.CollectionEncoder)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def serve(self, test, save_delay=60.0):
+        "Runs test(server, port) against a started MetisServer, and closes it."
+
+        async def run():
+            server = MetisServer(self.filepath, save_delay=save_delay)
+            port = await server.start('127.0.0.1', 0)
+            try:
+                await test(server, port)
+            finally:
+                await server.close()
+        asyncio.run(run())
+
+    def test_books(self):
+        async def test(server, port):
+            output = io.StringIO()
+            with redirect_stdout(output):
+                status, book = await call(port, 'POST', '/books', { 'title' : 'Persuasion', 'author' : 'Jane Austen', 'genre' : ['Romance'] })
+            self.assertEqual(status, 201)
+            self.assertEqual(output.getvalue(), '')
+            self.assertEqual(book['uid'], 3)
+            self.assertTrue(book['available'])
+
+            status, found = await call(port, 'GET', '/books?q=austen')
+            self.assertEqual(status, 200)
+            self.assertEqual(sorted(book['title'] for book in found['books']), ['Emma', 'Persuasion'])
+            status, found = await call(port, 'GET', '/books?offset=1&limit=2')
+            self.assertEqual((found['total'], len(found['books'])), (4, 2))
+
+            status, book = await call(port, 'PATCH', '/books/3', { 'date' : '1817' })
+            self.assertEqual((status, book['date'], book['title']), (200, '1817', 'Persuasion'))
+            status, book = await call(port, 'GET', '/books/3')
+            self.assertEqual(book['date'], '1817')
+
+            status, book = await call(port, 'POST', '/books/3/toggle')
+            self.assertEqual((status, book['available']), (200, False))
+
+            status, stats = await call(port, 'GET', '/stats')
+            self.assertEqual(status, 200)
+            self.assertEqual((stats['books'], stats['unread']), (4, 3))
+            self.assertEqual(stats['genres']['Romance'], 2)
+
+            requested = set()
+            for _ in range(3):
+                status, book = await call(port, 'POST', '/request')
+                self.assertEqual((status, book['available']), (200, False))
+                requested.add(book['uid'])
+            self.assertEqual(requested, {0, 1, 2})
+            status, error = await call(port, 'POST', '/request')
+            self.assertEqual(status, 404)
+
+            status, stats = await call(port, 'GET', '/stats')
+            self.assertEqual((stats['unread'], stats['requestable']), (0, 0))
+        self.serve(test)
+
+    def test_errors(self):
+        async def test(server, port):
+            cases = [
+                ('POST', '/books', b'{"title" :', 400),
+                ('POST', '/books', { 'author' : 'Nobody' }, 400),
+                ('POST', '/books', { 'title' : 'Dune', 'genre' : 'scifi' }, 400),
+                ('POST', '/books', { 'title' : 'Dune', 'pages' : 412 }, 400),
+                ('GET', '/books?limit=many', None, 400),
+                ('GET', '/books/99', None, 404),
+                ('POST', '/books/99/toggle', None, 404),
+                ('GET', '/shelves', None, 404),
+                ('DELETE', '/books/1', None, 405),
+                ('PUT', '/stats', None, 405),
+                ('POST', '/books', { 'title' : 'Dune', 'author' : 'Frank Herbert', 'date' : '1965' }, 409),
+                ('PATCH', '/books/0', { 'title' : 'Dune', 'author' : 'Frank Herbert', 'date' : '1965' }, 409),
+            ]
+            for method, path, body, expected in cases:
+                status, payload = await call(port, method, path, body)
+                self.assertEqual(status, expected, (method, path, body))
+                self.assertIn('error', payload)
+
+            # nothing was changed
+            status, stats = await call(port, 'GET', '/stats')
+            self.assertEqual((stats['books'], stats['unread']), (3, 3))
+        self.serve(test)
+
+    def test_concurrent_requests_share_batches(self):
+        async def test(server, port):
+            METRICS.reset()
+            requests = [ call(port, 'GET', '/stats') for _ in range(20) ]
+            requests += [ call(port, 'POST', f'/books/{uid}/toggle') for uid in range(3) ]
+            responses = await asyncio.gather(*requests)
+
+            self.assertEqual({ status for status, _ in responses }, {200})
+            counters = METRICS.to_dict()['counters']
+            self.assertEqual(counters['Server.operations'], 23)
+            self.assertLess(counters['Server.batches'], 23)
+
+            status, stats = await call(port, 'GET', '/stats')
+            self.assertEqual(stats['unread'], 0)
+        self.serve(test)
+
+    def test_changes_are_saved_on_close(self):
+        async def test(server, port):
+            await call(port, 'POST', '/books', { 'title' : 'Persuasion', 'author' : 'Jane Austen' })
+            await call(port, 'POST', '/books/0/toggle')
+            # far from the save delay
+            self.assertEqual(len(load(self.filepath).collection), 3)
+        self.serve(test, save_delay=60.0)
+
+        metis = load(self.filepath)
+        self.assertEqual(len(metis.collection), 4)
+        self.assertEqual(metis.collection[3].format_book(), 'Persuasion (n.d.) by Jane Austen')
+        self.assertFalse(metis.collection[0].available)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+Tests of utils.SimilarityIndex.
+
+Run inside the src folder with:
+    python -m unittest discover tests
+"""
+
+import unittest
+
+from utils.ReadingListItem import ReadingListItem
+from utils.SimilarityIndex import SimilarityIndex, np
+
+def make_item(uid):
+    return ReadingListItem(uid=uid, title=f'Shadow King {uid}', author='Tolkien', summary='a dark crown of iron', genre=['Fantasy'])
+
+class SimilarityIndexTest(unittest.TestCase):
+
+    def check_removed_last_uid(self, use_numpy):
+        index = SimilarityIndex(use_numpy=use_numpy)
+        index.rebuild(make_item(uid) for uid in range(10))
+        index.add(make_item(100))
+        index.discard(100)
+        # enough books to refresh the norms (see SimilarityIndex.NORM_DRIFT)
+        for uid in range(10, 14):
+            index.add(make_item(uid))
+
+        found = index.similar(0)
+        self.assertEqual(len(found), 10)
+        self.assertNotIn(100, [ uid for uid, _ in found ])
+
+    @unittest.skipIf(np is None, 'NumPy is not installed')
+    def test_removed_last_uid_numpy(self):
+        self.check_removed_last_uid(use_numpy=True)
+
+    def test_removed_last_uid_python(self):
+        self.check_removed_last_uid(use_numpy=False)
+
+    @unittest.skipIf(np is None, 'NumPy is not installed')
+    def test_numpy_matches_python(self):
+        items = [ make_item(uid) for uid in range(50) ]
+        for index, item in enumerate(items):
+            item.config(summary=' '.join(['iron', 'storm', 'garden', 'wolf', 'song'][:index % 5 + 1]))
+        with_numpy, without = SimilarityIndex(use_numpy=True), SimilarityIndex(use_numpy=False)
+        with_numpy.rebuild(items)
+        without.rebuild(items)
+        for uid in (0, 7, 33):
+            expected = without.similar(uid)
+            found = with_numpy.similar(uid)
+            # the ties may be in any order
+            self.assertEqual(len(found), len(expected))
+            for (_, a), (_, b) in zip(found, expected):
+                self.assertAlmostEqual(a, b)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,266 @@
+"""
+Canvas List Handler
+
+Contains the classes of the canvas-drawn reading list.
+
+Includes:
+1. class CanvasEntriesListHandler - the EntriesListHandler that draws
+2. class CanvasRow - the ListEntry drawn as canvas items
+
+Rationale:
+    Each widget row costs a Frame, a Label and their bindings,
+    while a drawn row only costs a rectangle and a text on the
+    canvas of the list. Hovering, clicking and toggling are
+    handled once by the canvas, which finds the row through the
+    item under the pointer.
+
+    The drawn list is an alternative to the widget list, and is
+    used when the METIS_LIST_RENDERER environment variable is
+    set to canvas. Both follow the same interface, so the App
+    does not care which one it has.
+"""
+
+import tkinter as tk
+
+from utils.EntriesListHandler import *
+
+class CanvasRow(ListEntry):
+    """
+    A reading list row drawn as a rectangle and a text.
+
+    Rationale: Apart from how it is drawn, a CanvasRow behaves
+        exactly like a ListEntry, so only the drawing methods
+        are replaced. The row does not bind anything by itself.
+        Instead, the CanvasEntriesListHandler tells it when it
+        is hovered or clicked.
+
+    Parameters:
+        canvas : tk.Canvas
+            - the canvas to draw on. It also owns the dialogs.
+        (the rest are the same as ListEntry)
+    """
+
+    def __init__(self, canvas, genre_suggestions, on_edit, on_delete, on_toggle, item=None, on_similar=None):
+        self._init_state(canvas, genre_suggestions, on_edit, on_delete, on_toggle, on_similar=on_similar)
+        self.canvas = canvas
+
+        # --- Create the Drawing --- #
+
+        self.rect = canvas.create_rectangle(0, 0, 0, 0, fill=ListEntry.COLOR_AVAILABLE, outline='', state='hidden', tags=('row',))
+        self.text = canvas.create_text(0, 0, text='', state='hidden', tags=('row',))
+
+        if item is not None:
+            self.bind_item(item)
+
+    def place(self, x0, y0, x1, y1):
+        "Draws the row inside the given box."
+
+        self.canvas.coords(self.rect, x0, y0, x1, y1)
+        self.canvas.coords(self.text, (x0 + x1) / 2, (y0 + y1) / 2)
+        self.canvas.itemconfig(self.rect, state='normal')
+        self.canvas.itemconfig(self.text, state='normal')
+
+    def hide(self):
+        self.canvas.itemconfig(self.rect, state='hidden')
+        self.canvas.itemconfig(self.text, state='hidden')
+
+    def _set_color(self, color):
+        self.canvas.itemconfig(self.rect, fill=color)
+
+    def _set_text(self, text):
+        self.canvas.itemconfig(self.text, text=text)
+
+    def _on_enter(self, event):
+        self._set_color(ListEntry.COLOR_HOVER_AVAILABLE if self.available else ListEntry.COLOR_HOVER_UNAVAILABLE)
+        self._set_text(f'Edit "{self.item.format_book()}"?')
+        self.hovered = True
+
+    def _on_leave(self, event):
+        if not self.hovered:
+            return
+        self.hovered = False
+
+        self._set_color(ListEntry.COLOR_AVAILABLE if self.available else ListEntry.COLOR_UNAVAILABLE)
+        self._set_text(self.item.format_book())
+
+class CanvasEntriesListHandler(EntriesListHandler):
+    """
+    An EntriesListHandler that draws the rows on a canvas.
+
+    Rationale: The virtualization, the diffing and the scrolling
+        are the same as the EntriesListHandler. Only the rows are
+        different (see CanvasRow). The TOGGLE, SIMILAR and DELETE
+        buttons are drawn once and moved to whichever row is hovered.
+
+        Rows are drawn in the coordinates of the viewport, so the
+        canvas itself must never be scrolled.
+
+    Parameters:
+        master : tk.Canvas
+            - the canvas to draw the list on. Nothing else must
+              be visible on it.
+        (the rest are the same as EntriesListHandler)
+    """
+
+    ENV_FLAG = 'METIS_LIST_RENDERER'
+    ENV_VALUE = 'canvas'
+
+    ACTION_WIDTH = 80
+    ACTION_PADX = 5
+    ACTION_PADY = 6
+    COLOR_ACTION = '#ffffff'
+    COLOR_ACTION_HOVER = '#e5e5e5'
+
+    def __init__(self, window : tk.Tk, master : tk.Canvas, *args, **kwargs):
+        super().__init__(window, master, *args, **kwargs)
+
+        self.rows_by_id = dict()    # canvas item id : CanvasRow
+        self.hovered_row = None
+
+        # --- Draw the Actions --- #
+
+        self.actions = dict()       # action name : (rectangle, text)
+        for name, text in (('toggle', 'TOGGLE'), ('similar', 'SIMILAR'), ('delete', 'DELETE')):
+            tags = ('action', f'action_{name}')
+            rect = master.create_rectangle(0, 0, 0, 0, fill=CanvasEntriesListHandler.COLOR_ACTION, outline='#bdbdbd', state='hidden', tags=tags)
+            label = master.create_text(0, 0, text=text, state='hidden', tags=tags)
+            self.actions[name] = (rect, label)
+
+        # --- Bind the Canvas --- #
+
+        master.bind('<Motion>', self._on_motion, add='+')
+        master.bind('<Leave>', lambda e : self._set_hovered(None), add='+')
+        master.tag_bind('row', '<Button-1>', self._on_click)
+        master.tag_bind('action_toggle', '<Button-1>', lambda e : self.hovered_row and self.hovered_row.item_toggle())
+        master.tag_bind('action_similar', '<Button-1>', lambda e : self.hovered_row and self.hovered_row.show_similar())
+        master.tag_bind('action_delete', '<Button-1>', lambda e : self.hovered_row and self.hovered_row.delete())
+        master.tag_bind('action', '<Enter>', lambda e : self._set_action_color(CanvasEntriesListHandler.COLOR_ACTION_HOVER))
+        master.tag_bind('action', '<Leave>', lambda e : self._set_action_color(CanvasEntriesListHandler.COLOR_ACTION))
+
+    @classmethod
+    def is_requested(cls, environ):
+        "Tells whether the environment asks for the drawn list."
+
+        return environ.get(cls.ENV_FLAG, '').lower() == cls.ENV_VALUE
+
+    def set_viewport(self, height, width=None):
+        if width is not None and width != self.width:
+            # every row must be redrawn with the new width
+            self.positions.clear()
+        super().set_viewport(height, width)
+
+    # ------------------------------ #
+    # ------ Private Methods ------- #
+    # ------------------------------ #
+
+    def _create_toolbar(self):
+        # the actions are drawn instead
+        return None
+
+    def _create_row(self):
+        row = CanvasRow(
+            canvas=self.master,
+            genre_suggestions=self.genre_suggestions,
+            on_edit=self.on_edit,
+            on_delete=self.delete,
+            on_toggle=self.on_toggle,
+            on_similar=self.on_similar,
+        )
+        self.rows_by_id[row.rect] = row
+        self.rows_by_id[row.text] = row
+        return row
+
+    def _place(self, row, uid, index):
+        y = index * EntriesListHandler.ROW_HEIGHT - self.top + EntriesListHandler.ROW_PADY
+        if self.positions.get(uid) == y:
+            return
+        self.positions[uid] = y
+
+        row.place(
+            EntriesListHandler.ROW_PADX,
+            y,
+            self.width - EntriesListHandler.ROW_PADX,
+            y + EntriesListHandler.ROW_HEIGHT - 2 * EntriesListHandler.ROW_PADY,
+        )
+        if row is self.hovered_row:
+            self._place_actions(row)
+
+    def _hide(self, row):
+        if row is self.hovered_row:
+            self._set_hovered(None)
+        row._on_leave(None)
+        row.hide()
+
+    def _row_under_pointer(self):
+        """
+        Returns the row under the pointer.
+
+        Return Value:
+            CanvasRow (if a row is under the pointer)
+            self.hovered_row (if an action is under the pointer)
+            None (otherwise)
+        """
+
+        current = self.master.find_withtag('current')
+        if not current:
+            return None
+        if 'action' in self.master.gettags(current[0]):
+            return self.hovered_row
+        return self.rows_by_id.get(current[0])
+
+    def _set_hovered(self, row):
+        "Moves the hover state (and the actions) to the row."
+
+        if row is self.hovered_row:
+            return
+
+        if self.hovered_row is not None:
+            self.hovered_row._on_leave(None)
+        self.hovered_row = row
+
+        if row is None:
+            self.master.config(cursor='')
+            for rect, label in self.actions.values():
+                self.master.itemconfig(rect, state='hidden', fill=CanvasEntriesListHandler.COLOR_ACTION)
+                self.master.itemconfig(label, state='hidden')
+            return
+
+        self.master.config(cursor='hand2')
+        row._on_enter(None)
+        self._place_actions(row)
+
+    def _place_actions(self, row):
+        "Draws the actions at the right end of the row."
+
+        x0, y0, x1, y1 = self.master.coords(row.rect)
+        width = CanvasEntriesListHandler.ACTION_WIDTH
+        padx = CanvasEntriesListHandler.ACTION_PADX
+        pady = CanvasEntriesListHandler.ACTION_PADY
+
+        right = x1 - padx
+        for name in ('delete', 'similar', 'toggle'):
+            rect, label = self.actions[name]
+            self.master.coords(rect, right - width, y0 + pady, right, y1 - pady)
+            self.master.coords(label, right - width / 2, (y0 + y1) / 2)
+            self.master.itemconfig(rect, state='normal')
+            self.master.itemconfig(label, state='normal')
+            self.master.tag_raise(rect)
+            self.master.tag_raise(label)
+            right -= width + padx
+
+    def _set_action_color(self, color):
+        current = self.master.find_withtag('current')
+        if not current:
+            return
+        tags = self.master.gettags(current[0])
+        for name, (rect, _) in self.actions.items():
+            if f'action_{name}' in tags:
+                self.master.itemconfig(rect, fill=color)
+
+    def _on_motion(self, event):
+        self._set_hovered(self._row_under_pointer())
+
+    def _on_click(self, event):
+        row = self._row_under_pointer()
+        if row is not None:
+            row.edit(event)
@@ -156,7 +156,8 @@ class EditDialog(AddDialog):
         self.ent_author.insert(0, self.item.author)
         self.ent_date.insert(0, self.item.date)
         self.txt_summary.insert('1.0', self.item.summary[:-2])
-        self.genres.load(item.genre if item.genre != None else set())
+        # a copy, since the genres of an item are shared (see GenreBits)
+        self.genres.load(set(item.genre) if item.genre != None else set())
 
         # Add the Misc widgets
         self.frm_misc.columnconfigure(0, weight=1)
@@ -186,7 +187,7 @@ class EditDialog(AddDialog):
             'date': self.item.date,
             'summary': self.item.summary[:-2],
             'available': self.item.available,
-            'genre': self.item.genre.copy() if self.item.genre != None else set()
+            'genre': set(self.item.genre) if self.item.genre != None else set()
         }
 
         self.modal.wait_window()
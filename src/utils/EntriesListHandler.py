@@ -6,7 +6,8 @@ between Metis (backend) and the GUI (frontend).
 
 Includes:
 1. class EntriesListHandler - the major handler
-2. class ListEntry - handler for individual entries
+2. class ListEntry - handler for individual (recyclable) rows
+3. class HoverToolbar - the action buttons shared by the rows
 
 Rationale: 
     To properly modularize the project, the back-end
@@ -19,6 +20,13 @@ Rationale:
     their own data, unless that data is something simple
     like a string or ReadingListItem. Instead, they should
     reference from the back-end and reload instead.
+
+    Reading lists can hold thousands of books, so the list
+    is virtualized: only the rows inside the viewport (plus
+    a small overscan) exist as widgets, and these rows are
+    recycled to show other items as the user scrolls. New
+    row widgets are only created a few at a time (see
+    EntriesListHandler.RENDER_CHUNK).
 """
 
 import tkinter as tk
@@ -27,14 +35,91 @@ from tkinter import messagebox
 
 from utils.DetailDialog import *
 from utils.GenreHandler import *
+from utils.Metrics import METRICS
+
+def is_pointer_inside(widget, x_root, y_root):
+    "Tells whether the pointer is over the widget or any of its descendants."
+
+    under = widget.winfo_containing(x_root, y_root)
+    while under is not None:
+        if under is widget:
+            return True
+        under = under.master
+    return False
+
+class HoverToolbar:
+    """
+    The TOGGLE, SIMILAR and DELETE buttons of the hovered row.
+
+    Rationale: Creating (and destroying) the buttons on every
+        hover is costly when the mouse sweeps over the list. Since
+        only one row can be hovered at a time, a single toolbar is
+        created and moved over whichever row is hovered.
+
+        The toolbar is a sibling of the rows, so moving from a row
+        onto the toolbar counts as leaving the row. Hence, rows
+        must ask self.contains before un-hovering themselves.
+
+    Parameters:
+        master : tk widget
+            - the parent of the rows
+    """
+
+    def __init__(self, master):
+        self.row = None
+
+        self.frame = ttk.Frame(master=master)
+        self.frame.bind('<Leave>', self._on_leave)
+        self.btn_toggle = ttk.Button(master=self.frame, text='TOGGLE', command=self._toggle, cursor='hand2')
+        self.btn_toggle.grid(row=0, column=0, padx=5)
+        self.btn_similar = ttk.Button(master=self.frame, text='SIMILAR', command=self._similar, cursor='hand2')
+        self.btn_similar.grid(row=0, column=1, padx=5)
+        self.btn_delete = ttk.Button(master=self.frame, text='DELETE', command=self._delete, cursor='hand2')
+        self.btn_delete.grid(row=0, column=2, padx=5)
+
+    def show(self, row):
+        "Moves the toolbar over the row and makes it act on the row."
+
+        self.row = row
+        self.frame.place(in_=row.frame, relx=1.0, rely=0.5, x=-5, anchor='e')
+        self.frame.lift()
+
+    def hide(self, row):
+        "Hides the toolbar, if it is still over the row."
+
+        if self.row is not row:
+            return
+        self.row = None
+        self.frame.place_forget()
+
+    def contains(self, x_root, y_root):
+        return self.row is not None and is_pointer_inside(self.frame, x_root, y_root)
+
+    def _toggle(self):
+        if self.row is not None:
+            self.row.item_toggle()
+
+    def _similar(self):
+        if self.row is not None:
+            self.row.show_similar()
+
+    def _delete(self):
+        if self.row is not None:
+            self.row.delete()
+
+    def _on_leave(self, event):
+        if self.row is None or self.contains(event.x_root, event.y_root):
+            return
+        if not is_pointer_inside(self.row.frame, event.x_root, event.y_root):
+            self.row._on_leave(None)
 
 class ListEntry:
     """
     An interactive Frame that represents a reading list item.
     
     The ListEntry serves as the class that creates an individual
-    item in the scrollable reading list, and maintains the methods
-    that specifically modifies the specific item.
+    row in the scrollable reading list, and maintains the methods
+    that specifically modifies the item it currently shows.
 
     Rationale: Each method must be localized as much as possible.
         ALL changes in a specific ReadingListItem must pass
@@ -43,81 +128,138 @@ class ListEntry:
         modifies both the GUI and Metis, Metis will be the
         independent one.
 
+    Events:
+        The row does not bind anything by itself. Instead, its
+        frame and label carry the ListEntry.BINDTAG bindtag, whose
+        events are bound once by the EntriesListHandler and sent
+        to the row under the pointer.
+
     Life Cycle:
-        Whenever a new ReadingListItem is created,
-        the item is passed to the EntriesListHandler. 
-        There, a ListEntry is created. 
+        Rows are owned by the EntriesListHandler, which creates
+        only as many as the viewport can show. Whenever an item
+        scrolls into view, a free row is bound to it through
+        self.bind_item. Whenever it scrolls out of view, the row
+        is hidden and kept for another item.
 
         Whenever the an item is up for the deletion,
-        the ListEntry initiates its deletion by first
-        destroying the GUI, the reference in the parent,
-        and then calling the delete function provided by
-        the back-end.
+        the ListEntry initiates its deletion by calling the
+        delete function provided by the parent handler, which
+        frees the row and then calls the back-end.
     
     Parameters:
         frame : tk.Frame
-            - refers to the parent frame. This will be created by 
+            - refers to the frame of the row. This will be created by 
               the parent handler
-        item : ReadingListItem
-            - the entry that the ListEntry represents
+        item (optional) : ReadingListItem
+            - the entry that the ListEntry initially represents
         on_edit : function
             - function to call after an edit has been made. Preferably,
               this refers to Metis' edit command
         on_delete : function
             - function to call after a delete has been made. Preferable,
-              this refers to Metis' delete command
-        gui_reload : function
-            - function that reloads the parent handler's GUI. Only
-              used to correct some annoying technicalities
+              this refers to the parent handler's delete command
+        on_toggle : function
+            - function to call after a toggle has been made. Preferably,
+              this refers to Metis' toggle command
+        toolbar (optional) : HoverToolbar
+            - the buttons shown while the row is hovered
+        on_similar (optional) : function
+            - function to call with the item to show the books like it
     """
 
+    BINDTAG = 'MetisListEntry'
+
     COLOR_AVAILABLE = "#fdfdfd"
     COLOR_UNAVAILABLE = "#8cffba"
     COLOR_HOVER_AVAILABLE = "#ccecff"
     COLOR_HOVER_UNAVAILABLE = "#41f287"
 
-    def __init__(self, frame, genre_suggestions, on_edit, gui_reload, on_delete, on_toggle, item):
+    def __init__(self, frame, genre_suggestions, on_edit, on_delete, on_toggle, item=None, toolbar=None, on_similar=None):
+        self._init_state(frame, genre_suggestions, on_edit, on_delete, on_toggle, toolbar, on_similar)
+    
+        # --- Create the GUI --- #
+
+        self.frame.config(height=40, background=ListEntry.COLOR_AVAILABLE)
+
+        self.label = tk.Label(master=self.frame, text='', background=self.frame['bg'], width=80)
+        self.label.pack(side=tk.LEFT, expand=True, padx=5, pady=5)
+
+        for widget in self.get_widgets():
+            widget.bindtags((ListEntry.BINDTAG,) + widget.bindtags())
+
+        if item is not None:
+            self.bind_item(item)
+
+    def edit(self, event=None):
+        """
+        Current function of clicking: Edit the entry.
+
+        Rationale: The list keeps running while the dialog is open,
+            so the row may be recycled for another book by then
+            (see self.bind_item). Hence, the book being edited is
+            kept aside, and the row only shows the changes if it
+            still shows that book.
+        """
+
+        item = self.item
+
+        def attempt_submit(data):
+            if not self.on_edit(item, data):
+                messagebox.showerror(message='Book entry already exists')
+                return
+            if self.item is item:
+                self._set_text(item.format_book())
+                if self.available != item.available:
+                    self.toggle()
+            return item
+
+        modal = EditDialog(root=self.frame, item=item, attempt_submit=attempt_submit, suggestions=self.genre_suggestions)
+
+        # Check if delete action should be performed
+        if modal.delete:
+            self.on_delete(item)
+
+    def _init_state(self, frame, genre_suggestions, on_edit, on_delete, on_toggle, toolbar=None, on_similar=None):
+        """
+        Sets up the state of the row, before it is drawn.
+
+        Rationale: Rows drawn differently (e.g. a CanvasRow) share
+            every method that uses this state, so they must all
+            set it up here.
+        """
+
         self.frame = frame
-        self.item = item
-        self.available = item.available
+        self.item = None
+        self.available = True
+        self.hovered = False
         self.genre_suggestions = genre_suggestions
         self.on_edit = on_edit
-        self.gui_reload = gui_reload
         self.on_delete = on_delete
         self.on_toggle = on_toggle
-    
-        # --- Create the GUI --- #
+        self.on_similar = on_similar
+        self.toolbar = toolbar
 
-        def on_click(event):
-            """
-            Current function of clicking: Edit the entry.
-            """
-            
-            def attempt_submit(data):
-                if not self.on_edit(self.item, data):
-                    messagebox.showerror(message='Book entry already exists')
-                else:
-                    self.label.config(text=self.item.format_book())
-                    if self.available != self.item.available:
-                        self.toggle()
-                    return self.item
-
-            modal = EditDialog(root=self.frame, item=self.item, attempt_submit=attempt_submit, suggestions=self.genre_suggestions)
-
-            # Check if delete action should be performed
-            if modal.delete:
-                self.delete()
-                return
+    def get_widgets(self):
+        "Returns the widgets that make up the row."
 
-        self.frame.config(height=40, background=ListEntry.COLOR_AVAILABLE if self.available else ListEntry.COLOR_UNAVAILABLE)
-        self.frame.bind("<Button-1>", on_click)
-        self.frame.bind("<Enter>", self._on_enter)
-        self.frame.bind("<Leave>", self._on_leave)
-        self.frame.pack(fill=tk.X, padx=10, pady=5)
+        return (self.frame, self.label)
 
-        self.label = tk.Label(master=self.frame, text=self.item.format_book(), background=self.frame['bg'], width=80)
-        self.label.bind("<Button-1>", on_click)
-        self.label.pack(side=tk.LEFT, expand=True, padx=5, pady=5)
+    def bind_item(self, item):
+        """
+        Makes the row show another item.
+
+        Rationale: Creating widgets is expensive, so rows are
+            recycled instead. Binding must leave NO trace of the
+            previously shown item.
+        """
+
+        self.item = item
+        self.available = item.available
+        if self.hovered:
+            self._on_enter(None)
+        else:
+            self._set_color(ListEntry.COLOR_AVAILABLE if self.available else ListEntry.COLOR_UNAVAILABLE)
+            self._set_text(self.item.format_book())
     
     def toggle(self):
         """
@@ -130,7 +272,10 @@ class ListEntry:
         """
 
         self.available = not self.available
-        self._set_color(ListEntry.COLOR_AVAILABLE if self.available else ListEntry.COLOR_UNAVAILABLE)
+        if self.hovered:
+            self._set_color(ListEntry.COLOR_HOVER_AVAILABLE if self.available else ListEntry.COLOR_HOVER_UNAVAILABLE)
+        else:
+            self._set_color(ListEntry.COLOR_AVAILABLE if self.available else ListEntry.COLOR_UNAVAILABLE)
     
     def item_toggle(self):
         """
@@ -144,31 +289,50 @@ class ListEntry:
         self.on_toggle(self.item)
     
     def delete(self):
-        "Deletes the GUI first and calls for its item to be deleted backend afterwards."
+        "Calls for its item to be deleted (GUI first, then backend)."
 
-        self.frame.destroy()
-        self.gui_reload()
         self.on_delete(self.item)
+
+    def show_similar(self):
+        "Calls for the books like its item to be shown."
+
+        if self.on_similar is not None:
+            self.on_similar(self.item)
     
     def _set_color(self, color):
         self.frame.config(bg=color)
         self.label.config(bg=color)
 
+    def _set_text(self, text):
+        self.label.config(text=text)
+
     def _on_enter(self, event):
         self._set_color(ListEntry.COLOR_HOVER_AVAILABLE if self.available else ListEntry.COLOR_HOVER_UNAVAILABLE)
-        self.label.config(text=f'Edit "{self.item.format_book()}"?')
+        self._set_text(f'Edit "{self.item.format_book()}"?')
 
-        self.frm_btn = ttk.Frame(master=self.frame)
-        self.frm_btn.pack(side=tk.RIGHT)
-        self.btn_toggle = ttk.Button(master=self.frm_btn, text='TOGGLE', command=self.item_toggle, cursor='hand2')
-        self.btn_toggle.grid(row=0, column=0, padx=5)
-        self.btn_delete = ttk.Button(master=self.frm_btn, text='DELETE', command=self.delete, cursor='hand2')
-        self.btn_delete.grid(row=0, column=1, padx=5)
+        if self.hovered:
+            return
+        self.hovered = True
+
+        if self.toolbar is not None:
+            self.toolbar.show(self)
     
     def _on_leave(self, event):
+        if not self.hovered:
+            return
+
+        # moving onto the label or the toolbar does not count as leaving
+        if event is not None:
+            if is_pointer_inside(self.frame, event.x_root, event.y_root):
+                return
+            if self.toolbar is not None and self.toolbar.contains(event.x_root, event.y_root):
+                return
+        self.hovered = False
+
         self._set_color(ListEntry.COLOR_AVAILABLE if self.available else ListEntry.COLOR_UNAVAILABLE)
-        self.label.config(text=self.item.format_book())
-        self.frm_btn.destroy()
+        self._set_text(self.item.format_book())
+        if self.toolbar is not None:
+            self.toolbar.hide(self)
 
 class EntriesListHandler:
     """
@@ -183,22 +347,33 @@ class EntriesListHandler:
         the methods in modifying the data (at the back-end side),
         the EntriesListHandler (or Secretary), will provide those
         methods to the specific components that will need them.
+
+        The list is virtualized. The Secretary only remembers
+        which items are showable (self.showable) and how far the
+        list has been scrolled (self.top). Rows are placed inside
+        the master according to their index, so the master must
+        have the size of the viewport and must NOT be scrolled
+        by anything else. Instead, scrollbars and mousewheels must
+        go through self.yview, similar to a scrollable tk widget.
     
     Parameters:
         window : tk.Tk
             - refers to the root of the application
         master : tk.Frame
-            - the parent frame of the reading list GUI
+            - the parent frame of the reading list GUI. It serves as
+              the viewport of the list.
         collection
-            - reference to the backend collections
+            - reference to the backend collections, iterated in the
+              order the entries must be shown
         genre_suggestions
             - reference to the current genre collection
-        binding : function
-            - function for recursive binding to give every widget 
-              a particular property
         canvas_reloader : function
-            - an annoying, but necessary function to force update 
-              the scrollbar
+            - an annoying, but necessary function to update the
+              visibility of the scrollbar
+        yscrollcommand (optional) : function
+            - function that receives the (first, last) fractions of
+              the visible part of the list. Preferably, this refers to
+              the scrollbar's set command
         on_edit : function
             - function to call whenever an entry is updated. 
               Preferably, on_edit refers to Metis' edit command
@@ -209,11 +384,28 @@ class EntriesListHandler:
             - boolean function that takes in item and returns 
               whether the item is available or not. Preferable, is_available
               refers to Metis' is_showable method
+        on_similar (optional) : function
+            - function to call with an item whose similar books
+              must be shown
     """
 
-    def __init__(self, window : tk.Tk, master : ttk.Frame, collection, genre_suggestions, binding, canvas_reloader, on_edit, on_delete, on_toggle, is_available):
-        self.item_list = dict()
-        self.frame_list = dict()
+    ROW_HEIGHT = 50     # the row (40) and its vertical padding (5 + 5)
+    ROW_PADX = 10
+    ROW_PADY = 5
+    OVERSCAN = 3        # rows rendered beyond each edge of the viewport
+    RENDER_CHUNK = 8    # row widgets created per idle callback
+
+    def __init__(self, window : tk.Tk, master : ttk.Frame, collection, genre_suggestions, canvas_reloader, on_edit, on_delete, on_toggle, is_available, yscrollcommand=None, on_similar=None):
+        self.item_list = dict()     # uid : ListEntry of the rendered rows
+        self.rows_by_widget = dict()    # widget path : ListEntry of every row
+        self.positions = dict()     # uid : y of the rendered rows
+        self.pool = list()          # rows that are not showing anything
+        self.showable = list()
+
+        self.top = 0
+        self.viewport = 0
+        self.width = 0
+        self.render_job = None
 
         self.window = window
         self.master = master
@@ -221,15 +413,23 @@ class EntriesListHandler:
         self.collection = collection
         self.genre_suggestions = genre_suggestions
 
-        self.recursive_binding = binding
         self.reload_canvas = canvas_reloader
+        self.yscrollcommand = yscrollcommand
         self.is_available = is_available
 
         self.on_edit = on_edit
         self.on_delete = on_delete
         self.on_toggle = on_toggle
+        self.on_similar = on_similar
 
-    def load(self):
+        self.toolbar = self._create_toolbar()
+
+        # the events of every row are bound once (see ListEntry)
+        self.window.bind_class(ListEntry.BINDTAG, '<Button-1>', self._on_row_event('edit'))
+        self.window.bind_class(ListEntry.BINDTAG, '<Enter>', self._on_row_event('_on_enter'))
+        self.window.bind_class(ListEntry.BINDTAG, '<Leave>', self._on_row_event('_on_leave'))
+
+    def load(self, showable=None):
         """
         Loads the items that are available.
 
@@ -242,75 +442,78 @@ class EntriesListHandler:
             to ensure that methods that call self.load work as expected.
 
         Pre-requisites:
-            - self.frame_list must be empty
-            - self.item_list must be empty
             - self.collection reflects the current data
             - self.is_available reflects the current filter function
+
+        Parameter:
+            showable (optional) : list or SortedView
+                - the showable items, if already computed elsewhere
+                  (e.g. by a FilterPass). This skips the filtering.
+                  It is used as is (NOT copied), so it must not be
+                  shared with anything that modifies it.
         """
         
-        for item in filter(self.is_available, self.collection):
-            self.insert(item)
+        if showable is None:
+            self.showable = list(filter(self.is_available, self.collection))
+            METRICS.count('Secretary.items_scanned', len(self.collection))
+        else:
+            self.showable = showable
+        self.gui_reload()
+
+        METRICS.gauge('Secretary.rows', len(self.item_list) + len(self.pool))
     
     def unload(self):
         """
-        Deletes all the GUI aspect of the entries.
+        Hides all the GUI aspect of the entries.
         
         Rationale: Unload basically resets the EntryListHandler
             to a fresh state. As such, no unnecessary data must
             be left after calling self.unload. This is to ensure
             that other methods that call self.unload work as expected.
+            The rows themselves are kept for recycling.
         """
 
-        for item in self.frame_list.values():
-            item.destroy()
-        self.item_list = dict()
-        self.frame_list = dict()
-        self.gui_reload()
+        for uid in list(self.item_list):
+            self._release(uid)
+        self.showable = list()
+        self.top = 0
 
     def gui_reload(self):
-        "Some annoying GUI technicalities to force a redrawing."
-
-        # Some GUI techninal sht
-        frm_temp = ttk.Frame(self.master)
-        frm_temp.pack()
-        self.window.update()
-        frm_temp.destroy()
-        self.window.update()
-        self.window.update_idletasks()
+        "Renders the rows of the viewport and updates the scrollbar."
+
+        self._clamp()
+        self._render()
+        self._update_scrollbar()
         self.reload_canvas()
     
-    def reload(self):
+    @METRICS.timed('Secretary.reload')
+    def reload(self, showable=None):
         """
-        Reloads and recreates the GUI-aspect of the entries.
+        Reloads the GUI-aspect of the entries.
 
         Rationale: Whenever the data is manipulated on a collective
             level, it is better for the GUI to reload instead of
-            updating each one of the entries. As much as possible,
-            rely on the independency of self.unload and self.load.
+            updating each one of the entries. However, most reloads
+            (e.g. every search keystroke) only change a few of the
+            rendered rows. Hence, the rows are NOT recreated. Instead,
+            self.load recomputes the showable items and self._render
+            reconciles the rendered rows with them by uid.
+
+        Parameter:
+            showable (optional) : list
+                - see self.load
         """
         
-        self.unload()
-        self.load()
-
-    def insert(self, item):
-        "Creates and inserts a ListEntry based on the item."
-
-        self.frame_list[item.get_uid()] = tk.Frame(self.master, cursor='hand2')
-        self.item_list[item.get_uid()] = ListEntry(
-            frame=self.frame_list[item.get_uid()], 
-            genre_suggestions=self.genre_suggestions,
-            on_edit=self.on_edit, 
-            gui_reload=self.gui_reload, 
-            on_delete=self.delete, 
-            on_toggle=self.on_toggle,
-            item=item
-        )
+        self.load(showable)
 
-        self.window.update()
+    def insert(self, item, position=None):
+        "Adds the item at the position (or the end) of the list and shows it if visible."
 
-        # some shz on scrollbar
-        self.recursive_binding(self.frame_list[item.get_uid()])
-        self.reload_canvas()
+        if position is None:
+            self.showable.append(item)
+        else:
+            self.showable.insert(position, item)
+        self.gui_reload()
     
     def delete(self, item):
         """
@@ -326,16 +529,218 @@ class EntriesListHandler:
             - the item must still be present at the backend
         
         Result: 
-            - the GUI will be destroyed (non-reversable)
+            - the row will be freed (the item is not shown anymore)
             - the item will be deleted from the backend (non-reversable)
         """
 
-        del self.frame_list[item.get_uid()]
-        del self.item_list[item.get_uid()]
+        if item.get_uid() in self.item_list:
+            self._release(item.get_uid())
+        if item in self.showable:
+            self.showable.remove(item)
         self.on_delete(item)
+
+        # after the backend, since the showable items may follow it (see SortedView)
+        self.gui_reload()
     
     def toggle(self, item_uid):
         "An intermediary method for toggling."
 
-        self.item_list[item_uid].toggle()
-    
+        if item_uid in self.item_list:
+            self.item_list[item_uid].toggle()
+
+    def get_height(self):
+        "Returns the height (in pixels) of the whole list."
+
+        return len(self.showable) * EntriesListHandler.ROW_HEIGHT
+
+    def set_viewport(self, height, width=None):
+        "Tells the Secretary the size of the visible part of the list."
+
+        self.viewport = height
+        if width is not None:
+            self.width = width
+        self.gui_reload()
+
+    def yview(self, *args):
+        """
+        Scrolls the list, following the protocol of tk's yview.
+
+        Usage:
+            yview('moveto', fraction)
+            yview('scroll', number, 'units' or 'pages')
+        """
+
+        if not args:
+            return self._fractions()
+
+        if args[0] == 'moveto':
+            self.top = int(float(args[1]) * self.get_height())
+        elif args[0] == 'scroll':
+            number, what = int(args[1]), args[2]
+            step = EntriesListHandler.ROW_HEIGHT if what == 'units' else max(EntriesListHandler.ROW_HEIGHT, self.viewport - EntriesListHandler.ROW_HEIGHT)
+            self.top += number * step
+
+        self._clamp()
+        self._render()
+        self._update_scrollbar()
+
+    # ------------------------------ #
+    # ------ Private Methods ------- #
+    # ------------------------------ #
+
+    def _clamp(self):
+        "Keeps the scroll offset within the list."
+
+        self.top = max(0, min(self.top, self.get_height() - self.viewport))
+
+    def _fractions(self):
+        "Returns the (first, last) fractions of the visible part of the list."
+
+        height = self.get_height()
+        if not height or height <= self.viewport:
+            return (0.0, 1.0)
+        return (self.top / height, min(1.0, (self.top + self.viewport) / height))
+
+    def _update_scrollbar(self):
+        if self.yscrollcommand:
+            self.yscrollcommand(*self._fractions())
+
+    def _visible_range(self, overscan=OVERSCAN):
+        "Returns the (first, last) indices of the showable items that must be rendered."
+
+        row_height = EntriesListHandler.ROW_HEIGHT
+        first = max(0, self.top // row_height - overscan)
+        last = min(len(self.showable), (self.top + self.viewport) // row_height + 1 + overscan)
+        return first, last
+
+    def _render(self):
+        """
+        Makes the rows show the items of the visible range.
+
+        Rationale: Only the rows of the viewport exist. The rendered
+            rows are keyed by uid, so rendering is a diff between
+            the rendered uids and the uids of the visible range:
+                - leaving rows are hidden and kept for recycling
+                - entering rows are bound from the recycled rows
+                - staying rows are untouched, except for moving
+                  them when their position changed
+
+            Creating a row widget is the only costly part, so at most
+            RENDER_CHUNK rows are created per call, starting with the
+            ones inside the viewport. The rest are created in the next
+            idle callbacks (see self._render_chunk), letting Tk draw
+            and handle events in between.
+        """
+
+        first, last = self._visible_range()
+        inner_first, inner_last = self._visible_range(overscan=0)
+        wanted = { item.get_uid() for item in self.showable[first:last] }
+
+        leaving = [ uid for uid in self.item_list if uid not in wanted ]
+        for uid in leaving:
+            self._release(uid)
+
+        # the rows inside the viewport come first (the sort is stable)
+        order = sorted(range(first, last), key=lambda index : not inner_first <= index < inner_last)
+
+        entering = created = 0
+        for index in order:
+            item = self.showable[index]
+            uid = item.get_uid()
+            row = self.item_list.get(uid)
+            if row is None:
+                if not self.pool:
+                    if created >= EntriesListHandler.RENDER_CHUNK:
+                        self._schedule_render()
+                        continue
+                    created += 1
+                row = self.item_list[uid] = self._acquire()
+                row.bind_item(item)
+                entering += 1
+            elif row.item is not item:
+                # same uid but a new object (e.g. another file was loaded)
+                row.bind_item(item)
+            self._place(row, uid, index)
+
+        METRICS.count('Secretary.rows_entering', entering)
+        METRICS.count('Secretary.rows_leaving', len(leaving))
+        METRICS.count('Secretary.rows_created', created)
+
+    def _schedule_render(self):
+        "Renders the rows left out by self._render once Tk is idle."
+
+        if self.render_job is None:
+            self.render_job = self.window.after_idle(self._render_chunk)
+
+    def _render_chunk(self):
+        self.render_job = None
+        self._render()
+
+    def _place(self, row, uid, index):
+        "Places the row of the uid at the position of the index, if not yet there."
+
+        y = index * EntriesListHandler.ROW_HEIGHT - self.top + EntriesListHandler.ROW_PADY
+        if self.positions.get(uid) == y:
+            return
+        self.positions[uid] = y
+
+        row.frame.place(
+            x=EntriesListHandler.ROW_PADX,
+            y=y,
+            relwidth=1.0,
+            width=-2 * EntriesListHandler.ROW_PADX,
+            height=EntriesListHandler.ROW_HEIGHT - 2 * EntriesListHandler.ROW_PADY,
+        )
+
+    def _acquire(self):
+        "Returns a free row, creating one if there is none."
+
+        if self.pool:
+            return self.pool.pop()
+        return self._create_row()
+
+    def _create_toolbar(self):
+        "Creates the toolbar shared by the rows."
+
+        return HoverToolbar(self.master)
+
+    def _create_row(self):
+        "Creates a new (unbound) row."
+
+        frame = tk.Frame(self.master, cursor='hand2')
+        row = ListEntry(
+            frame=frame, 
+            genre_suggestions=self.genre_suggestions,
+            on_edit=self.on_edit, 
+            on_delete=self.delete, 
+            on_toggle=self.on_toggle,
+            toolbar=self.toolbar,
+            on_similar=self.on_similar,
+        )
+
+        for widget in row.get_widgets():
+            self.rows_by_widget[str(widget)] = row
+        return row
+
+    def _on_row_event(self, method_name):
+        "Returns the class binding that calls the method of the row of the event."
+
+        def handler(event):
+            row = self.rows_by_widget.get(str(event.widget))
+            if row is not None and row.item is not None:
+                getattr(row, method_name)(event)
+        return handler
+
+    def _release(self, uid):
+        "Hides the row of the uid and keeps it for recycling."
+
+        row = self.item_list.pop(uid)
+        self.positions.pop(uid, None)
+        self._hide(row)
+        self.pool.append(row)
+
+    def _hide(self, row):
+        "Hides a row, leaving no hover state behind."
+
+        row._on_leave(None)
+        row.frame.place_forget()
@@ -7,6 +7,7 @@ import json
 
 from utils.EntriesListHandler import EntriesListHandler
 from utils.metis import MetisClass, ReadingListItem
+from utils.Metrics import METRICS
 
 class FileDialogHandler:
     """Handles the creation and management of dialog boxes."""
@@ -24,54 +25,29 @@ class FileDialogHandler:
         return wrapper
 
     @ask_confirmation
-    def cmd_load_list(self):
-        "Loads a valid metis file and returns the filepath and the decoded data"
+    def ask_load_filepath(self):
+        "Asks for a metis file to load and returns its filepath ('' if none)."
 
-        filepath = askopenfilename(
+        return askopenfilename(
             filetypes=[('Metis Files', '*.metis'), ('All Files', '*.*')]
         )
 
-        if not filepath:
-            return None
+    def ask_save_filepath(self):
+        "Asks where to save the metis file and returns the filepath ('' if none)."
 
-        with open(filepath, 'r') as data_file:
-            data = data_file.read()
-            try:
-                save_file = json.loads(data, object_hook=self.decoder)
-            except Exception as e:
-                messagebox.showerror(title='Error', message='Cannot read file.')
-                print(e)
-                return None
-        
-        res = {'filepath' : filepath, 'save_file' : save_file} 
-        return res
-        
-    def cmd_save_list(self, data):
-        """
-        Creates a metis file of the reading list and returns the filepath.
-        
-        Parameter:
-            data : SaveFile
-
-        Return value
-            filepath : str (if success)
-                - filepath of the created metis file
-        """
-
-        filepath = asksaveasfilename(
+        return asksaveasfilename(
             defaultextension='mts',
             filetypes=[('Metis Files', '*.metis'), ('All Files', '*.*')],
         )
-        if not filepath:
-            return
-        
-        filepath = self.save_file(data, filepath)
-        
-        return filepath
-    
+
+    @METRICS.timed('Dialogs.save_file')
     def save_file(self, data, filepath):
         """
         Saves a metis file, given the data and filepath.
+
+        The data is encoded (once) before the file is opened, so
+        a failed encoding leaves the previous file untouched. This
+        does not need the GUI, so it may run in a worker thread.
         
         Paramters:
             data : SaveFile
@@ -82,12 +58,12 @@ class FileDialogHandler:
             '' : str (if fail)
         """
 
+        try:
+            encoded = json.dumps(data, indent=4, cls=self.encoder)
+        except Exception as e:
+            print(e)
+            return ''
+
         with open(filepath, 'w') as output_file:
-            try:
-                attempt_save = json.dumps(data, indent=4, cls=self.encoder)
-            except Exception as e:
-                print(e)
-                return ''
-            else:
-                json.dump(data, output_file, indent=4, cls=self.encoder)
-                return filepath
+            output_file.write(encoded)
+        return filepath
@@ -0,0 +1,244 @@
+"""
+Fuzzy Index
+
+Contains the class for finding books despite typos in the search.
+
+Includes:
+1. class FuzzyIndex - a trigram index of the words of the titles and authors
+
+Rationale:
+    Searching only finds the books whose text contains the query,
+    so a single typo (e.g. "Tolkein") finds nothing. Comparing the
+    query to the words of every book by edit distance is too slow
+    to be done on every search. Instead, each distinct word is
+    indexed by its trigrams (its substrings of 3 characters), and
+    a typo only changes a few of them. Hence, only the words that
+    share enough trigrams with a query word are compared with it.
+"""
+
+import re
+import unicodedata
+from collections import Counter
+
+class FuzzyIndex:
+    """
+    Finds the books whose words are a few typos away from a query.
+
+    Rationale: Words are normalized (case-folded, without accents),
+        so "Bronte" finds "Brontë" without any typo. Every query
+        word must be close to a word of the book, and the books are
+        ranked by the total number of typos.
+
+        A word may only have a few typos relative to its length
+        (see self.max_distance). Short words and numbers must be
+        exact, since too many words are a typo away from them.
+
+    Usage:
+        index = FuzzyIndex()
+        index.rebuild(metis.collection.values())
+        index.search('tolkein hobit', k=10)     # [(uid, typos), ...]
+
+    Instance Variables:
+        postings : dict
+            - (key, value) pairs of (word, set of uids with the word)
+        grams : dict
+            - (key, value) pairs of (trigram, set of words with it)
+    """
+
+    FIELDS = ('title', 'author')
+    WORD_PATTERN = re.compile(r'[^\W_]+')
+
+    # (minimum length, typos allowed) from the longest
+    DISTANCES = ((9, 2), (5, 1))
+
+    def __init__(self):
+        self.postings = dict()
+        self.grams = dict()
+        self.words = dict()         # uid : the distinct words of the book
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, uid):
+        return uid in self.words
+
+    # ----------------------------- #
+    # ------ Public Methods ------- #
+    # ----------------------------- #
+
+    @classmethod
+    def normalize(cls, text):
+        "Returns the case-folded words of the text, without accents."
+
+        if not text:
+            return list()
+        text = unicodedata.normalize('NFKD', text.casefold())
+        text = ''.join(char for char in text if not unicodedata.combining(char))
+        return cls.WORD_PATTERN.findall(text)
+
+    @staticmethod
+    def max_distance(word):
+        "Returns the number of typos allowed in the word."
+
+        # numbers (e.g. volumes) are either right or wrong
+        if word.isdigit():
+            return 0
+        for length, distance in FuzzyIndex.DISTANCES:
+            if len(word) >= length:
+                return distance
+        return 0
+
+    @staticmethod
+    def trigrams(word):
+        "Returns the trigrams of the word, whose ends are padded."
+
+        padded = f'${word}$'
+        return [ padded[i:i + 3] for i in range(len(padded) - 2) ]
+
+    def rebuild(self, items):
+        "Indexes the items from scratch."
+
+        self.postings.clear()
+        self.grams.clear()
+        self.words.clear()
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        uid = item.get_uid()
+        if uid in self.words:
+            self.discard(uid)
+
+        words = set()
+        for field in FuzzyIndex.FIELDS:
+            words.update(self.normalize(getattr(item, field, None)))
+
+        postings = self.postings
+        for word in words:
+            uids = postings.get(word)
+            if uids is None:
+                uids = postings[word] = set()
+                for gram in self.trigrams(word):
+                    self.grams.setdefault(gram, set()).add(word)
+            uids.add(uid)
+        self.words[uid] = tuple(words)
+
+    def discard(self, uid):
+        words = self.words.pop(uid, None)
+        if words is None:
+            return
+
+        for word in words:
+            uids = self.postings[word]
+            uids.discard(uid)
+            if uids:
+                continue
+            del self.postings[word]
+            for gram in self.trigrams(word):
+                bucket = self.grams[gram]
+                bucket.discard(word)
+                if not bucket:
+                    del self.grams[gram]
+
+    def update(self, item):
+        "Re-indexes an (edited) item."
+
+        self.add(item)
+
+    def close_words(self, word):
+        """
+        Returns the indexed words within the typos allowed in the word.
+
+        Rationale: A typo changes at most 4 of the trigrams of a word
+            (a swap of two letters), so the words with fewer trigrams
+            in common cannot be close enough, and are never compared.
+            The words allowed a typo are long enough for this to
+            leave at least 1 trigram in common.
+
+        Return Value : dict
+            - (key, value) pairs of (word, number of typos)
+        """
+
+        distance = self.max_distance(word)
+        if not distance:
+            return { word : 0 } if word in self.postings else dict()
+
+        grams = set(self.trigrams(word))
+        shared = Counter()
+        for gram in grams:
+            bucket = self.grams.get(gram)
+            if bucket:
+                shared.update(bucket)
+
+        needed = len(grams) - 4 * distance
+        found = dict()
+        for other, count in shared.items():
+            if count < needed or abs(len(other) - len(word)) > distance:
+                continue
+            typos = self.distance(word, other, distance)
+            if typos <= distance:
+                found[other] = typos
+        return found
+
+    def search(self, query, k=None):
+        """
+        Returns the books close to every word of the query, best first.
+
+        Parameters:
+            query : str
+            k (optional) : int
+                - the maximum number of results
+
+        Return Value : list
+            - (uid, number of typos) pairs, the fewest typos first
+        """
+
+        postings = self.postings
+        close = [ self.close_words(word) for word in dict.fromkeys(self.normalize(query)) ]
+        # the rarest words first, so the candidates shrink the fastest
+        close.sort(key=lambda words : sum(len(postings[word]) for word in words))
+
+        found = None
+        for words in close:
+            typos = dict()      # uid : the fewest typos of its words
+            for other, distance in words.items():
+                for uid in postings[other] if found is None else found.keys() & postings[other]:
+                    if typos.get(uid, distance + 1) > distance:
+                        typos[uid] = distance
+            if found is not None:
+                typos = { uid : distance + found[uid] for uid, distance in typos.items() }
+            found = typos
+            if not found:
+                break
+
+        ranked = sorted((found or dict()).items(), key=lambda x : (x[1], x[0]))
+        return ranked if k is None else ranked[:k]
+
+    @staticmethod
+    def distance(a, b, limit):
+        """
+        Returns the number of typos between the words, up to limit + 1.
+
+        Rationale: A typo is an inserted, deleted or replaced letter,
+            or two swapped letters (the optimal string alignment
+            distance). The rows stop being computed once every
+            alignment is past the limit.
+        """
+
+        if a == b:
+            return 0
+
+        previous, current = None, list(range(len(b) + 1))
+        for i in range(1, len(a) + 1):
+            before, previous = previous, current
+            current = [i] + [0] * len(b)
+            for j in range(1, len(b) + 1):
+                cost = a[i - 1] != b[j - 1]
+                best = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+                if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                    best = min(best, before[j - 2] + 1)
+                current[j] = best
+            # a swap looks 2 rows back, so both rows must be past the limit
+            if min(current) > limit and min(previous) > limit:
+                return limit + 1
+        return min(current[-1], limit + 1)
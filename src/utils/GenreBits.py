@@ -0,0 +1,124 @@
+"""
+Genre Bits
+
+Contains the class for turning sets of genres into bitmasks.
+
+Includes:
+1. class GenreBits - interns genres to small ids and bitmasks
+
+Rationale:
+    Checking whether an item has any of the filtered genres, or
+    any of the recently read genres, used to compare strings in
+    nested loops. Once every genre is given a small id, a set of
+    genres becomes an int whose n-th bit tells if it has the genre
+    with id n, and such a check becomes a single bitwise AND.
+
+    Python ints have no fixed size, so there is no limit on the
+    number of genres. However, an int is as big as its highest
+    bit, so the common genres should be given the lowest ids
+    (see GenreBits.intern_all).
+
+    Most items have one of few combinations of genres. Hence, the
+    items share one frozenset per combination, which is kept with
+    its bitmask, instead of each having its own set and bitmask.
+"""
+
+from collections import Counter
+
+class GenreBits:
+    """
+    Gives every genre an id and converts genres to and from bitmasks.
+
+    Rationale: Ids are never taken back, since the filters and
+        the recently read genres may still refer to a genre that
+        no item uses anymore. The ids are only compacted when a
+        new GenreBits is made (e.g. when Metis reloads).
+
+    Instance Variables:
+        ids : dict
+            - (key, value) pairs of (genre, id)
+        names : list
+            - the genres, indexed by their id. The strings are the
+              ones items share (see self.intern_set).
+        sets : dict
+            - (key, value) pairs of (frozenset of genres, (bitmask,
+              the frozenset items share))
+    """
+
+    def __init__(self):
+        self.ids = dict()
+        self.names = list()
+        self.sets = dict()
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern(self, genre):
+        "Returns the id of the genre, giving it one if it has none."
+
+        uid = self.ids.get(genre)
+        if uid is None:
+            uid = self.ids[genre] = len(self.names)
+            self.names.append(genre)
+        return uid
+
+    def intern_all(self, genre_sets):
+        """
+        Gives ids to every genre of the sets, most common first.
+
+        Rationale: The most common genres then take the lowest
+            bits, which keeps the bitmasks of most items small.
+        """
+
+        counts = Counter(genre for genres in genre_sets for genre in genres)
+        for genre, _ in counts.most_common():
+            self.intern(genre)
+
+    def intern_set(self, genres):
+        """
+        Interns the genres and returns their bitmask and shared frozenset.
+
+        Rationale: Loaded items each have their own set and copy of
+            every genre string. Items with the same genres share a
+            single frozenset (of the interned strings) instead, so
+            the bitmask is kept once per combination, not per item.
+
+        Return Value : (int, frozenset)
+            - the bitmask and the genres, using the interned strings
+        """
+
+        genres = frozenset(genres)
+        entry = self.sets.get(genres)
+        if entry is None:
+            ids, names = self.ids, self.names
+            mask, shared = 0, list()
+            for genre in genres:
+                uid = ids.get(genre)
+                if uid is None:
+                    uid = self.intern(genre)
+                mask |= 1 << uid
+                shared.append(names[uid])
+            entry = self.sets[genres] = (mask, frozenset(shared))
+        return entry
+
+    def peek_mask(self, genres):
+        """
+        Returns the bitmask of the genres without interning any.
+
+        Rationale: A genre without an id is not used by any item,
+            so it would match nothing anyway. This keeps filters
+            and the recently read genres from growing the ids.
+        """
+
+        res, ids = 0, self.ids
+        for genre in genres:
+            uid = ids.get(genre)
+            if uid is not None:
+                res |= 1 << uid
+        return res
+
+    def bit(self, genre):
+        "Returns the bit of the genre, or 0 if it has no id."
+
+        uid = self.ids.get(genre)
+        return 0 if uid is None else 1 << uid
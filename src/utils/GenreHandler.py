@@ -9,6 +9,28 @@ Note: Code-splitted from EntriesListHandler
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
+from tkinter import font as tkfont
+
+from utils.GenreIndex import GenreIndex
+
+def compute_flow(widths, max_width):
+    """
+    Flows the widths into rows that are at most max_width wide.
+
+    A row always takes at least one width, even if it is too wide.
+
+    Return Value : list
+        - the (x, row) of every width, in the same order
+    """
+
+    positions = list()
+    x, row = 0, 0
+    for width in widths:
+        if x and x + width > max_width:
+            x, row = 0, row + 1
+        positions.append((x, row))
+        x += width
+    return positions
 
 class GenrePacker:
     """
@@ -42,6 +64,12 @@ class GenrePacker:
               or deleted.
     """
 
+    PADDING = 10        # space left at the right end of every row
+
+    # measured once per process (see self._calibrate)
+    chip_overhead = None
+    row_height = None
+
     def __init__(self, master, genres=set(), suggestions=None, on_edit=None):
         self.master = master
         self.suggestions = suggestions
@@ -49,8 +77,17 @@ class GenrePacker:
 
         self.frame = ttk.Frame(master=master, width=200)
         self.frame.pack(fill=tk.BOTH)
+        self.frame.bind('<Configure>', self._on_configure)
+
+        self.chips = dict()         # value : the frame of its GenreGUI
+        self.widths = dict()        # value : width of its chip
+        self.positions = dict()     # widget : (x, y) where it is placed
+        self.layout_width = None
+        self.font = tkfont.nametofont('TkDefaultFont')
+
+        self.btn_add = GenrePacker.AddBtn(master=self.frame, text='+', on_submit=self._on_add, suggestions=suggestions, current_genres=genres)
+        self.add_width = None
 
-        self.rows = list()        
         self.genres = genres
 
         self.reload()
@@ -73,23 +110,27 @@ class GenrePacker:
         """
 
         self.genres = genres
+        self.btn_add.current_genres = genres
         self.reload()
     
     def reload(self):
-        "Reloads the GUI aspect of the widget."
+        """
+        Reloads the GUI aspect of the widget.
 
-        for frm in self.rows:
-            frm.destroy()
-            self.frame.update()
+        Rationale: Chips are created without being shown, measured
+            with the font metrics and then placed all at once by
+            self._layout, so Tk only lays out the widget once.
+        """
 
-        self.rows = [ttk.Frame(master=self.frame)]
-        self.rows[0].pack(fill=tk.X)
+        for frame in self.chips.values():
+            frame.destroy()
+        self.chips.clear()
+        self.widths.clear()
+        self.positions.clear()
 
         for value in self.genres:
-            self._insert_to_row(value)
-        
-        self._insert_add_btn()
-        self.frame.update()
+            self._create_chip(value)
+        self._layout()
     
     def add_genre(self, value):
         """
@@ -110,70 +151,114 @@ class GenrePacker:
             messagebox.showerror(message='Genre already exists.')
             return
         self.genres.add(value)
-        self._insert_to_row(value)
+        self._create_chip(value)
+        self._layout()
     
     # ------------------------------ #
     # ------ Private Methods ------- #
     # ------------------------------ #
 
-    def _insert_to_row(self, value):
-        "Dynamically adds and resizes the contents of the widget."
+    def _create_chip(self, value):
+        "Creates the (unplaced) chip of the value."
 
-        while True:
-            frame = ttk.Frame(master=self.rows[-1])
-            frame.pack(side=tk.LEFT)
-            genre = GenreGUI(master=frame, value=value, on_delete=self._delete_item)
-            self.frame.update()
+        frame = ttk.Frame(master=self.frame)
+        GenreGUI(master=frame, value=value, on_delete=self._delete_item)
+        self.chips[value] = frame
 
-            if self.rows[-1].winfo_reqwidth() < self.frame.winfo_width() - 10 or len(self.rows[-1].winfo_children()) == 1:
-                break
+    def _calibrate(self):
+        """
+        Measures the parts of a chip that are the same for every genre.
 
-            frame.destroy()
-            self.frame.update()
-            self.rows.append(tk.Frame(master=self.frame))
-            self.rows[-1].pack(fill=tk.X)
-    
-    def _insert_add_btn(self):
-        "Ensures that the Add Btn stays at the end of the list."
+        Rationale: A chip is as wide as its text plus a constant
+            (the paddings and the delete button), so only the
+            constant needs Tk to compute the geometry. This happens
+            once, after which every chip is measured with the font.
+        """
 
-        def btn_click(value):
-            self.add_genre(value)
-            btn_new_genre.destroy()
-            self._insert_add_btn()
+        self.frame.update_idletasks()
+        if self.add_width is None:
+            self.add_width = self.btn_add.winfo_reqwidth()
 
-            if self.on_edit:
-                self.on_edit()
+        if GenrePacker.chip_overhead is None and self.chips:
+            value, frame = next(iter(self.chips.items()))
+            GenrePacker.chip_overhead = frame.winfo_reqwidth() - self.font.measure(value)
+            GenrePacker.row_height = max(frame.winfo_reqheight(), self.btn_add.winfo_reqheight())
 
-        while True:
-            btn_new_genre = GenrePacker.AddBtn(master=self.rows[-1], text='+', on_submit=btn_click, suggestions=self.suggestions, current_genres=self.genres)
-            btn_new_genre.pack(side=tk.LEFT)
-            self.frame.update()
+    def _measure(self, value):
+        if value not in self.widths:
+            self.widths[value] = self.font.measure(value) + GenrePacker.chip_overhead
+        return self.widths[value]
 
-            if self.rows[-1].winfo_reqwidth() < self.frame.winfo_width() - 10 or len(self.rows[-1].winfo_children()) == 1:
-                break
+    def _layout(self):
+        """
+        Places the chips (and the Add Btn at the end) into rows.
+
+        Rationale: The row breaks are computed from the cached
+            widths in a single pass (see compute_flow), and only
+            the widgets that moved are placed again. Hence,
+            re-flowing on resize is cheap.
+        """
+
+        if self.add_width is None or (self.chips and GenrePacker.chip_overhead is None):
+            self._calibrate()
+
+        width = self.frame.winfo_width()
+        if width <= 1:
+            # not shown yet, so use the requested width instead
+            width = self.frame.winfo_reqwidth()
+        self.layout_width = width
+
+        widgets = list(self.chips.values()) + [self.btn_add]
+        widths = [ self._measure(value) for value in self.chips ] + [self.add_width]
+        row_height = GenrePacker.row_height or self.btn_add.winfo_reqheight()
+
+        rows = 0
+        for widget, (x, row) in zip(widgets, compute_flow(widths, width - GenrePacker.PADDING)):
+            position = (x, row * row_height)
+            rows = row + 1
+            if self.positions.get(widget) == position:
+                continue
+            self.positions[widget] = position
+            widget.place(x=position[0], y=position[1])
+
+        self.frame.config(height=rows * row_height)
+
+    def _on_configure(self, event):
+        if event.width != self.layout_width:
+            self._layout()
 
-            btn_new_genre.destroy()
-            self.frame.update()
-            self.rows.append(tk.Frame(master=self.frame))
-            self.rows[-1].pack(fill=tk.X)
+    def _on_add(self, value):
+        self.add_genre(value)
+
+        if self.on_edit:
+            self.on_edit()
         
     def _delete_item(self, item):
         "Deletes a GenreGUI (passed to and called by GenreGUI's)"
         
         item.master.destroy()
         self.genres.remove(item.value)
+        self.chips.pop(item.value, None)
+        self.positions.pop(item.master, None)
         del item
+        self._layout()
         if self.on_edit:
             self.on_edit()
     
     class AddBtn(ttk.Button):
+        SUGGESTION_LIMIT = 50
+
         def __init__(self, master, text, on_submit, suggestions=set(), current_genres=set()):
             super().__init__(master=master, text=text, cursor='hand2')
             self.data = ''
             self.on_submit = on_submit
-            self.suggestions = suggestions
             self.current_genres = current_genres
 
+            # plain collections are indexed once so every keystroke stays cheap
+            if not isinstance(suggestions, GenreIndex):
+                suggestions = GenreIndex(suggestions or ())
+            self.suggestions = suggestions
+
             self.config(command=self.call_dialog)
         
         def call_dialog(self):
@@ -204,12 +289,15 @@ class GenrePacker:
 
             # Insert Suggestions
 
-            self.temp_suggestions = sorted(filter(lambda x : x not in self.current_genres, self.suggestions))
+            def get_suggestions(text):
+                "Returns the best few genres that match the text."
+
+                return self.suggestions.matches(text, limit=GenrePacker.AddBtn.SUGGESTION_LIMIT, exclude=self.current_genres)
+
+            self.temp_suggestions = get_suggestions('')
             def on_key_press(*args, **kwargs):
-                text = self.entry.get()
-                self.temp_suggestions = sorted(filter(lambda x : text in x and x not in self.current_genres, self.suggestions))
+                self.temp_suggestions = get_suggestions(self.entry.get())
                 self.suggestionsVar.set(self.temp_suggestions)
-                self.modal.update()
             
             def on_d_press(event):
                 index = self.lst_suggestions.curselection()[0]
@@ -0,0 +1,160 @@
+"""
+Genre Index
+
+Contains the set of genres that can be searched quickly.
+
+Includes:
+1. class GenreIndex - a set of genres with a prefix and substring index
+
+Rationale:
+    Autocompleting a genre used to filter and sort every known
+    genre on every keystroke. With tens of thousands of distinct
+    genres, that is noticeable. Instead, the genres are kept in a
+    sorted list (for prefixes, through bisect) and in a trigram
+    index (for substrings), both updated as genres are added or
+    removed.
+"""
+
+from bisect import bisect_left, insort
+from itertools import islice
+
+class GenreIndex(set):
+    """
+    A set of genres that also answers which genres match a text.
+
+    Rationale: The GenreIndex is still a set, so it can be used
+        wherever the set of genres was used. However, the index
+        is only kept up to date through add, update, discard,
+        remove and clear. Other in-place set operations (e.g. |=)
+        must NOT be used.
+
+        Matching ignores the case. Genres starting with the text
+        come first, followed by the genres that merely contain it,
+        each in alphabetical order.
+
+    Parameters:
+        genres (optional) : iterable
+            - the initial genres
+    """
+
+    def __init__(self, genres=()):
+        super().__init__()
+        self._sorted = list()       # sorted (folded, genre) pairs
+        self._trigrams = dict()     # trigram : set of genres
+        self.update(genres)
+
+    # ----------------------------- #
+    # ------ Set Operations ------- #
+    # ----------------------------- #
+
+    def add(self, genre):
+        if genre in self:
+            return
+        super().add(genre)
+        insort(self._sorted, (genre.casefold(), genre))
+        self._index(genre)
+
+    def update(self, *iterables):
+        new = { genre for iterable in iterables for genre in iterable if genre not in self }
+        if not new:
+            return
+        super().update(new)
+
+        # one sort is cheaper than inserting the genres one by one
+        self._sorted.extend((genre.casefold(), genre) for genre in new)
+        self._sorted.sort()
+        for genre in new:
+            self._index(genre)
+
+    def discard(self, genre):
+        if genre not in self:
+            return
+        super().discard(genre)
+
+        key = (genre.casefold(), genre)
+        del self._sorted[bisect_left(self._sorted, key)]
+
+        for trigram in GenreIndex._get_trigrams(key[0]):
+            bucket = self._trigrams[trigram]
+            bucket.discard(genre)
+            if not bucket:
+                del self._trigrams[trigram]
+
+    def remove(self, genre):
+        if genre not in self:
+            raise KeyError(genre)
+        self.discard(genre)
+
+    def clear(self):
+        super().clear()
+        self._sorted.clear()
+        self._trigrams.clear()
+
+    # ----------------------------- #
+    # ------ Public Methods ------- #
+    # ----------------------------- #
+
+    def iter_matches(self, text, exclude=()):
+        """
+        Yields the genres that contain the text, best matches first.
+
+        Rationale: The matches are produced lazily, so asking for
+            the first few only costs as much as finding those few.
+        """
+
+        text = text.casefold()
+        yield from (genre for genre in self._iter_prefixed(text) if genre not in exclude)
+        if text:
+            yield from (genre for genre in self._iter_containing(text) if genre not in exclude)
+
+    def matches(self, text, limit=None, exclude=()):
+        """
+        Returns the genres that contain the text, best matches first.
+
+        Parameters:
+            text : str
+            limit (optional) : int
+                - the maximum number of matches returned
+            exclude (optional) : collection
+                - genres that must be skipped (e.g. those already chosen)
+
+        Return Value : list
+        """
+
+        return list(islice(self.iter_matches(text, exclude), limit))
+
+    # ------------------------------ #
+    # ------ Private Methods ------- #
+    # ------------------------------ #
+
+    @staticmethod
+    def _get_trigrams(folded):
+        return { folded[i:i+3] for i in range(len(folded) - 2) }
+
+    def _index(self, genre):
+        for trigram in GenreIndex._get_trigrams(genre.casefold()):
+            self._trigrams.setdefault(trigram, set()).add(genre)
+
+    def _iter_prefixed(self, text):
+        "Yields the genres starting with the text, in order."
+
+        index = bisect_left(self._sorted, (text,))
+        while index < len(self._sorted) and self._sorted[index][0].startswith(text):
+            yield self._sorted[index][1]
+            index += 1
+
+    def _iter_containing(self, text):
+        "Yields the genres containing (but not starting with) the text, in order."
+
+        if len(text) < 3:
+            # too short for the trigrams, so every genre must be checked
+            candidates = ( pair for pair in self._sorted if text in pair[0] )
+        else:
+            buckets = sorted((self._trigrams.get(trigram, set()) for trigram in GenreIndex._get_trigrams(text)), key=len)
+            found = set.intersection(*buckets)
+            candidates = sorted( (genre.casefold(), genre) for genre in found )
+            candidates = ( pair for pair in candidates if text in pair[0] )
+
+        for folded, genre in candidates:
+            if not folded.startswith(text):
+                yield genre
@@ -0,0 +1,212 @@
+"""
+Lag Monitor
+
+Contains the watchdog that notices when the window stops responding.
+
+Includes:
+1. class LagMonitor - measures how late the Tk event loop runs
+2. LAG_MONITOR - the LagMonitor used by the App
+
+Rationale:
+    A heartbeat is scheduled with after() at a fixed interval. If
+    the event loop is busy (e.g. a handler takes long), the heartbeat
+    runs late, and how late it runs is how long the window was
+    frozen. Since the heartbeat cannot run during the freeze, the
+    tracked event handlers remember when they ran, so that a stall
+    can be blamed on the handler that was running at that time.
+
+    Stalls over the threshold are written to a rotating log file,
+    so that freezes reported by users can be looked at afterwards.
+"""
+
+import functools
+import logging
+import math
+import os
+import sys
+import time
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+from utils.Metrics import METRICS
+
+class LagMonitor:
+    """
+    Measures the lag of the event loop and logs the stalls.
+
+    Instance Variables:
+        enabled : boolean
+            - whether the heartbeat runs. It is on unless the
+              METIS_LAG_MONITOR environment variable is 0, false or off.
+        threshold : float
+            - the lag (in seconds) that counts as a stall. It can be
+              set with the METIS_LAG_THRESHOLD_MS environment variable.
+        active : list
+            - the (name, start) of the tracked handlers that are
+              running, innermost last (dialogs run nested event loops)
+        finished : collections.deque
+            - the (name, start, end) of the recently finished handlers
+
+    Parameters:
+        interval (optional) : float
+            - the seconds between heartbeats
+        log_path (optional) : str
+            - the file the stalls are written to
+    """
+
+    ENV_FLAG = 'METIS_LAG_MONITOR'
+    ENV_THRESHOLD = 'METIS_LAG_THRESHOLD_MS'
+    THRESHOLD_MS = 200
+    LOG_PATH = os.path.join('logs', 'metis-lag.log')
+    LOG_MAX_BYTES = 512 * 1024
+    LOG_BACKUPS = 3
+
+    def __init__(self, interval=0.1, log_path=LOG_PATH):
+        self.interval = interval
+        self.log_path = log_path
+        self.enabled = os.environ.get(LagMonitor.ENV_FLAG, '1').lower() not in ('0', 'false', 'off')
+        self.threshold = self.get_threshold(os.environ) / 1000
+
+        self.active = list()
+        self.finished = deque(maxlen=64)
+
+        self.window = None
+        self.get_context = None
+        self.expected = None
+        self.job = None
+        self.logger = None
+
+    # ----------------------------- #
+    # ------ Public Methods ------- #
+    # ----------------------------- #
+
+    def track(self, name):
+        "A decorator that remembers when the handler name runs."
+
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+
+                start = time.perf_counter()
+                self.active.append((name, start))
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.active.pop()
+                    self.finished.append((name, start, time.perf_counter()))
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def get_threshold(environ):
+        """
+        Returns the threshold (in ms) set in the environment.
+
+        Rationale: The monitor is created when the App is imported,
+            so a mistyped value must not keep the App from starting.
+            The default is used instead, with a warning.
+        """
+
+        value = environ.get(LagMonitor.ENV_THRESHOLD)
+        if value is None:
+            return LagMonitor.THRESHOLD_MS
+        try:
+            threshold = float(value)
+        except ValueError:
+            threshold = math.nan
+        if not threshold > 0 or math.isinf(threshold):
+            print(f'{LagMonitor.ENV_THRESHOLD}={value!r} is not a positive number of ms, '
+                  f'{LagMonitor.THRESHOLD_MS} ms is used instead.', file=sys.stderr)
+            return LagMonitor.THRESHOLD_MS
+        return threshold
+
+    def start(self, window, get_context=None):
+        """
+        Starts the heartbeat on the window.
+
+        Parameters:
+            window : tk.Tk
+            get_context (optional) : function
+                - returns a dict of extra facts to log with each stall
+                  (e.g. the size of the collection)
+        """
+
+        self.window = window
+        self.get_context = get_context
+        if not self.enabled or self.job is not None:
+            return
+        self._schedule()
+
+    def stop(self):
+        if self.job is not None:
+            self.window.after_cancel(self.job)
+            self.job = None
+
+    # ------------------------------ #
+    # ------ Private Methods ------- #
+    # ------------------------------ #
+
+    def _schedule(self):
+        self.expected = time.perf_counter() + self.interval
+        self.job = self.window.after(int(self.interval * 1000), self._beat)
+
+    def _beat(self):
+        now = time.perf_counter()
+        lag = max(0.0, now - self.expected)
+        METRICS.observe('Tk.heartbeat_lag', lag)
+
+        if lag >= self.threshold:
+            self._report(lag, self.expected, now)
+        self._schedule()
+
+    def _blame(self, since, until):
+        """
+        Returns the name of the handler that most likely caused the stall.
+
+        Rationale: The handler that finished during the stall and
+            overlapped it the most is blamed. If none finished, the
+            stall happened inside the innermost running handler.
+        """
+
+        best, best_overlap = None, 0.0
+        for name, start, end in self.finished:
+            overlap = min(end, until) - max(start, since)
+            if overlap > best_overlap:
+                best, best_overlap = name, overlap
+
+        if best is None and self.active:
+            best = self.active[-1][0]
+        return best or 'unknown'
+
+    def _report(self, lag, since, until):
+        handler = self._blame(since, until)
+        context = self.get_context() if self.get_context else dict()
+        details = ' '.join(f'{key}={value}' for key, value in context.items())
+
+        METRICS.count('Tk.stalls')
+        METRICS.count(f'Tk.stalls.{handler}')
+        self._get_logger().warning('stall %.0f ms during %s %s', lag * 1000, handler, details)
+
+    def _get_logger(self):
+        "Returns the logger of the stalls, creating the log file on first use."
+
+        if self.logger is not None:
+            return self.logger
+
+        self.logger = logging.getLogger('metis.lag')
+        self.logger.propagate = False
+        try:
+            folder = os.path.dirname(self.log_path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            handler = RotatingFileHandler(self.log_path, maxBytes=LagMonitor.LOG_MAX_BYTES, backupCount=LagMonitor.LOG_BACKUPS)
+        except OSError as e:
+            print(e)
+            handler = logging.NullHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        self.logger.addHandler(handler)
+        return self.logger
+
+LAG_MONITOR = LagMonitor()
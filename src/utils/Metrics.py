@@ -0,0 +1,208 @@
+"""
+Metrics
+
+Contains the classes for the always-on operation metrics.
+
+Includes:
+1. class OperationStats - the latency statistics of an operation
+2. class MetricsRegistry - collects the metrics of the App
+3. METRICS - the MetricsRegistry used by the App
+
+Rationale:
+    To know which operation makes the App slow for a particular
+    user, the operations must always be measured, not only when
+    profiling. Hence, the bookkeeping must be cheap: a call
+    count, a total, a maximum and a bounded window of recent
+    samples for the percentiles. When disabled, a timed function
+    costs a single attribute check.
+
+    MetisClass, server.py and the benchmarks record into it on
+    machines without a display, so it must NOT import tkinter
+    (the panel is in utils.MetricsPanel instead).
+"""
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+class OperationStats:
+    """
+    Keeps the latency statistics of a single operation.
+
+    Rationale: Keeping every sample would grow without bound,
+        so only the most recent ones are kept for the percentiles.
+        The count, total and maximum still cover every call.
+
+    Parameters:
+        window : int
+            - the number of recent samples kept for the percentiles
+    """
+
+    __slots__ = ('count', 'total', 'max', 'samples')
+
+    def __init__(self, window):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=window)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.samples.append(seconds)
+
+    def percentile(self, sorted_samples, ratio):
+        "Returns the nearest-rank percentile of the sorted samples."
+
+        if not sorted_samples:
+            return 0.0
+        index = min(len(sorted_samples) - 1, max(0, int(round(ratio * len(sorted_samples))) - 1))
+        return sorted_samples[index]
+
+    def to_dict(self):
+        "Returns the statistics (in seconds) as a JSON-serializable dict."
+
+        ordered = sorted(self.samples)
+        return {
+            'count' : self.count,
+            'total' : self.total,
+            'mean' : self.total / self.count if self.count else 0.0,
+            'p50' : self.percentile(ordered, 0.50),
+            'p90' : self.percentile(ordered, 0.90),
+            'p99' : self.percentile(ordered, 0.99),
+            'max' : self.max,
+        }
+
+class MetricsRegistry:
+    """
+    Collects the call counts, latencies and counters of the App.
+
+    Rationale: Metrics are collected from the backend, the GUI
+        handlers and worker threads alike, so a single registry
+        is shared by everyone (see METRICS) and every update is
+        guarded by a lock.
+
+    Instance Variables:
+        enabled : boolean
+            - whether metrics are collected. It is on unless the
+              METIS_METRICS environment variable is 0, false or off.
+        operations : dict
+            - (key, value) pairs of (operation name, OperationStats)
+        counters : dict
+            - (key, value) pairs of (counter name, total)
+        gauges : dict
+            - (key, value) pairs of (gauge name, last value)
+
+    Parameters:
+        window (optional) : int
+            - the recent samples kept per operation
+    """
+
+    ENV_FLAG = 'METIS_METRICS'
+    ENV_DUMP = 'METIS_METRICS_DUMP'
+
+    def __init__(self, window=1024):
+        self.window = window
+        self.enabled = os.environ.get(MetricsRegistry.ENV_FLAG, '1').lower() not in ('0', 'false', 'off')
+        self.operations = dict()
+        self.counters = dict()
+        self.gauges = dict()
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    # ----------------------------- #
+    # ------ Public Methods ------- #
+    # ----------------------------- #
+
+    def timed(self, name):
+        "A decorator that records the latency of every call as the operation name."
+
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def observe(self, name, seconds):
+        "Records a single latency sample of the operation name."
+
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self.operations.get(name)
+            if stats is None:
+                stats = self.operations[name] = OperationStats(self.window)
+            stats.add(seconds)
+
+    def count(self, name, amount=1):
+        "Adds amount to the counter name."
+
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def gauge(self, name, value):
+        "Sets the gauge name to its latest value."
+
+        if not self.enabled:
+            return
+        self.gauges[name] = value
+
+    def reset(self):
+        "Forgets every metric collected so far."
+
+        with self._lock:
+            self.operations.clear()
+            self.counters.clear()
+            self.gauges.clear()
+            self.started = time.time()
+
+    def to_dict(self):
+        "Returns every metric as a JSON-serializable dict."
+
+        with self._lock:
+            return {
+                'timestamp' : time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'since' : time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+                'enabled' : self.enabled,
+                'operations' : { name : stats.to_dict() for name, stats in sorted(self.operations.items()) },
+                'counters' : dict(sorted(self.counters.items())),
+                'gauges' : dict(sorted(self.gauges.items())),
+            }
+
+    def dump(self, filepath):
+        """
+        Writes every metric as a JSON file.
+
+        Return value
+            filepath : str (if success)
+            '' : str (if fail)
+        """
+
+        try:
+            with open(filepath, 'w') as output_file:
+                json.dump(self.to_dict(), output_file, indent=4)
+        except OSError as e:
+            print(e)
+            return ''
+        return filepath
+
+METRICS = MetricsRegistry()
+
+# dump the metrics of the session on exit, if asked
+if os.environ.get(MetricsRegistry.ENV_DUMP):
+    atexit.register(METRICS.dump, os.environ[MetricsRegistry.ENV_DUMP])
@@ -0,0 +1,117 @@
+"""
+Metrics Panel
+
+Contains the debug panel that shows the App metrics.
+
+Note: Kept apart from utils.Metrics since the metrics
+must stay usable without tkinter.
+"""
+
+import tkinter as tk
+from tkinter import ttk
+from tkinter import messagebox
+from tkinter.filedialog import asksaveasfilename
+
+from utils.Metrics import METRICS
+
+class MetricsPanel:
+    """
+    A debug window that shows the collected metrics.
+
+    Rationale: Metrics are only useful if they can be looked at
+        while the problem is happening. Hence, the panel refreshes
+        itself periodically and can dump the metrics to a JSON file
+        to be attached to an issue.
+
+    Parameters:
+        root : tk widget
+            - the window that owns the panel
+        registry (optional) : MetricsRegistry
+            - the metrics to show. Defaults to METRICS.
+    """
+
+    REFRESH_MS = 1000
+    COLUMNS = ('count', 'total', 'mean', 'p50', 'p90', 'p99', 'max')
+
+    def __init__(self, root, registry=METRICS):
+        self.registry = registry
+        self.refresh_job = None
+
+        self.modal = tk.Toplevel(root)
+        self.modal.title('Metis Metrics')
+        self.modal.minsize(720, 400)
+        self.modal.protocol("WM_DELETE_WINDOW", self.dismiss)
+        self.modal.rowconfigure(0, weight=1)
+        self.modal.columnconfigure(0, weight=1)
+
+        # ----- Operations ----- #
+
+        self.tree = ttk.Treeview(self.modal, columns=MetricsPanel.COLUMNS, height=14)
+        self.tree.heading('#0', text='Operation')
+        self.tree.column('#0', width=220)
+        for column in MetricsPanel.COLUMNS:
+            self.tree.heading(column, text=column if column == 'count' else f'{column} (ms)')
+            self.tree.column(column, width=70, anchor='e')
+        self.tree.grid(row=0, column=0, padx=10, pady=(10, 5), sticky='nsew')
+
+        # ----- Counters ----- #
+
+        self.lbl_counters = ttk.Label(self.modal, text='', justify=tk.LEFT)
+        self.lbl_counters.grid(row=1, column=0, padx=10, pady=5, sticky='w')
+
+        # ----- Buttons ----- #
+
+        self.frm_btn = ttk.Frame(self.modal)
+        self.frm_btn.grid(row=2, column=0, pady=(5, 10))
+
+        self.chk_enabled_var = tk.BooleanVar(value=self.registry.enabled)
+        self.chk_enabled = ttk.Checkbutton(
+            self.frm_btn, text='Enabled', style='Switch.TCheckbutton', variable=self.chk_enabled_var, command=self.toggle_enabled, cursor='hand2'
+        )
+        self.chk_enabled.grid(row=0, column=0, padx=10)
+
+        self.btn_reset = ttk.Button(self.frm_btn, text='Reset', command=self.reset, cursor='hand2')
+        self.btn_reset.grid(row=0, column=1, padx=10)
+
+        self.btn_dump = ttk.Button(self.frm_btn, text='Dump to JSON', style='Accent.TButton', command=self.dump, cursor='hand2')
+        self.btn_dump.grid(row=0, column=2, padx=10)
+
+        self.refresh()
+
+    def refresh(self):
+        "Shows the latest metrics and schedules the next refresh."
+
+        data = self.registry.to_dict()
+
+        self.tree.delete(*self.tree.get_children())
+        for name, stats in data['operations'].items():
+            values = [stats['count']] + [ f'{stats[column] * 1000:.2f}' for column in MetricsPanel.COLUMNS[1:] ]
+            self.tree.insert('', tk.END, text=name, values=values)
+
+        lines = [ f'{name}: {value}' for name, value in data['counters'].items() ]
+        lines.extend(f'{name}: {value}' for name, value in data['gauges'].items())
+        self.lbl_counters.config(text='\n'.join(lines) if lines else 'No counters yet.')
+
+        self.refresh_job = self.modal.after(MetricsPanel.REFRESH_MS, self.refresh)
+
+    def toggle_enabled(self):
+        self.registry.enabled = self.chk_enabled_var.get()
+
+    def reset(self):
+        self.registry.reset()
+
+    def dump(self):
+        filepath = asksaveasfilename(
+            parent=self.modal,
+            defaultextension='.json',
+            filetypes=[('JSON Files', '*.json'), ('All Files', '*.*')],
+        )
+        if not filepath:
+            return
+        if not self.registry.dump(filepath):
+            messagebox.showerror(parent=self.modal, message='Metrics cannot be saved.')
+
+    def dismiss(self):
+        if self.refresh_job:
+            self.modal.after_cancel(self.refresh_job)
+        self.modal.destroy()
@@ -0,0 +1,183 @@
+"""
+Profiler
+
+Contains the class for capturing cProfile data of live sessions.
+
+Includes:
+1. class SessionProfiler - profiles the wrapped event handlers
+2. PROFILER - the SessionProfiler used by the App
+
+Rationale:
+    When a user reports a freeze, the metrics tell which handler
+    was slow, but not why. A profile of the actual session tells
+    that. To keep the idle time of the mainloop out of the profile
+    (and to keep the overhead away when not profiling), only the
+    wrapped event handlers are profiled, and only while a capture
+    is active.
+
+    Captures are started and stopped with a hotkey (see the App)
+    or started at launch with the METIS_PROFILE environment
+    variable. Each capture is written as a .pstats file with a
+    text summary of the top hotspots beside it.
+"""
+
+import atexit
+import cProfile
+import functools
+import io
+import os
+import pstats
+import time
+from collections import Counter
+
+class SessionProfiler:
+    """
+    Profiles the wrapped event handlers while a capture is active.
+
+    Rationale: Handlers may call each other (e.g. a dialog that
+        calls itself again), so the profiler is only enabled by the
+        outermost handler and disabled when it ends. It should be
+        noted that cProfile only sees the Tk thread, so the work of
+        worker threads is not part of the capture.
+
+    Instance Variables:
+        active : boolean
+            - whether a capture is in progress
+        profile : cProfile.Profile
+            - the profile of the current capture
+        calls : collections.Counter
+            - the number of calls per handler in the current capture
+
+    Parameters:
+        output_dir (optional) : str
+            - the folder where the captures are written
+    """
+
+    ENV_FLAG = 'METIS_PROFILE'
+    OUTPUT_DIR = 'profiles'
+    TOP = 25
+
+    def __init__(self, output_dir=OUTPUT_DIR):
+        self.output_dir = output_dir
+        self.active = False
+        self.profile = None
+        self.calls = Counter()
+        self.started = None
+        self.depth = 0
+
+        if os.environ.get(SessionProfiler.ENV_FLAG):
+            self.start()
+
+    # ----------------------------- #
+    # ------ Public Methods ------- #
+    # ----------------------------- #
+
+    def wrap(self, name):
+        "A decorator that profiles every call made during a capture."
+
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.active:
+                    return func(*args, **kwargs)
+
+                # the capture may be stopped (and another started) meanwhile
+                profile = self.profile if self.depth == 0 else None
+                self.calls[name] += 1
+                self.depth += 1
+                if profile is not None:
+                    profile.enable()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.depth -= 1
+                    if profile is not None:
+                        profile.disable()
+            return wrapper
+        return decorator
+
+    def start(self):
+        "Starts a new capture."
+
+        if self.active:
+            return
+        self.profile = cProfile.Profile()
+        self.calls = Counter()
+        self.started = time.time()
+        self.active = True
+
+    def stop(self):
+        """
+        Stops the current capture and writes it.
+
+        Return value
+            filepath : str (if something was captured)
+                - the filepath of the .pstats file. The summary
+                  has the same filepath but ends with .txt
+            '' : str (if nothing was captured)
+        """
+
+        if not self.active:
+            return ''
+        self.active = False
+
+        # a handler is still running (e.g. stopped from a dialog),
+        # which disables the profile again once it returns
+        if self.depth:
+            self.profile.disable()
+
+        if not self.calls:
+            return ''
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started))
+        filepath = os.path.join(self.output_dir, f'metis-{stamp}.pstats')
+
+        self.profile.dump_stats(filepath)
+        with open(filepath[:-len('.pstats')] + '.txt', 'w') as summary_file:
+            summary_file.write(self.summarize())
+
+        return filepath
+
+    def toggle(self):
+        """
+        Starts or stops a capture.
+
+        Return value
+            filepath : str
+                - the result of self.stop, if stopped
+            None
+                - if started
+        """
+
+        if self.active:
+            return self.stop()
+        self.start()
+        return None
+
+    def summarize(self):
+        "Returns the text summary of the top hotspots of the current capture."
+
+        duration = time.time() - self.started
+        out = io.StringIO()
+        out.write(f'Metis profile captured {time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started))} ({duration:.1f} s)\n\n')
+
+        out.write('Handler calls:\n')
+        for name, count in self.calls.most_common():
+            out.write(f'  {name:<30}{count:>6}\n')
+
+        stats = pstats.Stats(self.profile, stream=out)
+        stats.strip_dirs()
+
+        out.write(f'\nTop {SessionProfiler.TOP} by cumulative time:\n')
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(SessionProfiler.TOP)
+
+        out.write(f'\nTop {SessionProfiler.TOP} by internal time:\n')
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(SessionProfiler.TOP)
+
+        return out.getvalue()
+
+PROFILER = SessionProfiler()
+
+# write the unfinished capture on exit
+atexit.register(PROFILER.stop)
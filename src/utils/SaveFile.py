@@ -10,6 +10,7 @@ from collections import deque
 import json
 
 from utils.ReadingListItem import *
+from utils.Snapshot import Book
 
 class SaveFile:
     "Handles the data to be used in saving / loading."
@@ -49,10 +50,17 @@ class SaveFile:
             elif isinstance(dct, ReadingListItem):
                 res = { '__ReadingListItem__' : True }
                 for key, value in dct.__dict__.items():
-                    if type(value) == set:
+                    if type(value) in {set, frozenset}:
                         res[key] = list(value)
                     else:
                         res[key] = value
                 return res
+            elif isinstance(dct, Book):
+                # saved as the ReadingListItem it is a copy of
+                res = { '__ReadingListItem__' : True }
+                for key in Book.FIELDS:
+                    value = getattr(dct, key)
+                    res[key] = list(value) if type(value) == frozenset else value
+                return res
             else:
                 return super().default(dct)
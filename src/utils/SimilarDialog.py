@@ -0,0 +1,71 @@
+"""
+Similar Dialog
+
+Contains the dialog box that lists the books like a given book.
+
+Note: Kept apart from utils.SimilarityIndex since the index
+must stay usable without tkinter.
+"""
+
+import tkinter as tk
+from tkinter import ttk
+
+class SimilarDialog:
+    """
+    A window that lists the books most like a book.
+
+    Rationale: The window is not modal, so the reading list can
+        still be used while it is open. Double-clicking (or
+        pressing Enter on) a book passes it to on_choose.
+
+    Parameters:
+        root : tk widget
+            - the window that owns the dialog
+        item : ReadingListItem
+            - the book the others are like
+        similar : list
+            - (ReadingListItem, score) pairs, most similar first
+        on_choose (optional) : function
+            - called with the chosen ReadingListItem
+    """
+
+    def __init__(self, root, item, similar, on_choose=None):
+        self.similar = similar
+        self.on_choose = on_choose
+
+        self.modal = tk.Toplevel(root)
+        self.modal.title('More like this')
+        self.modal.minsize(500, 300)
+        self.modal.transient(root)
+        self.modal.rowconfigure(1, weight=1)
+        self.modal.columnconfigure(0, weight=1)
+
+        self.lbl_item = ttk.Label(self.modal, text=f'Books like "{item.format_book()}"')
+        self.lbl_item.grid(row=0, column=0, padx=10, pady=(10, 5), sticky='w')
+
+        self.tree = ttk.Treeview(self.modal, columns=('score',), height=10, selectmode='browse')
+        self.tree.heading('#0', text='Book')
+        self.tree.heading('score', text='Similarity')
+        self.tree.column('#0', width=400)
+        self.tree.column('score', width=80, anchor='e')
+        self.tree.grid(row=1, column=0, padx=10, pady=5, sticky='nsew')
+
+        for index, (other, score) in enumerate(similar):
+            self.tree.insert('', tk.END, iid=str(index), text=other.format_book(), values=(f'{score:.0%}',))
+        if not similar:
+            self.tree.insert('', tk.END, text='No similar book found.')
+
+        self.tree.bind('<Double-Button-1>', self._choose)
+        self.tree.bind('<Return>', self._choose)
+
+        self.btn_close = ttk.Button(self.modal, text='Close', command=self.dismiss, cursor='hand2')
+        self.btn_close.grid(row=2, column=0, pady=(5, 10))
+
+    def dismiss(self):
+        self.modal.destroy()
+
+    def _choose(self, event=None):
+        selected = self.tree.selection()
+        if not selected or not selected[0].isdigit() or self.on_choose is None:
+            return
+        self.on_choose(self.similar[int(selected[0])][0])
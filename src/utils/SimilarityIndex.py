@@ -0,0 +1,360 @@
+"""
+Similarity Index
+
+Contains the classes for finding the books most like a given book.
+
+Includes:
+1. class SimilarityIndex - an inverted index of TF-IDF vectors
+2. class PostingArray - the NumPy arrays of the entries of a term
+
+Rationale:
+    Every book is turned into a sparse vector of the weighted
+    words of its title, subtitle, author, genres and summary
+    (TF-IDF), and two books are as similar as the cosine of
+    their vectors. Comparing a book against every other book
+    is too slow for big reading lists. Instead, the vectors are
+    stored as an inverted index (term -> books with the term),
+    so only the books sharing a term with the query are scored.
+
+    The scoring is vectorized with NumPy when it is installed.
+    Otherwise, the same scores are computed in pure Python.
+"""
+
+import heapq
+import math
+import re
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class PostingArray:
+    """
+    The (uid, weight) entries of a term, stored as NumPy arrays.
+
+    Rationale: Rebuilding an array whenever a book is added or
+        removed would cost as much as the array. Instead, entries
+        are appended to arrays that grow by doubling, and removed
+        entries merely have their weight zeroed (which adds nothing
+        to any score). The arrays are compacted once most of the
+        entries are removed.
+    """
+
+    __slots__ = ('uids', 'weights', 'size', 'dead', 'positions')
+
+    def __init__(self):
+        self.uids = np.empty(8, dtype=np.int64)
+        self.weights = np.empty(8, dtype=np.float64)
+        self.size = 0
+        self.dead = 0
+        self.positions = dict()     # uid : position in the arrays
+
+    @classmethod
+    def from_entries(cls, entries):
+        "Returns the PostingArray of a { uid : weight } dict, built in bulk."
+
+        array = cls()
+        array.uids = np.fromiter(entries.keys(), dtype=np.int64, count=len(entries))
+        array.weights = np.fromiter(entries.values(), dtype=np.float64, count=len(entries))
+        array.size = len(entries)
+        array.positions = { uid : position for position, uid in enumerate(entries) }
+        return array
+
+    def add(self, uid, weight):
+        if self.size == len(self.uids):
+            capacity = max(8, 2 * self.size)
+            self.uids = np.resize(self.uids, capacity)
+            self.weights = np.resize(self.weights, capacity)
+        self.uids[self.size] = uid
+        self.weights[self.size] = weight
+        self.positions[uid] = self.size
+        self.size += 1
+
+    def discard(self, uid):
+        position = self.positions.pop(uid, None)
+        if position is None:
+            return
+        self.weights[position] = 0.0
+        self.dead += 1
+        if self.dead > 32 and 2 * self.dead > self.size:
+            self._compact()
+
+    def _compact(self):
+        alive = self.weights[:self.size] != 0.0
+        self.uids = self.uids[:self.size][alive].copy()
+        self.weights = self.weights[:self.size][alive].copy()
+        self.size = len(self.uids)
+        self.dead = 0
+        self.positions = { int(uid) : position for position, uid in enumerate(self.uids) }
+
+class SimilarityIndex:
+    """
+    Finds the books most similar to a book in the index.
+
+    Rationale: The IDF of a term changes whenever a book is added
+        or removed, which would change the length (norm) of every
+        vector. Recomputing every norm on every change is too slow,
+        so the norms are only recomputed once the number of books
+        drifts by NORM_DRIFT since they were last computed. Until
+        then, the norm of a new or edited book uses the IDF at the
+        time it was indexed, which barely changes the ranking.
+
+        Terms used by more than MAX_DF of the books say little
+        about a book, so they are skipped when querying. Also, only
+        the MAX_QUERY_TERMS heaviest terms of the queried book are
+        looked up, which bounds the work per query.
+
+    Usage:
+        index = SimilarityIndex()
+        index.rebuild(metis.collection.values())
+        index.similar(item.get_uid(), k=10)    # [(uid, score), ...]
+
+    Parameters:
+        use_numpy (optional) : boolean
+            - whether to score with NumPy. Defaults to whether
+              NumPy is installed.
+    """
+
+    # field : (weight, prefix of its terms)
+    FIELDS = {
+        'title' : (2.0, ''),
+        'subtitle' : (1.0, ''),
+        'author' : (1.5, 'author:'),
+        'summary' : (1.0, ''),
+    }
+    GENRE_WEIGHT = 3.0
+
+    MAX_DF = 0.5
+    PRUNE_FROM = 100        # the number of books before terms are skipped
+    MAX_QUERY_TERMS = 16
+    NORM_DRIFT = 0.25
+
+    STOPWORDS = frozenset((
+        'a', 'an', 'and', 'are', 'as', 'at', 'be', 'but', 'by', 'for', 'from',
+        'he', 'her', 'his', 'in', 'into', 'is', 'it', 'its', 'of', 'on', 'or',
+        'she', 'that', 'the', 'their', 'they', 'this', 'to', 'was', 'with',
+        'n', 'd', 'tba', 'anonymous',
+    ))
+    WORD_PATTERN = re.compile(r'[^\W_]+')
+
+    def __init__(self, use_numpy=None):
+        self.use_numpy = np is not None and (use_numpy is None or use_numpy)
+
+        self.postings = dict()      # term : { uid : weight }
+        self.vectors = dict()       # uid : { term : weight }
+        self.norms = dict()         # uid : length of the TF-IDF vector
+        self.norm_size = 0          # the number of books when the norms were computed
+
+        # NumPy only
+        self.arrays = dict()        # term : PostingArray
+        self.norm_array = None      # uid -> norm (inf if there is no such book)
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def __contains__(self, uid):
+        return uid in self.vectors
+
+    # ----------------------------- #
+    # ------ Public Methods ------- #
+    # ----------------------------- #
+
+    @classmethod
+    def vectorize(cls, item):
+        """
+        Returns the weighted terms of the item.
+
+        Return Value : dict
+            - (key, value) pairs of (term, weight)
+        """
+
+        counts, stopwords = Counter(), cls.STOPWORDS
+        for field, (weight, prefix) in cls.FIELDS.items():
+            text = getattr(item, field, None)
+            if not text:
+                continue
+            # numbers (e.g. volumes) say nothing about the content
+            for word in cls.WORD_PATTERN.findall(text.casefold()):
+                if len(word) > 1 and word not in stopwords and not word.isdigit():
+                    counts[prefix + word] += weight
+        for genre in item.genre:
+            counts['genre:' + genre.casefold()] += cls.GENRE_WEIGHT
+
+        # dampened, so that a repeated word does not drown the rest
+        return { term : 1.0 + math.log(count) for term, count in counts.items() }
+
+    def rebuild(self, items):
+        "Indexes the items from scratch."
+
+        self.postings.clear()
+        self.vectors.clear()
+        self.arrays.clear()
+        for item in items:
+            uid, vector = item.get_uid(), self.vectorize(item)
+            self.vectors[uid] = vector
+            for term, weight in vector.items():
+                self.postings.setdefault(term, dict())[uid] = weight
+
+        if self.use_numpy:
+            for term, entries in self.postings.items():
+                self.arrays[term] = PostingArray.from_entries(entries)
+        self._refresh_norms()
+
+    def add(self, item):
+        uid = item.get_uid()
+        if uid in self.vectors:
+            self.discard(uid)
+
+        vector = self.vectors[uid] = self.vectorize(item)
+        for term, weight in vector.items():
+            self.postings.setdefault(term, dict())[uid] = weight
+            if self.use_numpy:
+                array = self.arrays.get(term)
+                if array is None:
+                    array = self.arrays[term] = PostingArray()
+                array.add(uid, weight)
+        self._set_norm(uid, self._get_norm(vector))
+
+    def discard(self, uid):
+        vector = self.vectors.pop(uid, None)
+        if vector is None:
+            return
+
+        for term in vector:
+            entries = self.postings[term]
+            del entries[uid]
+            if self.use_numpy:
+                self.arrays[term].discard(uid)
+            if not entries:
+                del self.postings[term]
+                self.arrays.pop(term, None)
+        del self.norms[uid]
+        if self.norm_array is not None:
+            self.norm_array[uid] = np.inf
+
+    def update(self, item):
+        "Re-indexes an (edited) item."
+
+        self.add(item)
+
+    def similar(self, uid, k=10, exclude=()):
+        """
+        Returns the books most similar to the book of the uid.
+
+        Parameters:
+            uid : int
+                - a uid in the index
+            k (optional) : int
+                - the maximum number of books returned
+            exclude (optional) : collection
+                - uids that must not be returned
+
+        Return Value : list
+            - (uid, score) pairs, most similar first. The scores
+              are between 0 and 1.
+        """
+
+        if uid not in self.vectors:
+            raise KeyError(uid)
+
+        size = len(self.vectors)
+        if abs(size - self.norm_size) > SimilarityIndex.NORM_DRIFT * self.norm_size:
+            self._refresh_norms()
+
+        query = self._query_terms(self.vectors[uid])
+        if not query or not self.norms[uid]:
+            return list()
+
+        skip = set(exclude)
+        skip.add(uid)
+        if self.use_numpy:
+            found = self._score_numpy(query, k + len(skip))
+        else:
+            found = self._score_python(query, k + len(skip))
+
+        query_norm = self.norms[uid]
+        return [ (other, score / query_norm) for other, score in found if other not in skip ][:k]
+
+    # ------------------------------ #
+    # ------ Private Methods ------- #
+    # ------------------------------ #
+
+    def _idf(self, term):
+        return math.log(1.0 + len(self.vectors) / len(self.postings[term]))
+
+    def _get_norm(self, vector):
+        return math.sqrt(sum((weight * self._idf(term)) ** 2 for term, weight in vector.items()))
+
+    def _set_norm(self, uid, norm):
+        self.norms[uid] = norm
+        if not self.use_numpy:
+            return
+
+        if self.norm_array is None or uid >= len(self.norm_array):
+            size = max(16, 2 * (uid + 1))
+            grown = np.full(size, np.inf)
+            if self.norm_array is not None:
+                grown[:len(self.norm_array)] = self.norm_array
+            self.norm_array = grown
+        # a book without terms must never be divided by zero
+        self.norm_array[uid] = norm or np.inf
+
+    def _refresh_norms(self):
+        "Recomputes every norm with the current IDFs."
+
+        idfs = { term : self._idf(term) for term in self.postings }
+        # never shorter than before, since the removed entries of the
+        # PostingArrays may still have greater uids than any book left
+        if self.norm_array is not None:
+            self.norm_array = np.full(len(self.norm_array), np.inf)
+        for uid, vector in self.vectors.items():
+            self._set_norm(uid, math.sqrt(sum((weight * idfs[term]) ** 2 for term, weight in vector.items())))
+        self.norm_size = len(self.vectors)
+
+    def _query_terms(self, vector):
+        """
+        Returns the (term, weight * idf ** 2) of the query, heaviest first.
+
+        Rationale: Multiplying each entry of a term by this weight
+            gives the dot product of the query and that book.
+        """
+
+        size = len(self.vectors)
+        prune = size >= SimilarityIndex.PRUNE_FROM
+        terms = list()
+        for term, weight in vector.items():
+            df = len(self.postings[term])
+            if prune and df > SimilarityIndex.MAX_DF * size:
+                continue
+            idf = self._idf(term)
+            terms.append((term, weight * idf, idf))
+
+        terms = heapq.nlargest(SimilarityIndex.MAX_QUERY_TERMS, terms, key=lambda x : x[1])
+        return [ (term, query_weight * idf) for term, query_weight, idf in terms ]
+
+    def _score_python(self, query, k):
+        scores = dict()
+        for term, weight in query:
+            for uid, doc_weight in self.postings[term].items():
+                scores[uid] = scores.get(uid, 0.0) + weight * doc_weight
+
+        norms = self.norms
+        return heapq.nlargest(k, ( (uid, score / norms[uid]) for uid, score in scores.items() if norms[uid] ), key=lambda x : x[1])
+
+    def _score_numpy(self, query, k):
+        scores = np.zeros(len(self.norm_array))
+        for term, weight in query:
+            array = self.arrays[term]
+            # a uid is alive at most once per array, after any removed
+            # entry of it, so the (last) live weight is the one added
+            scores[array.uids[:array.size]] += weight * array.weights[:array.size]
+        scores /= self.norm_array
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            top = np.argpartition(scores[candidates], -k)[-k:]
+            candidates = candidates[top]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return [ (int(uid), float(scores[uid])) for uid in candidates ]
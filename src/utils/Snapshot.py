@@ -0,0 +1,319 @@
+"""
+Snapshot
+
+Contains the classes for reading the reading list from other threads.
+
+Includes:
+1. class Book - a read-only copy of a ReadingListItem
+2. class UidTrie - an immutable map of uid -> value
+3. class Snapshot - an immutable view of the reading list
+
+Rationale:
+    MetisClass changes its collections (and the items themselves)
+    in place, so another thread reading them may see a change
+    halfway through. Instead, every change publishes a new
+    Snapshot, which is never changed afterwards. A reader simply
+    takes the latest Snapshot (a single attribute read) and keeps
+    using it, however many changes are made in the meantime.
+
+    Copying the whole reading list on every change would be too
+    slow, so a new Snapshot shares everything but the changed
+    books with the previous one (see UidTrie).
+"""
+
+from types import MappingProxyType
+
+class Book:
+    """
+    A read-only copy of a ReadingListItem, as it was when copied.
+
+    Rationale: It has the same fields (and formatting) as a
+        ReadingListItem, so it can be used wherever one is only
+        read (e.g. sorting, searching or saving). Its fields must
+        never be assigned, since it is shared by every Snapshot
+        published until the book changes.
+    """
+
+    FIELDS = ('title', 'subtitle', 'author', 'date', 'summary', 'genre', 'available', 'uid')
+    __slots__ = FIELDS
+
+    def __init__(self, title, subtitle, author, date, summary, genre, available, uid):
+        self.title = title
+        self.subtitle = subtitle
+        self.author = author
+        self.date = date
+        self.summary = summary
+        self.genre = genre
+        self.available = available
+        self.uid = uid
+
+    def __repr__(self):
+        return f'Book({self.uid}, {self.format_book()!r})'
+
+    @classmethod
+    def of(cls, item):
+        "Copies a ReadingListItem."
+
+        return cls(item.title, item.subtitle, item.author, item.date, item.summary,
+                   frozenset(item.genre), item.available, item.uid)
+
+    def format_book(self):
+        return f'{self.title} ({self.date}) by {self.author}'
+
+    def get_uid(self):
+        return self.uid
+
+class UidTrie:
+    """
+    An immutable map of uid -> value (never None).
+
+    Rationale: The uids are small, consecutive integers, so the
+        values are kept in a trie of tuples indexed by the bits of
+        the uid, WIDTH values (or nodes) per tuple. Setting a value
+        only copies the tuples on the path to it (a few dozen
+        references), and the returned trie shares the rest.
+
+    Usage:
+        trie = UidTrie.from_items(metis.collection.items())
+        changed = trie.set(uid, value)      # trie is left unchanged
+        removed = trie.set(uid, None)
+    """
+
+    BITS = 5
+    WIDTH = 1 << BITS
+    MASK = WIDTH - 1
+    EMPTY = (None,) * WIDTH
+
+    __slots__ = ('root', 'shift', 'size')
+
+    def __init__(self, root=EMPTY, shift=0, size=0):
+        self.root = root
+        self.shift = shift          # the bits of the uid below the root
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, uid):
+        return self.get(uid) is not None
+
+    def __iter__(self):
+        "Yields the values, ordered by uid."
+
+        return self._walk(self.root, self.shift)
+
+    @classmethod
+    def from_items(cls, items):
+        "Builds a trie from (uid, value) pairs in one go."
+
+        items = [ (uid, value) for uid, value in items if value is not None ]
+        if not items:
+            return cls()
+
+        nodes = [None] * (max(uid for uid, _ in items) + 1)
+        for uid, value in items:
+            nodes[uid] = value
+
+        shift, width = 0, cls.WIDTH
+        while True:
+            nodes.extend([None] * (-len(nodes) % width))
+            nodes = [ tuple(nodes[i:i + width]) for i in range(0, len(nodes), width) ]
+            if len(nodes) == 1:
+                return cls(nodes[0], shift, len(items))
+            shift += cls.BITS
+
+    def get(self, uid, default=None):
+        if uid < 0 or uid >> self.shift >= UidTrie.WIDTH:
+            return default
+
+        node, shift, mask = self.root, self.shift, UidTrie.MASK
+        while shift:
+            node = node[(uid >> shift) & mask]
+            if node is None:
+                return default
+            shift -= UidTrie.BITS
+        value = node[uid & mask]
+        return default if value is None else value
+
+    def set(self, uid, value):
+        "Returns a trie where the uid has the value (removed if None)."
+
+        if uid < 0:
+            raise KeyError(uid)
+
+        size = self.size + (value is not None) - (self.get(uid) is not None)
+        root, shift = self.root, self.shift
+        while uid >> shift >= UidTrie.WIDTH:
+            root, shift = (root,) + UidTrie.EMPTY[1:], shift + UidTrie.BITS
+        return UidTrie(self._assoc(root, shift, uid, value), shift, size)
+
+    # ------------------------------ #
+    # ------ Private Methods ------- #
+    # ------------------------------ #
+
+    @staticmethod
+    def _assoc(node, shift, uid, value):
+        "Returns a copy of the node where the uid has the value."
+
+        i = (uid >> shift) & UidTrie.MASK
+        if shift:
+            child = node[i] if node[i] is not None else UidTrie.EMPTY
+            value = UidTrie._assoc(child, shift - UidTrie.BITS, uid, value)
+        return node[:i] + (value,) + node[i + 1:]
+
+    @staticmethod
+    def _walk(node, shift):
+        if not shift:
+            yield from ( value for value in node if value is not None )
+            return
+        for child in node:
+            if child is not None:
+                yield from UidTrie._walk(child, shift - UidTrie.BITS)
+
+class Snapshot:
+    """
+    The books and statistics of the reading list at one point in time.
+
+    Rationale: A Snapshot is never changed, so any thread can read
+        it without a lock. The statistics are kept up to date on
+        every change, so reading them does not go through the books.
+
+    Usage:
+        snapshot = metis.get_snapshot()     # any thread
+        snapshot.get(uid)                   # Book or None
+        snapshot.showable('dune', genres={'scifi'})
+        snapshot.stats()
+
+    Instance Variables:
+        books : UidTrie
+            - (key, value) pairs of (uid, Book)
+        unread : int
+            - the number of available books
+        genres : MappingProxyType
+            - (key, value) pairs of (genre, number of books with it).
+              Shared with the previous Snapshot if no count changed.
+        recently_read : tuple
+            - see MetisClass.recently_read_genre
+        version : int
+            - see MetisClass.version
+    """
+
+    __slots__ = ('books', 'unread', 'genres', 'recently_read', 'version')
+
+    def __init__(self, books, unread, genres, recently_read, version):
+        self.books = books
+        self.unread = unread
+        self.genres = genres if isinstance(genres, MappingProxyType) else MappingProxyType(genres)
+        self.recently_read = recently_read
+        self.version = version
+
+    def __len__(self):
+        return len(self.books)
+
+    def __contains__(self, uid):
+        return uid in self.books
+
+    def __iter__(self):
+        "Yields the Books, ordered by uid."
+
+        return iter(self.books)
+
+    # ----------------------------- #
+    # ------ Public Methods ------- #
+    # ----------------------------- #
+
+    @classmethod
+    def build(cls, items, recently_read=(), version=0):
+        "Builds a Snapshot from ReadingListItems."
+
+        books = [ Book.of(item) for item in items ]
+        genres = dict()
+        for book in books:
+            for genre in book.genre:
+                genres[genre] = genres.get(genre, 0) + 1
+        return cls(
+            UidTrie.from_items((book.uid, book) for book in books),
+            sum(book.available for book in books),
+            genres,
+            tuple(recently_read),
+            version,
+        )
+
+    def evolve(self, changes, recently_read, version):
+        """
+        Returns the Snapshot after the changes, sharing the unchanged books.
+
+        Rationale: The genre counts are shared as well, unless the
+            changes add or remove a genre of a book. Only then are
+            they copied, which costs O(number of genres).
+
+        Parameters:
+            changes : dict
+                - (key, value) pairs of (uid, Book, or None if deleted)
+            recently_read : tuple
+            version : int
+
+        Return Value : Snapshot
+        """
+
+        books, unread, counts = self.books, self.unread, dict()
+        for uid, book in changes.items():
+            old = books.get(uid)
+            if old is not None:
+                unread -= old.available
+                for genre in old.genre:
+                    counts[genre] = counts.get(genre, 0) - 1
+            if book is not None:
+                unread += book.available
+                for genre in book.genre:
+                    counts[genre] = counts.get(genre, 0) + 1
+            books = books.set(uid, book)
+
+        # most changes (e.g. toggling) keep the genres, so the counts
+        # are shared, and only copied when one of them changes
+        counts = { genre : count for genre, count in counts.items() if count }
+        genres = self.genres
+        if counts:
+            genres = dict(genres)
+            for genre, count in counts.items():
+                genres[genre] = genres.get(genre, 0) + count
+                if not genres[genre]:
+                    del genres[genre]
+        return Snapshot(books, unread, genres, tuple(recently_read), version)
+
+    def get(self, uid, default=None):
+        return self.books.get(uid, default)
+
+    def showable(self, search='', genres=None):
+        """
+        Returns the Books that match the search and have one of the genres.
+
+        Rationale: Same as MetisClass.is_showable before the search
+            indices are built, i.e. the search must be inside the
+            formatted book.
+
+        Parameters:
+            search (optional) : str
+            genres (optional) : set
+                - no genre filter if empty
+
+        Return Value : list
+            - the Books, ordered by uid
+        """
+
+        search = search.lower()
+        return [
+            book for book in self.books
+            if (not genres or not book.genre.isdisjoint(genres))
+            and search in book.format_book().lower()
+        ]
+
+    def stats(self):
+        "Returns the number of books and the genres (the most common first)."
+
+        return {
+            'books' : len(self.books),
+            'unread' : self.unread,
+            'genres' : dict(sorted(self.genres.items(), key=lambda x : (-x[1], x[0]))),
+            'recently_read' : list(self.recently_read),
+        }
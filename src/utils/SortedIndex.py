@@ -0,0 +1,85 @@
+"""
+Sorted Index
+
+Contains the class for keeping the items of a collection in order.
+
+Includes:
+1. class SortedIndex - the uids of the items, sorted by a key
+
+Rationale:
+    Sorting a big reading list whenever the order is needed is
+    too slow. Instead, the order is kept up to date as items are
+    inserted, edited and deleted, each of which only costs a
+    bisection (and a shift of the underlying list).
+"""
+
+from bisect import bisect_left, insort
+
+class SortedIndex:
+    """
+    Keeps the uids of the items sorted by a key.
+
+    Rationale: The key of an item is computed when it is added
+        and remembered, since an edited item no longer knows its
+        previous key (which is needed to find it). Hence, edits
+        must go through self.update. Ties are broken by the uid,
+        so every entry is unique and the order is stable.
+
+    Parameters:
+        key : function
+            - takes an item and returns a comparable value
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.entries = list()       # sorted (key, uid) pairs
+        self.keys = dict()          # uid : key of the item when it was added
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, uid):
+        return uid in self.keys
+
+    def rebuild(self, items):
+        "Indexes the items from scratch."
+
+        self.keys = { item.get_uid() : self.key(item) for item in items }
+        self.entries = sorted((key, uid) for uid, key in self.keys.items())
+
+    def add(self, item):
+        uid = item.get_uid()
+        if uid in self.keys:
+            self.discard(uid)
+
+        key = self.key(item)
+        self.keys[uid] = key
+        insort(self.entries, (key, uid))
+
+    def discard(self, uid):
+        if uid not in self.keys:
+            return
+        key = self.keys.pop(uid)
+        del self.entries[bisect_left(self.entries, (key, uid))]
+
+    def update(self, item):
+        "Moves an (edited) item to its new place."
+
+        self.discard(item.get_uid())
+        self.add(item)
+
+    def sort_key(self, uid):
+        "Returns the value that the uid is sorted by."
+
+        return (self.keys[uid], uid)
+
+    def uid_at(self, index):
+        return self.entries[index][1]
+
+    def uids(self, start=0, stop=None):
+        "Returns the uids from start (inclusive) to stop (exclusive)."
+
+        return [ uid for _, uid in self.entries[start:stop] ]
+
+    def __iter__(self):
+        return ( uid for _, uid in self.entries )
@@ -0,0 +1,207 @@
+"""
+Startup Timer
+
+Contains the class for timing the startup phases of the App.
+
+Includes:
+1. class StartupTimer - records the startup phases
+2. STARTUP - the StartupTimer used by the App
+
+Rationale:
+    Launch time is spread among several steps (sourcing the
+    theme, loading the modules, decoding the file, reloading
+    Metis, rendering the entries), some of which run in a
+    worker thread. To know which one is slow, each phase is
+    timestamped relative to the moment this module is imported,
+    and the time the process spent before that is measured
+    separately. The report is kept as a JSON record to compare
+    releases.
+
+    This module must NOT import tkinter since it is imported
+    before anything else to mark the start as early as possible.
+"""
+
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+class StartupTimer:
+    """
+    Records the phases of the App startup.
+
+    Rationale: A phase is a named span of time. Phases may be
+        nested or run in another thread, so each phase merely
+        records its own start and end, relative to self.origin.
+        The timer is considered done once all the required
+        milestones have been marked.
+
+    Instance Variables:
+        origin : float
+            - the perf_counter value when the timer is made
+        interpreter : float
+            - the CPU time the interpreter spent before the timer
+              is made (approximates the interpreter startup)
+        process_age : float or None
+            - the wall time since the process started, when the
+              timer is made. Only known on systems with /proc.
+        phases : list
+            - list of (name, thread name, start, end) tuples in seconds
+        milestones : dict
+            - (key, value) pairs of (name, seconds since origin)
+        details : dict
+            - extra information to be included in the report
+
+    Parameters:
+        required (optional) : iterable
+            - the milestones that must be marked before reporting
+    """
+
+    ENV_FLAG = 'METIS_STARTUP_REPORT'
+    CMD_FLAG = '--startup-report'
+    REPORT_PATH = 'startup_report.jsonl'
+
+    def __init__(self, required=('first_idle', 'data_ready')):
+        self.origin = time.perf_counter()
+        self.interpreter = time.process_time()
+        self.process_age = self._get_process_age()
+        self.phases = list()
+        self.milestones = dict()
+        self.details = dict()
+        self.required = set(required)
+        self.reported = False
+        self._lock = threading.Lock()
+
+    # ----------------------------- #
+    # ------ Public Methods ------- #
+    # ----------------------------- #
+
+    def elapsed(self):
+        "Returns the seconds since the timer is made."
+
+        return time.perf_counter() - self.origin
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Times the enclosed block as the phase called name.
+
+        Phases that happen after the report (e.g. loading another
+        file later on) are not startup phases, so they are ignored.
+        """
+
+        if self.reported:
+            yield
+            return
+
+        start = self.elapsed()
+        try:
+            yield
+        finally:
+            end = self.elapsed()
+            with self._lock:
+                self.phases.append((name, threading.current_thread().name, start, end))
+
+    def mark(self, name):
+        """
+        Marks a milestone and reports if it was the last required one.
+
+        Return Value : boolean
+            - tells whether the report has been made
+        """
+
+        with self._lock:
+            if name not in self.milestones:
+                self.milestones[name] = self.elapsed()
+            should_report = not self.reported and self.required.issubset(self.milestones)
+            if should_report:
+                self.reported = True
+
+        if should_report:
+            self.report()
+        return should_report
+
+    def detail(self, **kwargs):
+        "Adds extra information to the report."
+
+        self.details.update(kwargs)
+
+    def is_enabled(self):
+        "Tells whether the report should be printed."
+
+        return StartupTimer.CMD_FLAG in sys.argv or bool(os.environ.get(StartupTimer.ENV_FLAG))
+
+    def to_record(self):
+        "Returns the report as a JSON-serializable dict."
+
+        return {
+            'timestamp' : time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python' : platform.python_version(),
+            'platform' : platform.platform(),
+            'interpreter_cpu' : round(self.interpreter, 6),
+            'process_age' : None if self.process_age is None else round(self.process_age, 6),
+            'phases' : [
+                { 'name' : name, 'thread' : thread, 'start' : round(start, 6), 'end' : round(end, 6), 'duration' : round(end - start, 6) }
+                for name, thread, start, end in sorted(self.phases, key=lambda x : x[2])
+            ],
+            'milestones' : { name : round(value, 6) for name, value in self.milestones.items() },
+            'details' : self.details,
+        }
+
+    def format_report(self):
+        "Returns the report as a human-readable table."
+
+        lines = [ 'Metis startup report (seconds since start)' ]
+        lines.append(f'  {"interpreter (cpu)":<28}{self.interpreter:>10.4f}')
+        if self.process_age is not None:
+            lines.append(f'  {"interpreter (wall)":<28}{self.process_age:>10.4f}')
+        for name, thread, start, end in sorted(self.phases, key=lambda x : x[2]):
+            where = '' if thread == 'MainThread' else f' [{thread}]'
+            lines.append(f'  {name + where:<28}{start:>10.4f} -> {end:>8.4f}  ({(end - start) * 1000:.1f} ms)')
+        for name, value in sorted(self.milestones.items(), key=lambda x : x[1]):
+            lines.append(f'  {"* " + name:<28}{value:>10.4f}')
+        for name, value in self.details.items():
+            lines.append(f'  {name}: {value}')
+        return '\n'.join(lines)
+
+    def report(self):
+        """
+        Writes the JSON record and prints the report if enabled.
+
+        Rationale: The record is always appended (one line per
+            launch) so that regressions can be tracked, but the
+            console is only bothered when asked.
+        """
+
+        try:
+            with open(StartupTimer.REPORT_PATH, 'a') as report_file:
+                report_file.write(json.dumps(self.to_record()) + '\n')
+        except OSError as e:
+            print(e)
+
+        if self.is_enabled():
+            print(self.format_report())
+
+    # ------------------------------ #
+    # ------ Private Methods ------- #
+    # ------------------------------ #
+
+    @staticmethod
+    def _get_process_age():
+        "Returns the seconds since the process started, if known."
+
+        try:
+            with open('/proc/self/stat') as stat_file:
+                # the process name may contain spaces, so split after it
+                fields = stat_file.read().rsplit(')', 1)[1].split()
+            with open('/proc/uptime') as uptime_file:
+                uptime = float(uptime_file.read().split()[0])
+            start_ticks = int(fields[19])
+            return uptime - start_ticks / os.sysconf('SC_CLK_TCK')
+        except (OSError, ValueError, IndexError, AttributeError):
+            return None
+
+STARTUP = StartupTimer()
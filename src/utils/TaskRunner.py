@@ -0,0 +1,232 @@
+"""
+Task Runner
+
+Contains the classes for running backend work off the Tk thread.
+
+Includes:
+1. class TaskCancelled - raised inside a task that has been cancelled
+2. class Task - the handle of a submitted task
+3. class TaskRunner - runs tasks in worker threads and reports to Tk
+
+Rationale:
+    Tk is not thread-safe, so widgets may only be touched by the
+    thread running the mainloop. On the other hand, reading,
+    decoding and saving big reading lists freezes the window if
+    done on that thread. The TaskRunner bridges the two: tasks run
+    in a small pool of worker threads, and every result, error and
+    progress report is put into a queue that is drained on the Tk
+    thread by an after() pump. Hence, callbacks may safely touch
+    widgets, while tasks must NEVER do so.
+"""
+
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.Metrics import METRICS
+from utils.LagMonitor import LAG_MONITOR
+
+class TaskCancelled(Exception):
+    "Raised by Task.check once the task has been cancelled."
+
+class Task:
+    """
+    The handle of a submitted task, shared by the task and its submitter.
+
+    Rationale: Threads cannot be stopped from the outside, so
+        cancelling merely raises a flag. The task is expected to
+        call self.check every now and then, and the callbacks of
+        a cancelled task are never called.
+
+    Instance Variables:
+        name : str
+            - the name of the task (used in the metrics)
+        cancelled : boolean
+            - whether the task has been cancelled
+        done : boolean
+            - whether the task has finished (in any way)
+    """
+
+    def __init__(self, name, runner, on_done=None, on_error=None, on_progress=None):
+        self.name = name
+        self.cancelled = False
+        self.done = False
+
+        self._runner = runner
+        self._on_done = on_done
+        self._on_error = on_error
+        self._on_progress = on_progress
+        self._future = None
+
+    def cancel(self):
+        self.cancelled = True
+
+    def check(self):
+        "Raises TaskCancelled if the task has been cancelled (worker thread)."
+
+        if self.cancelled:
+            raise TaskCancelled(self.name)
+
+    def report(self, progress):
+        "Sends the progress to the on_progress callback (worker thread)."
+
+        if self._on_progress is not None and not self.cancelled:
+            self._runner._post(self, 'progress', progress)
+
+class TaskRunner:
+    """
+    Runs functions in worker threads and calls back on the Tk thread.
+
+    Usage:
+        def work(task, filepath):
+            ...
+            task.report('Decoding...')
+            task.check()
+            ...
+            return result
+
+        runner.submit(work, filepath, on_done=show, on_error=complain)
+
+    Rationale: The pump only runs while there are unfinished
+        tasks, so an idle App does not wake up for nothing.
+
+    Parameters:
+        window : tk.Tk
+            - the window whose mainloop runs the callbacks
+        max_workers (optional) : int
+            - the number of worker threads
+        poll_ms (optional) : int
+            - the time between pumps while tasks are running
+    """
+
+    def __init__(self, window, max_workers=2, poll_ms=30):
+        self.window = window
+        self.poll_ms = poll_ms
+
+        self.tasks = set()          # unfinished tasks
+        self.pump_job = None
+        self.closed = False
+
+        self._messages = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='MetisWorker')
+
+    # ----------------------------- #
+    # ------ Public Methods ------- #
+    # ----------------------------- #
+
+    def submit(self, func, *args, name=None, on_done=None, on_error=None, on_progress=None, **kwargs):
+        """
+        Runs func(task, *args, **kwargs) in a worker thread.
+
+        Parameters:
+            func : function
+                - the work. It receives the Task as its first argument.
+            name (optional) : str
+                - the name of the task. Defaults to the name of func.
+            on_done (optional) : function
+                - called with the return value of func (Tk thread)
+            on_error (optional) : function
+                - called with the exception raised by func (Tk thread).
+                  If not given, the exception is printed.
+            on_progress (optional) : function
+                - called with every progress reported (Tk thread)
+
+        Return Value : Task
+        """
+
+        if self.closed:
+            raise RuntimeError('The TaskRunner has been shut down.')
+
+        task = Task(name or getattr(func, '__name__', 'task'), self, on_done, on_error, on_progress)
+        self.tasks.add(task)
+        task._future = self._executor.submit(self._run, task, func, args, kwargs)
+        METRICS.count('TaskRunner.submitted')
+
+        if self.pump_job is None:
+            self.pump_job = self.window.after(self.poll_ms, self._pump)
+        return task
+
+    def is_busy(self):
+        return bool(self.tasks)
+
+    def cancel_all(self):
+        for task in self.tasks:
+            task.cancel()
+
+    def shutdown(self):
+        "Cancels every task and stops the workers (without waiting for them)."
+
+        self.closed = True
+        self.cancel_all()
+        if self.pump_job is not None:
+            self.window.after_cancel(self.pump_job)
+            self.pump_job = None
+        # the tasks that have not started are dropped (cancel_futures needs Python 3.9)
+        for task in self.tasks:
+            task._future.cancel()
+        self._executor.shutdown(wait=False)
+
+    # ------------------------------ #
+    # ------ Private Methods ------- #
+    # ------------------------------ #
+
+    def _post(self, task, kind, payload):
+        self._messages.put((task, kind, payload))
+
+    def _run(self, task, func, args, kwargs):
+        "Runs the task (worker thread)."
+
+        start = time.perf_counter()
+        try:
+            task.check()
+            result = func(task, *args, **kwargs)
+            task.check()
+        except TaskCancelled:
+            self._post(task, 'cancelled', None)
+        except Exception as e:
+            self._post(task, 'error', e)
+        else:
+            self._post(task, 'done', result)
+        finally:
+            METRICS.observe(f'Task.{task.name}', time.perf_counter() - start)
+
+    def _pump(self):
+        "Delivers the messages of the workers (Tk thread)."
+
+        self.pump_job = None
+        if self.closed:
+            return
+
+        try:
+            self._deliver()
+        finally:
+            # a failing callback must not stall the other tasks
+            if self.tasks and not self.closed:
+                self.pump_job = self.window.after(self.poll_ms, self._pump)
+
+    def _deliver(self):
+        while True:
+            try:
+                task, kind, payload = self._messages.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == 'progress':
+                if not task.cancelled and not task.done:
+                    LAG_MONITOR.track(f'{task.name}.on_progress')(task._on_progress)(payload)
+                continue
+
+            task.done = True
+            self.tasks.discard(task)
+            if task.cancelled or kind == 'cancelled':
+                METRICS.count('TaskRunner.cancelled')
+                continue
+
+            # the callbacks run on the Tk thread, so they may stall it
+            if kind == 'done':
+                if task._on_done is not None:
+                    LAG_MONITOR.track(f'{task.name}.on_done')(task._on_done)(payload)
+            elif task._on_error is not None:
+                LAG_MONITOR.track(f'{task.name}.on_error')(task._on_error)(payload)
+            else:
+                print(f'Task {task.name} failed: {payload!r}')
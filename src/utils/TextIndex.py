@@ -0,0 +1,370 @@
+"""
+Text Index
+
+Contains the class for searching the text of the books.
+
+Includes:
+1. class TextIndex - a ranked (BM25) full-text index
+
+Rationale:
+    Searching used to only look for the query inside the title,
+    date and author of each book, one book at a time. Instead,
+    the words of the title, subtitle, author and summary are
+    kept in an inverted index (word -> books with the word), so
+    finding the books with every word of a query only costs a
+    few set intersections. The books found are ranked by BM25,
+    which favors books where the words are frequent, rare
+    elsewhere and not drowned in a long summary.
+
+    Like the SimilarityIndex, the top results are scored with NumPy
+    when it is installed, and in pure Python otherwise.
+"""
+
+import heapq
+import math
+import re
+
+from utils.SimilarityIndex import PostingArray, np
+
+class TextIndex:
+    """
+    Finds and ranks the books that contain every word of a query.
+
+    Query Syntax:
+        shadow king         - books with both words, anywhere
+        "shadow king"       - books with the words next to each other
+        shadow "iron crown" - both can be mixed
+
+    Rationale: Positions are NOT stored, since a list of positions
+        per word per book costs too much memory. Instead, phrases
+        are looked up as words first, and only the books found are
+        checked for the phrase itself. When only the top results
+        are needed, the books are checked best first, until enough
+        are found. A phrase never spans two fields (e.g. the end of
+        the title and the author).
+
+        Words are only found whole, so searching must still fall
+        back to a substring check for partially typed words (see
+        MetisClass.is_showable).
+
+    Instance Variables:
+        postings : dict
+            - (key, value) pairs of (word, { uid : count in the book })
+        lengths : dict
+            - (key, value) pairs of (uid, number of words of the book)
+        version : int
+            - incremented on every change, so that results can be cached
+
+    Parameters:
+        use_numpy (optional) : boolean
+            - whether to score the top results with NumPy. Defaults
+              to whether NumPy is installed.
+    """
+
+    FIELDS = ('title', 'subtitle', 'author', 'summary')
+    WORD_PATTERN = re.compile(r'[^\W_]+')
+    QUERY_PATTERN = re.compile(r'"([^"]*)"?|(\S+)')
+
+    # BM25 parameters
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, use_numpy=None):
+        self.use_numpy = np is not None and (use_numpy is None or use_numpy)
+
+        self.postings = dict()
+        self.lengths = dict()
+        self.words = dict()         # uid : the distinct words of the book
+        self.total_length = 0
+        self.version = 0
+
+        # NumPy only
+        self.arrays = dict()        # word : PostingArray of the counts
+        self.length_array = None    # uid -> number of words (0 if there is no such book)
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def __contains__(self, uid):
+        return uid in self.lengths
+
+    # ----------------------------- #
+    # ------ Public Methods ------- #
+    # ----------------------------- #
+
+    @classmethod
+    def tokenize(cls, text):
+        "Returns the (case-folded) words of the text."
+
+        return cls.WORD_PATTERN.findall(text.casefold()) if text else list()
+
+    @classmethod
+    def parse(cls, query):
+        """
+        Returns the phrases of the query.
+
+        Return Value : list
+            - a list of phrases, each a list of words. A lone word
+              is a phrase of one word (unless it is split, e.g.
+              "king's" is the phrase ['king', 's']).
+        """
+
+        phrases = list()
+        for quoted, bare in cls.QUERY_PATTERN.findall(query):
+            words = cls.tokenize(quoted or bare)
+            if words:
+                phrases.append(words)
+        return phrases
+
+    def rebuild(self, items):
+        "Indexes the items from scratch."
+
+        self.postings.clear()
+        self.lengths.clear()
+        self.words.clear()
+        self.arrays.clear()
+        self.length_array = None
+        self.total_length = 0
+
+        use_numpy, self.use_numpy = self.use_numpy, False
+        for item in items:
+            self.add(item)
+        self.use_numpy = use_numpy
+
+        # the arrays are built in bulk instead
+        if self.use_numpy:
+            for word, entries in self.postings.items():
+                self.arrays[word] = PostingArray.from_entries(entries)
+            for uid, length in self.lengths.items():
+                self._set_length(uid, length)
+
+    def add(self, item):
+        uid = item.get_uid()
+        if uid in self.lengths:
+            self.discard(uid)
+
+        counts, length = dict(), 0
+        for field in TextIndex.FIELDS:
+            for word in self.tokenize(getattr(item, field, None)):
+                counts[word] = counts.get(word, 0) + 1
+                length += 1
+
+        postings = self.postings
+        for word, count in counts.items():
+            entries = postings.get(word)
+            if entries is None:
+                entries = postings[word] = dict()
+            entries[uid] = count
+
+        if self.use_numpy:
+            for word, count in counts.items():
+                array = self.arrays.get(word)
+                if array is None:
+                    array = self.arrays[word] = PostingArray()
+                array.add(uid, count)
+            self._set_length(uid, length)
+
+        self.words[uid] = tuple(counts)
+        self.lengths[uid] = length
+        self.total_length += length
+        self.version += 1
+
+    def discard(self, uid):
+        words = self.words.pop(uid, None)
+        if words is None:
+            return
+
+        for word in words:
+            entries = self.postings[word]
+            del entries[uid]
+            if self.use_numpy:
+                self.arrays[word].discard(uid)
+            if not entries:
+                del self.postings[word]
+                self.arrays.pop(word, None)
+        self.total_length -= self.lengths.pop(uid)
+        if self.use_numpy:
+            self.length_array[uid] = 0
+        self.version += 1
+
+    def update(self, item):
+        "Re-indexes an (edited) item."
+
+        self.add(item)
+
+    def matches(self, query, items):
+        """
+        Returns the uids of the books that match the query.
+
+        Parameters:
+            query : str
+            items : dict
+                - (key, value) pairs of (uid, ReadingListItem), used
+                  to check the phrases (e.g. MetisClass.collection)
+
+        Return Value : set
+            - empty if the query has no words
+        """
+
+        found = None
+        # the rarest phrases first, so the candidates shrink the fastest
+        for phrase in sorted(self.parse(query), key=self._rarity):
+            candidates = self._with_words(phrase, found)
+            if len(phrase) > 1:
+                pattern = self._get_pattern(phrase)
+                candidates = { uid for uid in candidates if self._has_phrase(items[uid], pattern) }
+            found = candidates
+            if not found:
+                break
+        return found or set()
+
+    def score(self, query, uids):
+        """
+        Returns the BM25 score of each uid for the words of the query.
+
+        Return Value : dict
+            - (key, value) pairs of (uid, score). Uids not in the
+              index score 0.
+        """
+
+        size = len(self.lengths)
+        if not size:
+            return dict.fromkeys(uids, 0.0)
+
+        k1, b = TextIndex.K1, TextIndex.B
+        lengths, scale = self.lengths, b / (self.total_length / size)
+        words = { word for phrase in self.parse(query) for word in phrase }
+
+        scores = dict.fromkeys(uids, 0.0)
+        for word in words:
+            entries = self.postings.get(word)
+            if not entries:
+                continue
+            weight = self._idf(word) * (k1 + 1.0)
+            for uid in scores:
+                count = entries.get(uid)
+                if count:
+                    scores[uid] += weight * count / (count + k1 * (1.0 - b + scale * lengths[uid]))
+        return scores
+
+    def search(self, query, items, k=None):
+        """
+        Returns the books that match the query, best first.
+
+        Parameters:
+            query : str
+            items : dict
+                - see self.matches
+            k (optional) : int
+                - the maximum number of results
+
+        Return Value : list
+            - (uid, score) pairs
+        """
+
+        if k is None:
+            scores = self.score(query, self.matches(query, items))
+            return sorted(scores.items(), key=lambda x : (-x[1], x[0]))
+
+        phrases = self.parse(query)
+        words = list({ word for phrase in phrases for word in phrase })
+        if not words or any(word not in self.postings for word in words):
+            return list()
+
+        # the books with all the words, best first (phrases not checked yet)
+        has_phrases = any(len(phrase) > 1 for phrase in phrases)
+        if self.use_numpy:
+            # some of the best may lack the phrase, so all might be needed
+            ranked = self._rank_numpy(words, None if has_phrases else k)
+        else:
+            scores = self.score(query, self._with_words(words))
+            if has_phrases:
+                ranked = sorted(scores.items(), key=lambda x : (-x[1], x[0]))
+            else:
+                ranked = heapq.nsmallest(k, scores.items(), key=lambda x : (-x[1], x[0]))
+
+        patterns = [ self._get_pattern(phrase) for phrase in phrases if len(phrase) > 1 ]
+        results = list()
+        for uid, score in ranked:
+            if all(self._has_phrase(items[uid], pattern) for pattern in patterns):
+                results.append((uid, score))
+                if len(results) == k:
+                    break
+        return results
+
+    # ------------------------------ #
+    # ------ Private Methods ------- #
+    # ------------------------------ #
+
+    def _idf(self, word):
+        size, df = len(self.lengths), len(self.postings[word])
+        return math.log(1.0 + (size - df + 0.5) / (df + 0.5))
+
+    def _set_length(self, uid, length):
+        if self.length_array is None or uid >= len(self.length_array):
+            grown = np.zeros(max(16, 2 * (uid + 1)))
+            if self.length_array is not None:
+                grown[:len(self.length_array)] = self.length_array
+            self.length_array = grown
+        self.length_array[uid] = length
+
+    def _rank_numpy(self, words, k=None):
+        """
+        Yields the (uid, score) of the books with every word, best first.
+
+        Parameters:
+            words : list
+            k (optional) : int
+                - only the best k are returned (and sorted)
+        """
+
+        k1, b = TextIndex.K1, TextIndex.B
+        norms = k1 * (1.0 - b + b * self.length_array / (self.total_length / len(self.lengths)))
+        scores = np.zeros(len(self.length_array))
+        hits = np.zeros(len(self.length_array), dtype=np.int32)
+
+        for word in words:
+            array = self.arrays[word]
+            uids, counts = array.uids[:array.size], array.weights[:array.size]
+            # removed entries have a count of 0, so they add nothing
+            scores[uids] += self._idf(word) * (k1 + 1.0) * counts / (counts + norms[uids])
+            hits[uids] += counts > 0
+
+        candidates = np.flatnonzero(hits == len(words))
+        if k is not None and k < len(candidates):
+            # the ties at the k-th score are all kept, so that they are broken by the uid
+            threshold = np.partition(scores[candidates], len(candidates) - k)[len(candidates) - k]
+            candidates = candidates[scores[candidates] >= threshold]
+
+        # lazily, since checking the phrases of the best few is usually enough
+        candidates = candidates[np.lexsort((candidates, -scores[candidates]))][:k]
+        return ( (int(uid), float(scores[uid])) for uid in candidates )
+
+    def _rarity(self, phrase):
+        return min(len(self.postings.get(word, ())) for word in phrase)
+
+    def _with_words(self, words, within=None):
+        "Returns the uids of the books with every word (and within the given uids)."
+
+        buckets = sorted((self.postings.get(word, dict()) for word in words), key=len)
+        found = set(buckets[0]) if within is None else { uid for uid in within if uid in buckets[0] }
+        for bucket in buckets[1:]:
+            if not found:
+                break
+            found = { uid for uid in found if uid in bucket } if len(found) < len(bucket) else found.intersection(bucket)
+        return found
+
+    @staticmethod
+    def _get_pattern(phrase):
+        "Returns the regex of the words of the phrase next to each other."
+
+        return re.compile(r'(?<![^\W_])' + r'[\W_]+'.join(map(re.escape, phrase)) + r'(?![^\W_])')
+
+    def _has_phrase(self, item, pattern):
+        "Tells whether a field of the item has the phrase (see self._get_pattern)."
+
+        for field in TextIndex.FIELDS:
+            text = getattr(item, field, None)
+            if text and pattern.search(text.casefold()):
+                return True
+        return False
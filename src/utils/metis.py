@@ -6,6 +6,9 @@ the application.
 
 Includes:
 1. class MetisClass - the main backend
+2. class FilterPass - a filter pass that can be run in slices
+3. class SortedView - a live, sorted sequence of the collection
+4. function writer - serializes the methods that change Metis
 
 Rationale: 
     To reduce any inconsistencies, the application
@@ -18,10 +21,40 @@ Rationale:
 """
 
 from collections import deque
+import functools
+import importlib
 import random
+import threading
 
 from utils.SaveFile import *
 from utils.ReadingListItem import *
+from utils.Metrics import METRICS
+from utils.GenreIndex import GenreIndex
+from utils.GenreBits import GenreBits
+from utils.SortedIndex import SortedIndex
+from utils.Snapshot import Book, Snapshot
+
+def writer(method):
+    """
+    Serializes the calls of a method that changes Metis (see MetisClass.write_lock).
+
+    Rationale: A writer may call other writers (e.g. edit_item
+        toggles the item), so the changes are only published
+        once the outermost writer is done. Readers never see
+        half of a change.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.write_lock:
+            self.writes += 1
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self.writes -= 1
+                if not self.writes:
+                    self._publish()
+    return wrapper
 
 class MetisClass:
     """
@@ -43,11 +76,18 @@ class MetisClass:
         recently_read_genre : collections.deque
             - stores the recently read genre. Used in improving
               the request book heuristics.
-        available_genres : set
-            - stores ALL of the genres that have been used
+        available_genres : GenreIndex
+            - stores ALL of the genres that have been used. It is
+              a set that can also be searched (e.g. for autocomplete)
         search_filter : string
-            - search_filter must be in the entry's format_book
-              for it to available.
+            - search_filter must be in the entry's format_book, or
+              its words in the entry's text (see TextIndex), for it
+              to available.
+        sort_by : string
+            - the key (see SORT_KEYS) that orders the entries
+        rank_by_relevance : boolean
+            - whether the search results are ordered by how well they
+              match the search instead (see self.sort_key)
         
         Private variables
         - These can still be used by other entities, but they
@@ -65,20 +105,95 @@ class MetisClass:
         next_uid : int
             - the next available uid available. This will be updated
               when a new entry is made.
+        sorted_indices : dict
+            - (key, value) pairs of (sort key, SortedIndex). An index
+              is only built once it is first used (see self.get_index)
+              and is maintained from then on.
+        genre_bits : GenreBits
+            - gives every genre used an id (see self.get_genre_mask).
+              The entries' genres are frozensets shared through it,
+              and filtering and requesting compare their bitmasks
+              instead of the genre strings.
+        search_cache : tuple
+            - the matches (and scores) of the search filter in the
+              text index (see self.get_search_matches)
+        fuzzy_matches : dict
+            - (key, value) pairs of (uid, number of typos) of the
+              entries close to the search filter, which are only
+              shown when nothing matches it (see FilterPass.apply)
+        lazy_indices : dict
+            - (key, value) pairs of (name, index) of the built indices
+              of LAZY_INDICES. An index is missing until it is built
+              (see self.start_build) and is maintained from then on.
+        builds : dict
+            - (key, value) pairs of (name, (index, list of changed uids))
+              of the builds in progress. The changes made in the meantime
+              are replayed once the build finishes.
+
+        Thread Safety
+
+        Metis is meant to be used by a single (owner) thread. Other
+        threads read the entries through self.get_snapshot, without
+        any lock. The methods that change the entries (see writer)
+        are serialized, and each one publishes a new Snapshot.
+
+        write_lock : threading.RLock
+            - held by the writers while they change Metis
+        snapshot : Snapshot
+            - the latest published Snapshot. None until first
+              needed (see self.get_snapshot) and after reloading.
+        unpublished : set
+            - the uids changed by the current write
+        version : int
+            - incremented on every published change
     """
 
+    # sort key : function that returns the value to sort an item by
+    SORT_KEYS = {
+        'added' : lambda item : 0,      # ties are broken by the uid
+        # str(), since a hand-written file may have e.g. a numeric date
+        'title' : lambda item : str(item.title or '').casefold(),
+        'author' : lambda item : str(item.author or '').casefold(),
+        'date' : lambda item : str(item.date or '').casefold(),
+    }
+    RELEVANCE = 'relevance'
+
+    # name : (module, class) of the indices that are only built when needed.
+    # They are only imported once built, since NumPy is slow to import.
+    LAZY_INDICES = {
+        'similarity' : ('utils.SimilarityIndex', 'SimilarityIndex'),
+        'text' : ('utils.TextIndex', 'TextIndex'),
+        'fuzzy' : ('utils.FuzzyIndex', 'FuzzyIndex'),
+    }
+
     def __init__(self):
         self.collection = dict()
         self.filter = set()
         self.indices = dict()
         self.availables = set()
+        self.sorted_indices = dict()
+        self.genre_bits = GenreBits()
+        self.lazy_indices = dict()
+        self.builds = dict()
+        self.search_cache = None
+        self.fuzzy_matches = dict()
+
+        self.write_lock = threading.RLock()
+        self.writes = 0             # the depth of the writers running
+        self.snapshot = None
+        self.unpublished = set()
+        self.version = 0
 
         self.next_uid = 0
 
-        self.available_genres = set()
+        self.available_genres = GenreIndex()
         self.recently_read_genre = deque()
         self.search_filter = ''
+        self.sort_by = 'added'
+        self.rank_by_relevance = False
 
+    @METRICS.timed('Metis.reload')
+    @writer
     def reload(self, save_file : SaveFile = SaveFile()):
         """
         Loads a SaveFile.
@@ -99,17 +214,85 @@ class MetisClass:
         # a private variable so assigning is permitted
         self.indices = { item.format_book().lower() : item.get_uid() for item in self.collection.values() }
 
-        # a private variable
+        # private variables, the genre ids are compacted on every reload
+        self.genre_bits = GenreBits()
+        self.genre_bits.intern_all(item.genre for item in self.collection.values())
+        for item in self.collection.values():
+            self._index_genres(item)
+
+        # private variables
+        self.fuzzy_matches = dict()
         self.availables = set(filter(self.is_available, self.collection.values()))
+        self.sorted_indices = dict()
+        self.lazy_indices = dict()
+        self.builds = dict()
+        self.search_cache = None
+        self.get_index()
         self.available_genres.clear()
-        self.available_genres.update(set(genre for item in self.collection.values() for genre in item.genre))
+        self.available_genres.update(self.genre_bits.names)
 
         self.recently_read_genre.clear()
         self.recently_read_genre.extend(save_file.recently_read)
 
         if save_file.collection:
             self.next_uid = max(x.get_uid() for x in self.collection.values()) + 1
-    
+
+        # rebuilt once needed
+        self.snapshot = None
+        self.unpublished = set()
+        self.version += 1
+
+    @writer
+    def adopt(self, other):
+        """
+        Loads the state of another, already reloaded, MetisClass.
+
+        Rationale: Reloading builds every index from scratch, which
+            is slow for big reading lists. This lets the building
+            happen elsewhere (e.g. a worker thread) while keeping
+            the references used by the frontend intact.
+
+        Warning: Same as self.reload, this overhauls the current data.
+        Also, do not use other afterwards since the private
+        collections are shared instead of copied.
+
+        Parameter:
+            other : MetisClass
+                - the backend whose state will be taken
+        """
+
+        self.collection.clear()
+        self.collection.update(other.collection)
+
+        self.filter.clear()
+        self.filter.update(other.filter)
+
+        self.indices = other.indices
+        self.availables = other.availables
+        self.sorted_indices = other.sorted_indices
+        self.genre_bits = other.genre_bits
+        self.lazy_indices = other.lazy_indices
+        self.builds = dict()
+        self.search_cache = None
+        self.fuzzy_matches = dict()
+
+        self.available_genres.clear()
+        self.available_genres.update(other.available_genres)
+
+        self.recently_read_genre.clear()
+        self.recently_read_genre.extend(other.recently_read_genre)
+
+        self.next_uid = other.next_uid
+
+        self.snapshot = None
+        self.unpublished = set()
+        self.version += 1
+
+        # the availables were computed with the other's search filter
+        if self.search_filter != other.search_filter:
+            self.reload_available()
+
+    @METRICS.timed('Metis.reload_available')
     def reload_available(self):
         """
         Recomputes self.availables.
@@ -118,8 +301,299 @@ class MetisClass:
         to reload the GUI afterwards, if not yet done.
         """
 
-        self.availables = set(filter(self.is_available, self.collection.values()))
+        filter_mask = self.get_filter_mask()
+        is_showable = self.is_showable
+        self.availables = { item for item in self.collection.values() if item.available and is_showable(item, filter_mask) }
+
+        METRICS.count('Metis.filter_passes')
+        METRICS.count('Metis.items_scanned', len(self.collection))
+        METRICS.gauge('Metis.items_scanned_last_pass', len(self.collection))
+        METRICS.gauge('Metis.availables', len(self.availables))
+
+    def get_index(self, sort_by=None):
+        """
+        Returns the SortedIndex of the sort key, building it if needed.
+
+        Parameter:
+            sort_by (optional) : str
+                - a key of SORT_KEYS. Defaults to self.sort_by.
+        
+        Return Value : SortedIndex
+        """
+
+        sort_by = sort_by or self.sort_by
+        index = self.sorted_indices.get(sort_by)
+        if index is None:
+            index = self.sorted_indices[sort_by] = SortedIndex(MetisClass.SORT_KEYS[sort_by])
+            index.rebuild(self.collection.values())
+        return index
+
+    def set_sort(self, sort_by):
+        """
+        Changes the order of the entries.
+
+        Rationale: Relevance only makes sense for search results,
+            so sorting by relevance keeps self.sort_by as it is,
+            which still orders the entries whenever nothing is
+            searched (and breaks the ties of relevance).
+        """
+
+        if sort_by == MetisClass.RELEVANCE:
+            self.rank_by_relevance = True
+            return
+        if sort_by not in MetisClass.SORT_KEYS:
+            raise KeyError(f'Cannot sort by {sort_by}.')
+        self.rank_by_relevance = False
+        self.sort_by = sort_by
+        self.get_index()
+
+    def is_ranking(self):
+        "Tells whether the entries are currently ordered by relevance."
+
+        return self.rank_by_relevance and bool(self.search_filter.strip())
+
+    def sort_key(self, item):
+        "Returns the value the item is currently sorted by."
+
+        uid = item.get_uid()
+        key = self.get_index().sort_key(uid)
+        if self.is_ranking():
+            # the close matches (if shown) rank by their typos instead
+            score = self.get_search_scores().get(uid, -self.fuzzy_matches.get(uid, 0))
+            return (-score, key)
+        return key
+
+    def sort_items(self, items):
+        "Returns the items (which must be in the collection) in the current order."
+
+        return sorted(items, key=self.sort_key)
+
+    def find_position(self, items, item):
+        """
+        Returns where the item goes among the items, which are in the current order.
+
+        Rationale: Same as bisect.bisect(items, key=self.sort_key),
+            which needs Python 3.10.
+        """
+
+        key, low, high = self.sort_key(item), 0, len(items)
+        while low < high:
+            middle = (low + high) // 2
+            if key < self.sort_key(items[middle]):
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def iter_ordered(self):
+        "Yields every entry in the current order."
+
+        collection = self.collection
+        return ( collection[uid] for uid in self.get_index() )
+
+    def get_genre_mask(self, item):
+        "Returns the bitmask of the item's genres."
+
+        # the genres of the entries are the frozensets of self.genre_bits
+        genres = item.genre
+        entry = self.genre_bits.sets.get(genres) if type(genres) is frozenset else None
+        if entry is None:
+            # not in the collection (yet), so its genres may be new
+            return self.genre_bits.peek_mask(genres)
+        return entry[0]
+
+    def get_filter_mask(self):
+        """
+        Returns the bitmask of the genres in the filter.
+
+        Rationale: The filter is edited in place by the frontend,
+            so the bitmask cannot be kept up to date. Instead, it
+            is computed once per pass (it is only a few genres).
+        """
+
+        return self.genre_bits.peek_mask(self.filter)
+
+    def has_filters(self):
+        "Tells whether every entry is showable regardless of its data."
+
+        return bool(self.filter or self.search_filter)
+
+    def start_build(self, name):
+        """
+        Prepares the building of one of LAZY_INDICES.
+
+        Rationale: Building the lazy indices of a big reading list
+            takes seconds, so they are meant to be built elsewhere
+            (e.g. a worker thread) through:
+
+                index, items = metis.start_build('text')
+                index.rebuild(items)                # anywhere
+                metis.finish_build('text', index)
+
+            The entries inserted, edited and deleted in the meantime
+            are noted and replayed when the build finishes.
+
+        Return Value : (index, list)
+            - the empty index and the entries it must be built from
+        """
+
+        module, cls = MetisClass.LAZY_INDICES[name]
+        index = getattr(importlib.import_module(module), cls)()
+        self.builds[name] = (index, list())
+        return index, list(self.collection.values())
+
+    @writer
+    def finish_build(self, name, index):
+        """
+        Makes the built index the lazy index and tells if it was used.
+
+        The index is dropped if Metis has been reloaded (or another
+        build of the same index has been started) since it was started.
+
+        Return Value : boolean
+        """
+
+        build = self.builds.get(name)
+        if build is None or build[0] is not index:
+            return False
+
+        for uid in build[1]:
+            item = self.collection.get(uid)
+            if item is None:
+                index.discard(uid)
+            else:
+                index.update(item)
+        self.lazy_indices[name] = index
+        del self.builds[name]
+        self.search_cache = None
+        return True
+
+    def cancel_build(self, name, index):
+        "Forgets the build of the index (e.g. if it failed)."
+
+        build = self.builds.get(name)
+        if build is not None and build[0] is index:
+            del self.builds[name]
+
+    def is_building(self, name):
+        return name in self.builds
+
+    def is_built(self, name):
+        return name in self.lazy_indices
+
+    def get_snapshot(self):
+        """
+        Returns the latest Snapshot of the entries (from any thread).
+
+        Rationale: Most readers never need a Snapshot, so the first
+            one is only built when first asked for (while holding
+            the write lock). Afterwards, every change publishes the
+            next one from the previous one, and getting it is a
+            single read without any lock.
+
+        Return Value : Snapshot
+        """
+
+        snapshot = self.snapshot
+        if snapshot is None:
+            with self.write_lock:
+                if self.snapshot is None:
+                    self.snapshot = Snapshot.build(self.collection.values(), self.recently_read_genre, self.version)
+                snapshot = self.snapshot
+        return snapshot
+
+    @METRICS.timed('Metis.similar_items')
+    def similar_items(self, item, k=10):
+        """
+        Returns the entries most like the item, most similar first.
+
+        Warning: The 'similarity' index must have been built first.
+
+        Return Value : list
+            - (ReadingListItem, score) pairs, the scores being
+              between 0 and 1
+        """
+
+        found = self.lazy_indices['similarity'].similar(item.get_uid(), k)
+        return [ (self.collection[uid], score) for uid, score in found ]
+
+    @METRICS.timed('Metis.search')
+    def search(self, query, k=10):
+        """
+        Returns the entries whose text matches the query, best first.
+
+        Rationale: Unlike the search filter, this does not check
+            every entry, so it is meant for quick lookups (e.g. the
+            top few results). See TextIndex for the query syntax.
+
+        Warning: The 'text' index must have been built first.
+
+        Return Value : list
+            - (ReadingListItem, BM25 score) pairs
+        """
+
+        found = self.lazy_indices['text'].search(query, self.collection, k)
+        return [ (self.collection[uid], score) for uid, score in found ]
+
+    @METRICS.timed('Metis.fuzzy_search')
+    def fuzzy_search(self, query, k=10):
+        """
+        Returns the entries whose titles and authors are close to the query.
+
+        Rationale: Meant for queries with typos, which the search
+            finds nothing for. See FuzzyIndex for what is close.
+
+        Warning: The 'fuzzy' index must have been built first.
+
+        Return Value : list
+            - (ReadingListItem, number of typos) pairs, the fewest
+              typos first
+        """
+
+        found = self.lazy_indices['fuzzy'].search(query, k)
+        return [ (self.collection[uid], typos) for uid, typos in found ]
+
+    def get_search_matches(self):
+        """
+        Returns the uids whose text matches the search filter.
+
+        Rationale: The matches are found once per search (and per
+            change of the text index), not once per entry.
+
+        Return Value : set
+            - empty if the 'text' index is not built yet
+        """
+
+        return self._get_search_cache()[1]
+
+    def get_search_scores(self):
+        "Returns the (uid, BM25 score) of the matches of the search filter."
+
+        cache = self._get_search_cache()
+        if cache[2] is None:
+            index = self.lazy_indices.get('text')
+            scores = index.score(self.search_filter, cache[1]) if index is not None else dict()
+            self.search_cache = cache = cache[:2] + (scores,)
+        return cache[2]
+
+    def start_filter_pass(self, chunk_size=2000):
+        """
+        Returns a FilterPass over the current filters.
+
+        Rationale: For big reading lists, self.reload_available
+            takes long enough to be noticed, which blocks whoever
+            called it. A FilterPass does the same work in slices so
+            that the caller may do something else in between.
+
+            The close matches of the previous search are dropped,
+            since the pass decides whether to show them again.
+        """
+
+        self.fuzzy_matches = dict()
+        return FilterPass(self, chunk_size)
     
+    @METRICS.timed('Metis.request_book')
+    @writer
     def request_book(self):
         """
         Returns a book from the available collection.
@@ -133,23 +607,35 @@ class MetisClass:
             return None
 
         chosen, population = None, list(self.availables)
-        recents = [ (5*(index+1), genre) for index, genre in enumerate(self.recently_read_genre)]
 
-        def okay(item, arr):
+        # (key, value) pairs of (genre bit, tries left before it is allowed)
+        tries = dict()
+        for index, genre in enumerate(self.recently_read_genre):
+            bit = self.genre_bits.bit(genre)
+            if bit:
+                tries[bit] = 5*(index+1)
+        recent_mask = sum(tries)
+
+        def okay(item):
             "Check if there are conflicting genres"
-            res = True
-            for genre in item.genre:
-                for index, x in enumerate(arr):
-                    tries, illegal_genre = x
-                    if genre == illegal_genre and tries:
-                        res = False
-                        arr[index] = (tries-1, illegal_genre)
-            return res
+            nonlocal recent_mask
 
+            conflicts = self.get_genre_mask(item) & recent_mask
+            if not conflicts:
+                return True
+
+            # each conflicting genre uses up one of its tries
+            while conflicts:
+                bit = conflicts & -conflicts
+                conflicts ^= bit
+                tries[bit] -= 1
+                if not tries[bit]:
+                    recent_mask ^= bit
+            return False
 
         while not chosen:
             possible = random.choice(population)
-            if okay(possible, recents):
+            if okay(possible):
                 chosen = possible
         
         if chosen:
@@ -197,7 +683,7 @@ class MetisClass:
         # It should also be shown in the frontend
         return self.is_showable(item)
     
-    def is_showable(self, item):
+    def is_showable(self, item, filter_mask=None):
         """
         Tells whether an item fits the filter criteria.
 
@@ -210,20 +696,30 @@ class MetisClass:
         Parameter:
             item : ReadingListItem
                 - the item to be checked
+            filter_mask (optional) : int
+                - the result of self.get_filter_mask, for callers
+                  that check many items against the same filter
         
         Return Value : boolean
         """
         
         # should be correct genre
-        if self.filter and not any(genre in self.filter for genre in item.genre):
-            return False
+        if self.filter:
+            if filter_mask is None:
+                filter_mask = self.get_filter_mask()
+            if not self.get_genre_mask(item) & filter_mask:
+                return False
         
-        # should be in search result
-        if self.search_filter.lower() not in item.format_book().lower():
+        # should be in search result (or have the searched words, or be close to them)
+        if self.search_filter.lower() not in item.format_book().lower() \
+            and item.get_uid() not in self.get_search_matches() \
+            and item.get_uid() not in self.fuzzy_matches:
             return False
 
         return True
     
+    @METRICS.timed('Metis.toggle')
+    @writer
     def toggle(self, item):
         """
         Toggles the availability of the item.
@@ -242,12 +738,15 @@ class MetisClass:
 
         index = self.indices[item.format_book().lower()]
         self.collection[index].available = not self.collection[index].available
+        self.unpublished.add(index)
 
         if self.is_available(self.collection[index]):
             self.availables.add(item)
         else:
-            self.availables.remove(item)
+            self.availables.discard(item)
     
+    @METRICS.timed('Metis.insert_item')
+    @writer
     def insert_item(self, data):
         """
         Attempts to insert a new item and tells if it is a success.
@@ -269,6 +768,8 @@ class MetisClass:
             availables - a new item may be inserted
             indices - a new (formatted title, uid) pair is inserted
             available_genres - new genres may be added
+            genre_bits - new genres may be interned
+            lazy_indices - the item is indexed (if built)
 
             (success independent)
             uid - incremented
@@ -291,9 +792,14 @@ class MetisClass:
             return None
 
         self.collection[uid] = new_item
+        self._index_genres(new_item)
+        # the search matches must know the item before it is checked
+        self._update_lazy_indices(uid)
         if self.is_available(new_item):
             self.availables.add(new_item)
         self.indices[new_item.format_book().lower()] = uid
+        for index in self.sorted_indices.values():
+            index.add(new_item)
         for genre in new_item.genre:
             self.available_genres.add(genre)
 
@@ -301,6 +807,8 @@ class MetisClass:
 
         return new_item
     
+    @METRICS.timed('Metis.edit_item')
+    @writer
     def edit_item(self, item, new_data):
         """
         Attempts to update the item in the backend and tells if success.
@@ -322,6 +830,8 @@ class MetisClass:
             availables - an item may be toggled
             indices - an old pair is deleted and a new one is inserted
             available_genres - new genres may be added
+            genre_bits - new genres may be interned
+            lazy_indices - the item is re-indexed (if built)
 
             (success independent)
             uid - incremented
@@ -352,12 +862,18 @@ class MetisClass:
 
         # apply the superficial changes last
         item.config(**new_data)
+        self._index_genres(item)
+        for sorted_index in self.sorted_indices.values():
+            sorted_index.update(item)
+        self._update_lazy_indices(item.get_uid())
 
         for genre in new_data['genre']:
             self.available_genres.add(genre)
 
         return True
     
+    @METRICS.timed('Metis.delete_item')
+    @writer
     def delete_item(self, item):
         """
         Deletes an item from the backend.
@@ -378,6 +894,7 @@ class MetisClass:
             collection - a (uid, item) pair is deleted
             availables - an item may be removed
             indices - a (formatted title, uid) pair is deleted
+            lazy_indices - the item is removed (if built)
         
         Parameter:
             item : ReadingListItem
@@ -394,6 +911,9 @@ class MetisClass:
         del self.indices[item.format_book().lower()]
         if item.available:
             self.availables.remove(item)
+        for sorted_index in self.sorted_indices.values():
+            sorted_index.discard(index)
+        self._update_lazy_indices(index)
         
         del item
     
@@ -402,4 +922,203 @@ class MetisClass:
 
         res = self.next_uid
         self.next_uid += 1
-        return res
\ No newline at end of file
+        return res
+
+    def _update_lazy_indices(self, uid):
+        "Updates the lazy indices (and notes it for the builds in progress and the next Snapshot) after the uid changed."
+
+        self.unpublished.add(uid)
+        for _, changed in self.builds.values():
+            changed.append(uid)
+
+        item = self.collection.get(uid)
+        for index in self.lazy_indices.values():
+            if item is None:
+                index.discard(uid)
+            else:
+                index.update(item)
+
+    def _publish(self):
+        "Publishes the changes of the last write as a new Snapshot (see writer)."
+
+        uids, self.unpublished = self.unpublished, set()
+        if not uids:
+            return
+        self.version += 1
+
+        if self.snapshot is not None:
+            changes = dict()
+            for uid in uids:
+                item = self.collection.get(uid)
+                changes[uid] = None if item is None else Book.of(item)
+            self.snapshot = self.snapshot.evolve(changes, tuple(self.recently_read_genre), self.version)
+            METRICS.count('Metis.snapshots')
+
+    def _get_search_cache(self):
+        "Returns the (key, matches, scores or None) of the current search filter."
+
+        index = self.lazy_indices.get('text')
+        key = (self.search_filter, index.version if index is not None else None)
+        if self.search_cache is None or self.search_cache[0] != key:
+            matches = index.matches(self.search_filter, self.collection) if index is not None and self.search_filter.strip() else set()
+            self.search_cache = (key, matches, None)
+        return self.search_cache
+
+    def _index_genres(self, item):
+        "Replaces the item's genres with the frozenset shared by the items with the same genres."
+
+        _, item.genre = self.genre_bits.intern_set(item.genre)
+
+class FilterPass:
+    """
+    Recomputes the showable and available items in slices.
+
+    Rationale: A FilterPass works on the filters of Metis at the
+        time each slice is run, so a pass must be discarded (just
+        stop calling it) whenever the filters change. Also, the
+        collection may change in between slices, so the result is
+        validated when applied.
+
+    Usage:
+        fpass = metis.start_filter_pass()
+        while not fpass.step():
+            ... do something else ...
+        fpass.apply()
+
+    Instance Variables:
+        showable : list
+            - the showable items, in the current order
+        availables : set
+            - the available items among the showable ones
+        scanned : int
+            - the number of items checked so far
+        fuzzy : boolean
+            - whether the close matches of the search are shown,
+              since nothing matched it (see self.apply)
+    """
+
+    def __init__(self, metis : MetisClass, chunk_size=2000):
+        self.metis = metis
+        self.chunk_size = chunk_size
+        self.items = list(metis.iter_ordered())
+        self.showable = list()
+        self.availables = set()
+        self.scanned = 0
+        self.fuzzy = False
+
+    def is_done(self):
+        return self.scanned >= len(self.items)
+
+    def step(self):
+        """
+        Checks the next chunk of items and tells if the pass is done.
+
+        Return Value : boolean
+        """
+
+        chunk = self.items[self.scanned:self.scanned + self.chunk_size]
+        is_showable, filter_mask = self.metis.is_showable, self.metis.get_filter_mask()
+        for item in chunk:
+            if is_showable(item, filter_mask):
+                self.showable.append(item)
+                if item.available:
+                    self.availables.add(item)
+        self.scanned += len(chunk)
+        return self.is_done()
+
+    def apply(self):
+        """
+        Finishes the pass and stores the result in Metis.
+
+        Items deleted or toggled while the pass was running
+        are corrected here, so this only costs O(showable).
+
+        If nothing matches the search, the entries close to it
+        (e.g. with a typo) are shown instead, provided that the
+        'fuzzy' index is built. Metis then keeps them showable
+        until the next pass.
+
+        Return Value : list
+            - the showable items
+        """
+
+        while not self.step():
+            pass
+
+        collection = self.metis.collection
+        self.showable = [ item for item in self.showable if collection.get(item.get_uid()) is item ]
+        if not self.showable:
+            self._show_fuzzy()
+        if self.metis.is_ranking():
+            self.showable = self.metis.sort_items(self.showable)
+        self.availables = { item for item in self.showable if item.available }
+        self.metis.availables = self.availables
+
+        METRICS.count('Metis.filter_passes')
+        METRICS.count('Metis.items_scanned', self.scanned)
+        METRICS.gauge('Metis.items_scanned_last_pass', self.scanned)
+        METRICS.gauge('Metis.availables', len(self.availables))
+
+        return self.showable
+
+    def _show_fuzzy(self):
+        "Shows the entries close to the search (which must have no match)."
+
+        metis = self.metis
+        index = metis.lazy_indices.get('fuzzy')
+        if index is None or not metis.search_filter.strip():
+            return
+
+        metis.fuzzy_matches = dict(index.search(metis.search_filter))
+        filter_mask = metis.get_filter_mask()
+        items = ( metis.collection[uid] for uid in metis.fuzzy_matches )
+        self.showable = [ item for item in items if metis.is_showable(item, filter_mask) ]
+        if not metis.is_ranking():
+            self.showable = metis.sort_items(self.showable)
+        self.fuzzy = bool(self.showable)
+
+class SortedView:
+    """
+    A live sequence of every entry of Metis, in the current order.
+
+    Rationale: When no filter is active, every entry is showable,
+        so copying (and filtering) the whole collection just to
+        show a few rows of it is wasteful. The SortedView reads
+        the SortedIndex directly instead, so its length and any
+        slice only cost as much as the slice itself.
+
+        Since it follows Metis, append, insert and remove do
+        nothing. These exist so that the view can be used in
+        place of a showable list.
+
+    Parameters:
+        metis : MetisClass
+    """
+
+    def __init__(self, metis : MetisClass):
+        self.metis = metis
+
+    def __len__(self):
+        return len(self.metis.collection)
+
+    def __getitem__(self, key):
+        index, collection = self.metis.get_index(), self.metis.collection
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(index))
+            return [ collection[index.uid_at(i)] for i in range(start, stop, step) ]
+        return collection[index.uid_at(key)]
+
+    def __iter__(self):
+        return self.metis.iter_ordered()
+
+    def __contains__(self, item):
+        return self.metis.collection.get(item.get_uid()) is item
+
+    def append(self, item):
+        pass
+
+    def insert(self, position, item):
+        pass
+
+    def remove(self, item):
+        pass